@@ -0,0 +1,83 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.profiling import is_admin_key, profile_store, recognizer_timings
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    if not settings.admin_api_key:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled, set ADMIN_API_KEY")
+    if not is_admin_key(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Key")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles(limit: int = Query(20, ge=1, le=1000)):
+    """
+    List the newest saved request profiles.
+
+    Profiles are saved for requests slower than PROFILING_SLOW_MS while
+    PROFILING_ENABLED is set, and for every request sent with `X-Profile: 1`
+    and a valid `X-Admin-Key`. Each entry has the request, its latency and the
+    time spent per recognizer.
+    """
+    try:
+        profiles = await run_in_threadpool(profile_store.list, limit)
+        return {"profiles": profiles, "slow_ms": settings.profiling_slow_ms, "enabled": settings.profiling_enabled}
+    except Exception as e:
+        logger.error(f"Listing profiles failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(
+    profile_id: str,
+    format: str = Query("json", description="json (metadata and text report), txt or html (pyinstrument only)")
+):
+    """
+    Get one saved request profile.
+    """
+    if format not in ("json", "txt", "html"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'")
+
+    if format == "json":
+        metadata = await run_in_threadpool(profile_store.get, profile_id)
+        report = await run_in_threadpool(profile_store.get_report, profile_id, "txt")
+        if metadata is None:
+            raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+        return {**metadata, "report": report}
+
+    report = await run_in_threadpool(profile_store.get_report, profile_id, format)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No {format} report for profile '{profile_id}'")
+    return HTMLResponse(report) if format == "html" else PlainTextResponse(report)
+
+
+@router.get("/recognizer-timings", dependencies=[Depends(require_admin)])
+async def get_recognizer_timings():
+    """
+    Time spent per recognizer of the analyzer registry in this worker.
+
+    Includes the NLP engine (spaCy) as `nlp_engine:<class>`, and as
+    `nlp_engine:<class>:batch` for batched analysis (micro-batching, PDF pages,
+    DOCX and text files), sorted by total time. Requires
+    PROFILING_RECOGNIZER_TIMINGS.
+    """
+    return {"enabled": settings.profiling_recognizer_timings, **recognizer_timings.snapshot()}
+
+
+@router.delete("/recognizer-timings", dependencies=[Depends(require_admin)])
+async def reset_recognizer_timings():
+    """
+    Reset the recognizer timings of this worker.
+    """
+    recognizer_timings.reset()
+    return {"reset": True}
@@ -1,8 +1,8 @@
 import time
 import logging
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
 
 from app.models import (
@@ -14,16 +14,30 @@ from app.models import (
     BatchAnonymizeResponse,
     ErrorResponse
 )
+from app.responses import ResponseOptions, encode_response, get_response_options
 from app.services.anonymization import BaseAnonymizationService, get_anonymization_service
+from app.services.rate_limiter import RateLimitContext, rate_limit
+from app.services.result_store import content_document_id, get_result_store
 
 router = APIRouter(prefix="/api/v1", tags=["anonymization"])
 logger = logging.getLogger(__name__)
 
 
+def _store_results(result, text: str, document_id: Optional[str], source: str, language: str):
+    """Queue the entities of a response for the audit store when it is enabled"""
+    store = get_result_store()
+    if store is not None:
+        result.document_id = document_id or content_document_id(text)
+        store.record(result.document_id, text, result.entities, source=source, language=language)
+
+
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_text(
     request: AnalyzeRequest,
-    service: BaseAnonymizationService = Depends(get_anonymization_service)
+    http_request: Request,
+    service: BaseAnonymizationService = Depends(get_anonymization_service),
+    quota: RateLimitContext = Depends(rate_limit("text")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ) -> AnalyzeResponse:
     """
     Analyze text for PII entities without anonymizing it.
@@ -31,11 +45,16 @@ async def analyze_text(
     This endpoint identifies potentially sensitive information in the provided text
     and returns details about detected entities including their location and confidence scores.
     """
+    await quota.consume_async(characters=len(request.text))
+    
     try:
         logger.info(f"Analyzing text of length {len(request.text)}")
         result = await service.analyze(request)
         logger.info(f"Analysis completed in {result.processing_time:.3f}s, found {len(result.entities)} entities")
-        return result
+        _store_results(result, request.text, request.document_id, "analyze", request.language)
+        return encode_response(http_request, result, response_options)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -44,7 +63,10 @@ async def analyze_text(
 @router.post("/anonymize", response_model=AnonymizeResponse)
 async def anonymize_text(
     request: AnonymizeRequest,
-    service: BaseAnonymizationService = Depends(get_anonymization_service)
+    http_request: Request,
+    service: BaseAnonymizationService = Depends(get_anonymization_service),
+    quota: RateLimitContext = Depends(rate_limit("text")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ) -> AnonymizeResponse:
     """
     Anonymize text by detecting and replacing PII entities.
@@ -52,11 +74,16 @@ async def anonymize_text(
     This endpoint analyzes the text for sensitive information and returns an anonymized
     version with PII entities replaced according to the specified anonymization strategy.
     """
+    await quota.consume_async(characters=len(request.text))
+    
     try:
         logger.info(f"Anonymizing text of length {len(request.text)}")
         result = await service.anonymize(request)
         logger.info(f"Anonymization completed in {result.processing_time:.3f}s, processed {len(result.entities)} entities")
-        return result
+        _store_results(result, request.text, request.document_id, "anonymize", request.language)
+        return encode_response(http_request, result, response_options)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Anonymization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -65,7 +92,10 @@ async def anonymize_text(
 @router.post("/batch", response_model=BatchAnonymizeResponse)
 async def batch_anonymize(
     request: BatchAnonymizeRequest,
-    service: BaseAnonymizationService = Depends(get_anonymization_service)
+    http_request: Request,
+    service: BaseAnonymizationService = Depends(get_anonymization_service),
+    quota: RateLimitContext = Depends(rate_limit("text")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ) -> BatchAnonymizeResponse:
     """
     Anonymize multiple texts in a single batch request.
@@ -73,6 +103,8 @@ async def batch_anonymize(
     This endpoint processes multiple texts simultaneously, which can be more efficient
     than making individual requests for each text.
     """
+    await quota.consume_async(characters=sum(len(text) for text in request.texts))
+    
     try:
         start_time = time.time()
         logger.info(f"Processing batch of {len(request.texts)} texts")
@@ -90,6 +122,7 @@ async def batch_anonymize(
             
             # Process individual text
             result = await service.anonymize(individual_request)
+            _store_results(result, text, None, "batch", request.language)
             results.append(result)
             
             logger.debug(f"Processed text {i+1}/{len(request.texts)}")
@@ -97,11 +130,13 @@ async def batch_anonymize(
         total_processing_time = time.time() - start_time
         logger.info(f"Batch processing completed in {total_processing_time:.3f}s")
         
-        return BatchAnonymizeResponse(
+        return encode_response(http_request, BatchAnonymizeResponse(
             results=results,
             total_processing_time=total_processing_time
-        )
+        ), response_options)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Batch anonymization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,102 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from app.api.admin import require_admin
+from app.services.result_store import ResultStore, get_result_store
+
+# Stored results reveal which documents hold which PII (and the PII itself with RESULT_STORE_INCLUDE_TEXT)
+router = APIRouter(prefix="/api/v1/audit", tags=["audit"], dependencies=[Depends(require_admin)])
+logger = logging.getLogger(__name__)
+
+
+def _require_store() -> ResultStore:
+    store = get_result_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Result store is disabled, set RESULT_STORE_ENABLED=true")
+    return store
+
+
+@router.get("/entity-counts")
+async def get_entity_counts(
+    since: Optional[float] = Query(None, description="Unix timestamp, only results analyzed from then on"),
+    until: Optional[float] = Query(None, description="Unix timestamp, only results analyzed before then"),
+    document_id: Optional[str] = Query(None, description="Restrict the counts to one document")
+):
+    """
+    Count stored entities per entity type.
+
+    Returns the number of analyzed documents and, per entity type, how many
+    entities were found and in how many documents.
+    """
+    store = _require_store()
+
+    try:
+        return await run_in_threadpool(store.entity_counts, since=since, until=until, document_id=document_id)
+    except Exception as e:
+        logger.error(f"Entity count query failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/documents")
+async def find_documents(
+    entity_type: Optional[str] = Query(None, description="Entity type the documents must contain, e.g. IBAN_CODE"),
+    since: Optional[float] = Query(None, description="Unix timestamp, only results analyzed from then on"),
+    until: Optional[float] = Query(None, description="Unix timestamp, only results analyzed before then"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Find documents containing an entity type.
+
+    Answers questions like "which documents contain IBANs" from the stored
+    results, most recently analyzed first, without analyzing anything again.
+    """
+    store = _require_store()
+
+    try:
+        documents = await run_in_threadpool(
+            store.find_documents, entity_type=entity_type, since=since, until=until, limit=limit, offset=offset
+        )
+        return {"documents": documents, "limit": limit, "offset": offset}
+    except Exception as e:
+        logger.error(f"Document query failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/documents/{document_id}")
+async def get_document(document_id: str):
+    """
+    Get the stored analysis results of one document.
+    """
+    store = _require_store()
+
+    try:
+        document = await run_in_threadpool(store.get_document, document_id)
+    except Exception as e:
+        logger.error(f"Document lookup failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"No stored results for document '{document_id}'")
+    return document
+
+
+@router.delete("/documents/{document_id}")
+async def delete_document(document_id: str):
+    """
+    Delete the stored analysis results of one document.
+    """
+    store = _require_store()
+
+    try:
+        deleted = await run_in_threadpool(store.delete_document, document_id)
+    except Exception as e:
+        logger.error(f"Document deletion failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No stored results for document '{document_id}'")
+    return {"document_id": document_id, "deleted": True}
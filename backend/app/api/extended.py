@@ -1,11 +1,25 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import Response, JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, Response, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from app.config import settings
+from app.models import AnonymizationMode, ImageOutputFormat
+from app.responses import ResponseOptions, encode_response, get_response_options
 from app.services.extended_anonymization import ExtendedAnonymizationService
 from app.services.file_service import FileService
+from app.services.ocr import available_backends
+from app.services.rate_limiter import RateLimitContext, api_key_id, rate_limit
+from app.services.text_file_anonymization import (
+    TEXT_FILE_UNITS,
+    UNIT_SEPARATORS,
+    get_text_file_job,
+    get_text_file_result_path,
+    submit_text_file_job
+)
+from app.services.tiled_image import count_pages
 
 router = APIRouter(prefix="/api/v1/extended", tags=["extended-anonymization"])
 logger = logging.getLogger(__name__)
@@ -21,11 +35,15 @@ def get_file_service():
 
 @router.post("/anonymize/advanced")
 async def anonymize_text_advanced(
+    http_request: Request,
     text: str = Form(...),
     entities: str = Form(None),
     language: str = Form("en"),
     score_threshold: float = Form(0.35),
-    service: ExtendedAnonymizationService = Depends(get_extended_service)
+    anonymization_mode: AnonymizationMode = Form(AnonymizationMode.REPLACE),
+    service: ExtendedAnonymizationService = Depends(get_extended_service),
+    quota: RateLimitContext = Depends(rate_limit("text")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ):
     """
     Advanced text anonymization with detailed analysis and statistics.
@@ -33,6 +51,8 @@ async def anonymize_text_advanced(
     Provides enhanced anonymization with additional analytics and insights
     about the processing results.
     """
+    await quota.consume_async(characters=len(text))
+    
     try:
         # Parse entities if provided
         entity_list = None
@@ -43,11 +63,14 @@ async def anonymize_text_advanced(
             text=text,
             entities=entity_list,
             language=language,
-            score_threshold=score_threshold
+            score_threshold=score_threshold,
+            anonymization_mode=anonymization_mode
         )
         
-        return result
+        return encode_response(http_request, result, response_options)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Advanced text anonymization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -55,9 +78,12 @@ async def anonymize_text_advanced(
 
 @router.post("/anonymize/pdf/text")
 async def anonymize_pdf_text(
+    http_request: Request,
     file: UploadFile = File(...),
     service: ExtendedAnonymizationService = Depends(get_extended_service),
-    file_service: FileService = Depends(get_file_service)
+    file_service: FileService = Depends(get_file_service),
+    quota: RateLimitContext = Depends(rate_limit("files")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ):
     """
     Anonymize PDF content by extracting and processing text directly.
@@ -73,9 +99,10 @@ async def anonymize_pdf_text(
         content = await file.read()
         
         # Process PDF
-        result = await service.anonymize_pdf_text_only(content)
+        result = await service.anonymize_pdf_text_only(content, tenant=api_key_id(http_request))
+        await quota.charge_async(pages=result["total_pages"])
         
-        return result
+        return encode_response(http_request, result, response_options)
         
     except Exception as e:
         logger.error(f"PDF text anonymization failed: {str(e)}")
@@ -84,9 +111,12 @@ async def anonymize_pdf_text(
 
 @router.post("/anonymize/pdf/ocr")
 async def anonymize_pdf_ocr(
+    http_request: Request,
     file: UploadFile = File(...),
     service: ExtendedAnonymizationService = Depends(get_extended_service),
-    file_service: FileService = Depends(get_file_service)
+    file_service: FileService = Depends(get_file_service),
+    quota: RateLimitContext = Depends(rate_limit("files")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ):
     """
     Anonymize PDF content using OCR (Optical Character Recognition).
@@ -103,9 +133,10 @@ async def anonymize_pdf_ocr(
         content = await file.read()
         
         # Process PDF with OCR
-        result = await service.anonymize_pdf_ocr(content)
+        result = await service.anonymize_pdf_ocr(content, tenant=api_key_id(http_request))
+        await quota.charge_async(pages=result["total_pages"])
         
-        return result
+        return encode_response(http_request, result, response_options)
         
     except Exception as e:
         logger.error(f"PDF OCR anonymization failed: {str(e)}")
@@ -114,9 +145,12 @@ async def anonymize_pdf_ocr(
 
 @router.post("/anonymize/pdf/mixed")
 async def anonymize_pdf_mixed(
+    http_request: Request,
     file: UploadFile = File(...),
     service: ExtendedAnonymizationService = Depends(get_extended_service),
-    file_service: FileService = Depends(get_file_service)
+    file_service: FileService = Depends(get_file_service),
+    quota: RateLimitContext = Depends(rate_limit("files")),
+    response_options: ResponseOptions = Depends(get_response_options)
 ):
     """
     Comprehensive PDF anonymization handling both text and image content.
@@ -134,48 +168,263 @@ async def anonymize_pdf_mixed(
         content = await file.read()
         
         # Process PDF with mixed approach
-        result = await service.anonymize_pdf_mixed_content(content)
+        result = await service.anonymize_pdf_mixed_content(content, tenant=api_key_id(http_request))
+        await quota.charge_async(pages=result["total_pages"])
         
-        return result
+        return encode_response(http_request, result, response_options)
         
     except Exception as e:
         logger.error(f"Mixed PDF anonymization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/anonymize/docx")
+async def anonymize_docx(
+    file: UploadFile = File(...),
+    entities: str = Form(None),
+    language: str = Form("en"),
+    score_threshold: float = Form(0.35),
+    service: ExtendedAnonymizationService = Depends(get_extended_service),
+    quota: RateLimitContext = Depends(rate_limit("files"))
+):
+    """
+    Anonymize Word documents directly in their XML structure.
+    
+    Paragraphs of the body, tables, headers and footers are analyzed in batches
+    and detected entities are replaced in place, keeping the formatting of the
+    surrounding text. No rendering or OCR is involved.
+    """
+    try:
+        # Validate file type
+        if not file.filename.lower().endswith('.docx'):
+            raise HTTPException(status_code=400, detail="Only DOCX files are supported")
+        
+        entity_list = None
+        if entities:
+            entity_list = [e.strip() for e in entities.split(",") if e.strip()]
+        
+        # Read file content
+        content = await file.read()
+        
+        # Process document
+        result = await service.anonymize_docx(
+            content,
+            entities=entity_list,
+            language=language,
+            score_threshold=score_threshold
+        )
+        await quota.charge_async(characters=result["characters"])
+        
+        # Return anonymized document
+        return Response(
+            content=result["content"],
+            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            headers={
+                "Content-Disposition": f"attachment; filename=anonymized_{file.filename}",
+                "X-Paragraphs-Processed": str(result["paragraphs"]),
+                "X-Entities-Found": str(result["entities_found"]),
+                "X-Processing-Time": f"{result['processing_time']:.3f}"
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"DOCX anonymization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+TEXT_FILE_MEDIA_TYPES = {".txt": "text/plain", ".log": "text/plain", ".jsonl": "application/jsonl"}
+
+
+@router.post("/anonymize/text-file", status_code=202)
+async def anonymize_text_file(
+    file: UploadFile = File(...),
+    unit: str = Form(None, description="line or paragraph; defaults to paragraph for .txt, line for .log and .jsonl"),
+    fields: str = Form(None, description="Comma-separated top-level fields of JSON Lines records, all strings when empty"),
+    entities: str = Form(None),
+    language: str = Form("en"),
+    score_threshold: float = Form(0.35),
+    anonymization_mode: AnonymizationMode = Form(AnonymizationMode.REPLACE),
+    file_service: FileService = Depends(get_file_service),
+    quota: RateLimitContext = Depends(rate_limit("files"))
+):
+    """
+    Anonymize a plain text, log or JSON Lines file as a background job.
+    
+    The file is stored, then memory-mapped and anonymized line by line or
+    paragraph by paragraph, with the result written incrementally, so files
+    far larger than MAX_FILE_SIZE (up to TEXT_FILE_MAX_SIZE) are processed in
+    bounded memory. Returns the job with `status_url` to poll for progress and
+    `result_url` to download the anonymized file once the job is done.
+    """
+    suffix = "." + file.filename.lower().rsplit(".", 1)[-1] if "." in file.filename else ""
+    if suffix not in TEXT_FILE_UNITS:
+        raise HTTPException(status_code=400, detail=f"Only {', '.join(TEXT_FILE_UNITS)} files are supported")
+    unit = unit or TEXT_FILE_UNITS[suffix]
+    if unit not in UNIT_SEPARATORS:
+        raise HTTPException(status_code=400, detail=f"Unsupported unit '{unit}', use line or paragraph")
+    if suffix == ".jsonl" and unit != "line":
+        raise HTTPException(status_code=400, detail="JSON Lines files are processed by line")
+    
+    try:
+        path = await file_service.save_upload_file(file, max_size=settings.text_file_max_size)
+        
+        status = submit_text_file_job(
+            path,
+            file.filename,
+            unit,
+            language=language,
+            entities=[e.strip() for e in entities.split(",") if e.strip()] if entities else None,
+            score_threshold=score_threshold,
+            anonymization_mode=anonymization_mode,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        )
+        await quota.charge_async(characters=status["bytes_total"])
+        
+        job_url = f"{router.prefix}/anonymize/text-file/{status['id']}"
+        return {**status, "status_url": job_url, "result_url": f"{job_url}/result"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Text file anonymization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/anonymize/text-file/{job_id}")
+async def get_text_file_job_status(job_id: str):
+    """
+    Progress of a text file job: state, bytes and units processed, entities found.
+    """
+    status = get_text_file_job(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No text file job '{job_id}'")
+    return status
+
+
+@router.get("/anonymize/text-file/{job_id}/result")
+async def get_text_file_job_result(job_id: str):
+    """
+    Download the anonymized file of a finished text file job.
+    """
+    status = get_text_file_job(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No text file job '{job_id}'")
+    if status["state"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status['state']}")
+    
+    path = get_text_file_result_path(status)
+    if path is None:
+        raise HTTPException(status_code=410, detail="The result has been removed by the file retention")
+    
+    suffix = "." + status["filename"].lower().rsplit(".", 1)[-1]
+    return FileResponse(
+        path,
+        media_type=TEXT_FILE_MEDIA_TYPES.get(suffix, "text/plain"),
+        filename=f"anonymized_{status['filename']}"
+    )
+
+
+def _negotiate_image_format(output_format: Optional[str], accept: str) -> ImageOutputFormat:
+    """Explicit form choice first, then an image type the client accepts, then the configured default"""
+    if output_format:
+        try:
+            return ImageOutputFormat(output_format.lower())
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unsupported output format '{output_format}'")
+    
+    accepted = [part.split(";")[0].strip() for part in accept.lower().split(",")]
+    for image_format in (ImageOutputFormat.WEBP, ImageOutputFormat.JPEG, ImageOutputFormat.PNG):
+        if f"image/{image_format.value}" in accepted:
+            return image_format
+    
+    return ImageOutputFormat(settings.image_output_format)
+
+
 @router.post("/anonymize/image")
 async def anonymize_image(
+    http_request: Request,
     file: UploadFile = File(...),
-    service: ExtendedAnonymizationService = Depends(get_extended_service)
+    output_format: Optional[str] = Form(None),
+    quality: Optional[int] = Form(None, ge=1, le=100),
+    ocr_scale: Optional[float] = Form(None, gt=0.0, le=1.0),
+    service: ExtendedAnonymizationService = Depends(get_extended_service),
+    quota: RateLimitContext = Depends(rate_limit("files"))
 ):
     """
     Anonymize images by detecting and redacting PII in visual content.
     
     Uses Presidio Image Redactor to identify and mask sensitive information
-    directly in images.
+    directly in images. The output keeps the upload's format unless
+    `output_format` (source, png, jpeg, webp) or the Accept header asks for
+    another one; `quality` applies to JPEG and WebP. With `ocr_scale` below 1,
+    OCR runs on a downscaled copy and the boxes are mapped back to the full
+    resolution image. Encoding details are reported in `X-Image-*` headers.
+    
+    Very large images and multi-page TIFFs are split into overlapping
+    full-width bands that are OCRed in parallel and streamed back page by page as PNG;
+    multi-page inputs return a ZIP archive with one PNG per page.
     """
     try:
         # Validate file type
-        valid_extensions = ['.png', '.jpg', '.jpeg']
+        valid_extensions = ['.png', '.jpg', '.jpeg', '.tif', '.tiff']
         if not any(file.filename.lower().endswith(ext) for ext in valid_extensions):
             raise HTTPException(
                 status_code=400, 
-                detail="Only PNG, JPG, and JPEG files are supported"
+                detail="Only PNG, JPG, JPEG and TIFF files are supported"
             )
         
         # Read file content
         content = await file.read()
+        base_name = file.filename.rsplit(".", 1)[0]
+        
+        if service.needs_tiling(content):
+            pages, _, _ = count_pages(content)
+            await quota.charge_async(pages=pages)
+            chunks = service.anonymize_image_tiled(content)
+            # Pull the first chunk here (off the event loop, it OCRs page 1) so decoding errors still become a proper error response
+            first_chunk = await run_in_threadpool(next, chunks, b"")
+            
+            def body():
+                yield first_chunk
+                yield from chunks
+            
+            return StreamingResponse(
+                body(),
+                media_type="application/zip" if pages > 1 else "image/png",
+                headers={
+                    "Content-Disposition": f"attachment; filename=anonymized_{base_name}.{'zip' if pages > 1 else 'png'}",
+                    "X-Pages": str(pages)
+                }
+            )
         
         # Process image
-        anonymized_content = await service.anonymize_image_with_presidio(content)
+        result = await service.anonymize_image_with_presidio(
+            content,
+            output_format=_negotiate_image_format(output_format, http_request.headers.get("accept", "")),
+            quality=quality,
+            ocr_scale=ocr_scale
+        )
+        await quota.charge_async(pages=1)
         
         # Return anonymized image
-        return Response(
-            content=anonymized_content,
-            media_type="image/png",
-            headers={"Content-Disposition": f"attachment; filename=anonymized_{file.filename}"}
-        )
+        headers = {
+            "Content-Disposition": f"attachment; filename=anonymized_{base_name}.{result['extension']}",
+            "X-Image-Format": result["format"],
+            "X-Image-Input-Bytes": str(result["input_size"]),
+            "X-Image-Output-Bytes": str(result["output_size"]),
+            "X-Image-Dimensions": "x".join(map(str, result["dimensions"])),
+            "X-Image-OCR-Dimensions": "x".join(map(str, result["ocr_dimensions"])),
+            "X-Processing-Time": f"{result['processing_time']:.3f}"
+        }
+        if result["quality"] is not None:
+            headers["X-Image-Quality"] = str(result["quality"])
+        
+        return Response(content=result["content"], media_type=result["media_type"], headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Image anonymization failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -191,14 +440,18 @@ async def get_extended_capabilities():
     """
     return {
         "supported_file_types": {
-            "text": [".txt"],
+            "text": [".txt", ".log", ".jsonl"],
             "pdf": [".pdf"],
-            "images": [".png", ".jpg", ".jpeg"]
+            "docx": [".docx"],
+            "images": [".png", ".jpg", ".jpeg", ".tif", ".tiff"],
+            "tabular": [".csv", ".parquet"]
         },
         "processing_methods": {
-            "text": ["direct_anonymization", "advanced_analysis"],
+            "text": ["direct_anonymization", "advanced_analysis", "streamed_file_jobs"],
             "pdf": ["text_extraction", "ocr", "mixed_content"],
-            "images": ["visual_redaction"]
+            "docx": ["in_place_run_rewrite"],
+            "images": ["visual_redaction", "tiled_redaction", "multi_page_tiff", "downscaled_ocr"],
+            "tabular": ["column_deduplication", "regex_only_profiles"]
         },
         "features": [
             "detailed_analytics",
@@ -208,6 +461,9 @@ async def get_extended_capabilities():
             "performance_metrics"
         ],
         "ocr_languages": ["eng", "deu", "fra", "spa"],  # Expandable based on Tesseract config
+        "ocr_backend": settings.ocr_backend,
+        "ocr_backends": available_backends(),
         "max_file_size": "10MB",
-        "supported_image_formats": ["PNG", "JPEG", "JPG"]
+        "supported_image_formats": ["PNG", "JPEG", "JPG", "TIFF"],
+        "image_output_formats": [image_format.value for image_format in ImageOutputFormat]
     }
@@ -7,6 +7,15 @@ from fastapi.responses import JSONResponse
 from app.config import settings
 from app.models import HealthResponse, EngineInfo
 from app.services.anonymization import BaseAnonymizationService, get_anonymization_service
+from app.services.batching import get_batching_stats
+from app.services.result_store import get_result_store
+from app.services.upstream import get_upstream_stats
+from app.services.operator_plans import get_plan_stats
+from app.services.file_store import get_file_store_stats
+from app.services.engines import get_analyzer_load_stats
+from app.services.prefilter import get_prefilter_stats
+from app.services.sentence_memo import get_sentence_memo_stats
+from app.services.hybrid_routing import get_hybrid_routing_stats
 
 router = APIRouter(tags=["health"])
 logger = logging.getLogger(__name__)
@@ -53,7 +62,12 @@ async def root():
             "docs": "/docs",
             "redoc": "/redoc",
             "api": "/api/v1",
-            "extended": "/api/v1/extended"
+            "extended": "/api/v1/extended",
+            "incremental": "/api/v1/analyze/incremental",
+            "stream": "/api/v1/stream/anonymize",
+            "tabular": "/api/v1/tabular",
+            "audit": "/api/v1/audit",
+            "admin": "/api/v1/admin"
         }
     }
 
@@ -84,3 +98,22 @@ async def get_api_info():
             "advanced_analytics": True
         }
     }
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Runtime metrics of this worker process.
+    """
+    result_store = get_result_store()
+    return {
+        "micro_batching": get_batching_stats(),
+        "result_store": result_store.get_stats() if result_store else None,
+        "upstreams": get_upstream_stats(),
+        "operator_plans": get_plan_stats(),
+        "file_stores": get_file_store_stats(),
+        "analyzer_engine": get_analyzer_load_stats(),
+        "prefilter": get_prefilter_stats(),
+        "sentence_memo": get_sentence_memo_stats(),
+        "hybrid_routing": get_hybrid_routing_stats()
+    }
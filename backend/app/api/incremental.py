@@ -0,0 +1,89 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+
+from app.models import (
+    IncrementalSessionRequest,
+    IncrementalUpdateRequest,
+    IncrementalAnalyzeResponse
+)
+from app.responses import ResponseOptions, encode_response, get_response_options
+from app.services.anonymization import get_anonymization_service
+from app.services.incremental_analysis import IncrementalAnalysisService
+from app.services.rate_limiter import RateLimitContext, client_key, rate_limit
+
+router = APIRouter(prefix="/api/v1/analyze/incremental", tags=["incremental-analysis"])
+logger = logging.getLogger(__name__)
+
+
+def get_incremental_service() -> IncrementalAnalysisService:
+    return IncrementalAnalysisService(get_anonymization_service())
+
+
+@router.post("", response_model=IncrementalAnalyzeResponse)
+async def open_session(
+    request: IncrementalSessionRequest,
+    http_request: Request,
+    service: IncrementalAnalysisService = Depends(get_incremental_service),
+    quota: RateLimitContext = Depends(rate_limit("text")),
+    response_options: ResponseOptions = Depends(get_response_options)
+) -> IncrementalAnalyzeResponse:
+    """
+    Start an incremental analysis session for a document.
+    
+    The full text is analyzed once and cached under the given document id. Later
+    edits only need to send the changed ranges. The session belongs to the
+    caller (its API key, else its IP address); other clients cannot read, edit
+    or close it.
+    """
+    await quota.consume_async(characters=len(request.text))
+    
+    try:
+        result = await service.open_session(request, client_key(http_request))
+        return encode_response(http_request, result, response_options)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Opening incremental session failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{document_id}/edits", response_model=IncrementalAnalyzeResponse)
+async def apply_edits(
+    document_id: str,
+    http_request: Request,
+    request: IncrementalUpdateRequest,
+    service: IncrementalAnalysisService = Depends(get_incremental_service),
+    quota: RateLimitContext = Depends(rate_limit("text")),
+    response_options: ResponseOptions = Depends(get_response_options)
+) -> IncrementalAnalyzeResponse:
+    """
+    Apply edits to a document and return its updated entity list.
+    
+    Only the sentences touched by the edits are analyzed again, entities in
+    untouched regions are shifted to their new offsets.
+    """
+    await quota.consume_async(characters=sum(len(edit.text) for edit in request.edits))
+    
+    try:
+        result = await service.apply_edits(document_id, request, client_key(http_request))
+        await quota.charge_async(characters=sum(end - start for start, end in result.reanalyzed_ranges))
+        return encode_response(http_request, result, response_options)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Incremental analysis failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/{document_id}")
+async def close_session(
+    document_id: str,
+    http_request: Request,
+    service: IncrementalAnalysisService = Depends(get_incremental_service)
+):
+    """
+    End an incremental analysis session and drop its cached text.
+    """
+    service.close_session(document_id, client_key(http_request))
+    return {"document_id": document_id, "status": "closed"}
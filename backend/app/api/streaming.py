@@ -0,0 +1,103 @@
+import json
+import asyncio
+import logging
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+
+from app.config import settings
+from app.services.rate_limiter import get_rate_limiter
+from app.services.streaming import StreamAnonymizer
+
+router = APIRouter(prefix="/api/v1/stream", tags=["streaming"])
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+@router.websocket("/anonymize")
+async def stream_anonymize(websocket: WebSocket):
+    """
+    Anonymize a continuous text stream over a WebSocket.
+
+    Clients may start with a config message
+    `{"type": "config", "language": "en", "entities": [...], "score_threshold": 0.35}`
+    and then send text either as raw text frames or as `{"type": "text", "text": "..."}`.
+    `{"type": "flush"}` forces out buffered text, `{"type": "end"}` flushes and closes.
+
+    The server answers with one `segment` message per sentence-aligned segment,
+    carrying its offset in the input stream, its offset in the anonymized output
+    and the detected entities in input stream coordinates. Segments are processed
+    in order; when the client reads slowly, the server stops reading its input
+    instead of buffering without bounds.
+    """
+    await websocket.accept()
+
+    limiter = get_rate_limiter()
+    client_key = limiter.client_key(websocket) if limiter else None
+    stream = StreamAnonymizer()
+    segments: asyncio.Queue = asyncio.Queue(maxsize=settings.stream_max_pending_segments)
+
+    async def receive_segments():
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                message = {"type": "text", "text": raw}
+
+            message_type = message.get("type", "text")
+            if message_type == "config":
+                stream.language = message.get("language", stream.language)
+                stream.entities = message.get("entities", stream.entities)
+                stream.score_threshold = float(message.get("score_threshold", stream.score_threshold))
+            elif message_type == "text":
+                text = message.get("text", "")
+                if limiter:
+                    await limiter.consume_async(client_key, "text", characters=len(text))
+                # Blocks while the queue is full, which stops reading from the socket
+                for segment in stream.feed(text):
+                    await segments.put(segment)
+            elif message_type in ("flush", "end"):
+                segment = stream.flush()
+                if segment:
+                    await segments.put(segment)
+                if message_type == "end":
+                    await segments.put(_END)
+                    return
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type '{message_type}'"})
+
+    async def send_segments():
+        while True:
+            segment = await segments.get()
+            if segment is _END:
+                await websocket.send_json({
+                    "type": "end",
+                    "characters": stream.received_characters,
+                    "anonymized_characters": stream.anonymized_offset
+                })
+                return
+            await websocket.send_json(await stream.anonymize(segment))
+
+    receiver = asyncio.create_task(receive_segments())
+    sender = asyncio.create_task(send_segments())
+
+    try:
+        done, _ = await asyncio.wait([receiver, sender], return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug("Stream client disconnected")
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1008)
+    except Exception as e:
+        logger.error(f"Stream anonymization failed: {str(e)}")
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+    finally:
+        receiver.cancel()
+        sender.cancel()
@@ -0,0 +1,100 @@
+import json
+import logging
+from typing import Dict
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.models import ColumnProfile
+from app.services.rate_limiter import RateLimitContext, rate_limit
+from app.services.tabular_anonymization import TabularAnonymizationService
+
+router = APIRouter(prefix="/api/v1/tabular", tags=["tabular-anonymization"])
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    ".csv": "text/csv",
+    ".parquet": "application/vnd.apache.parquet"
+}
+
+
+def get_tabular_service():
+    return TabularAnonymizationService()
+
+
+def _parse_profiles(columns: str, profiles: str) -> Dict[str, ColumnProfile]:
+    try:
+        parsed = {name: ColumnProfile(**profile) for name, profile in json.loads(profiles or "{}").items()}
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid column profiles: {str(e)}")
+
+    # Columns listed without a profile use the default one
+    for name in (columns or "").split(","):
+        if name.strip() and name.strip() not in parsed:
+            parsed[name.strip()] = ColumnProfile()
+
+    if not parsed:
+        raise HTTPException(status_code=400, detail="Select at least one column to anonymize")
+    return parsed
+
+
+@router.post("/anonymize")
+async def anonymize_table(
+    file: UploadFile = File(...),
+    columns: str = Form(None),
+    profiles: str = Form(None),
+    service: TabularAnonymizationService = Depends(get_tabular_service),
+    quota: RateLimitContext = Depends(rate_limit("files"))
+):
+    """
+    Anonymize selected columns of a CSV or Parquet file.
+    
+    `columns` is a comma-separated list of columns analyzed with the default
+    profile; `profiles` is a JSON object mapping column names to a profile with
+    `entities`, `mode` (`ner` or `regex`), `language` and `score_threshold`.
+    Identical values are analyzed only once. The result is streamed back in the
+    format of the upload, with all other columns unchanged. Analyzed characters
+    count against the rate limit: those of the first chunk can still reject the
+    request, later ones are charged without cutting off the response.
+    """
+    suffix = "." + file.filename.lower().rsplit(".", 1)[-1] if "." in file.filename else ""
+    if suffix not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Only CSV and Parquet files are supported")
+    
+    column_profiles = _parse_profiles(columns, profiles)
+    streaming = False
+    
+    # Called on the worker thread that pulls the chunks
+    def charge_characters(characters: int):
+        if streaming:
+            quota.charge(characters=characters)
+        else:
+            quota.consume(characters=characters)
+    
+    if suffix == ".csv":
+        chunks = service.stream_csv(file.file, column_profiles, charge_characters)
+    else:
+        chunks = service.stream_parquet(file.file, column_profiles, charge_characters)
+    
+    try:
+        # Pull the first chunk here (off the event loop, it analyzes the whole chunk)
+        # so input errors still become a proper error response
+        first_chunk = await run_in_threadpool(next, chunks, b"")
+        streaming = True
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Tabular anonymization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def body():
+        yield first_chunk
+        yield from chunks
+    
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[suffix],
+        headers={"Content-Disposition": f"attachment; filename=anonymized_{file.filename}"}
+    )
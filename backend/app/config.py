@@ -1,5 +1,5 @@
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseSettings
 
 
@@ -17,30 +17,175 @@ class Settings(BaseSettings):
     debug: bool = False
     reload: bool = False
     
+    # Worker processes, more than one starts the pre-fork server with shared engines
+    workers: int = 1
+    gc_freeze: bool = True  # Freeze the GC after warmup so forked workers keep pages shared
+    memory_report_delay: float = 10.0  # Seconds after fork before logging per-worker memory
+    worker_restart_backoff_max: float = 60.0  # Seconds, the restart delay doubles per worker dying right after start
+    worker_max_failed_starts: int = 10  # Consecutive early deaths of one worker before the server exits, 0 never
+    # Analyzer engine snapshot written by build_engine_snapshot.py, built from scratch when unset or missing
+    engine_snapshot_dir: Optional[str] = None
+    engine_snapshot_mmap_vectors: bool = True  # Memory-map word vectors instead of reading them into memory
+    
     # CORS settings
     allowed_origins: List[str] = ["http://localhost:8080", "http://localhost:3000"]
     
-    # Presidio services
+    # Presidio services, comma-separated URLs are balanced as replicas in external mode
     presidio_analyzer_api_url: str = "http://localhost:5002"
     presidio_analyzer_api_key: Optional[str] = None
     presidio_anonymizer_api_url: str = "http://localhost:5001"
     presidio_anonymizer_api_key: Optional[str] = None
     
-    # Backend mode: 'local' or 'external'
+    # External mode resilience
+    external_timeout: float = 30.0
+    external_connect_timeout: float = 5.0
+    external_max_retries: int = 2  # Extra attempts after a failed call, on another replica
+    external_retry_backoff_ms: int = 100  # Base of the jittered exponential backoff
+    external_retry_backoff_max_ms: int = 2000
+    external_breaker_failure_threshold: int = 5  # Consecutive failures that open a replica's breaker
+    external_breaker_reset_seconds: float = 30.0  # Open time before a trial request is let through
+    external_hedging_enabled: bool = False  # Duplicate slow analyze calls to a second replica
+    external_hedge_min_delay_ms: int = 50  # Lower bound of the hedge delay (otherwise the replica's p95)
+    
+    # Backend mode: 'local', 'external' or 'hybrid' (pattern recognizers local, NER on the external analyzer)
     anonymization_mode: str = "local"
+    hybrid_local_max_chars: int = 1000  # Texts up to this length are analyzed fully in-process while load allows
+    hybrid_local_max_in_flight: int = 4  # Local analyses in flight (threadpool or micro-batcher) before NER goes to the external analyzer
+    hybrid_remote_fallback: bool = True  # Run NER locally when the external analyzer fails
+    
+    # Anonymization operators
+    anonymization_encrypt_key: Optional[str] = None  # AES key (16, 24 or 32 bytes) for the encrypt mode
+    anonymization_hash_salt: Optional[str] = None  # Salt of the hash mode, unsalted when empty; refused in external mode
+    operator_plan_cache_size: int = 256  # Compiled operator plans kept per worker
     
     # File handling
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     upload_dir: str = "./uploads"
     results_dir: str = "./results"
+    # Uploads and results are content-addressed; a background task evicts them by age and size
+    file_retention_hours: float = 24.0  # Files not used for this long are evicted
+    file_store_max_bytes: int = 2 * 1024 * 1024 * 1024  # Per store, oldest files are evicted beyond it
+    file_retention_interval: float = 300.0  # Seconds between retention runs
+    
+    # Incremental analysis sessions
+    incremental_max_sessions: int = 1000
+    incremental_session_ttl: int = 3600  # Seconds an idle session is kept
+    incremental_context_sentences: int = 1  # Extra sentences analyzed around every edit
+    incremental_max_sentence_length: int = 2000  # Upper bound when searching sentence boundaries
+    
+    # PII pre-filter in front of text analysis: off, text (skip clean texts) or sentence (skip clean sentences)
+    prefilter_mode: str = "off"
+    # Lowercase terms that always need analysis, on top of the registry's deny lists; defaults are words spaCy tags as DATE_TIME
+    prefilter_deny_list: List[str] = [
+        "today", "tonight", "tomorrow", "yesterday", "morning", "afternoon", "evening", "night", "noon", "midnight",
+        "week", "weekend", "month", "year", "ago", "monday", "tuesday", "wednesday", "thursday", "friday",
+        "saturday", "sunday", "january", "february", "march", "april", "may", "june", "july", "august",
+        "september", "october", "november", "december", "spring", "summer", "autumn", "winter"
+    ]
+    prefilter_shadow_rate: float = 0.0  # Share of filtered calls analyzed again in full to count missed entities
+    
+    # Micro-batching of analysis calls (streams always use it)
+    micro_batching_enabled: bool = False
+    micro_batch_max_size: int = 32
+    micro_batch_max_delay_ms: float = 5.0
+    
+    # WebSocket streaming
+    stream_max_buffer_chars: int = 4096  # Forced cut when no sentence boundary arrives
+    stream_max_pending_segments: int = 16  # Per connection, reading pauses when full
+    
+    # PDF text pipelines: pages are extracted on a thread pool while earlier pages are analyzed in batches
+    pdf_analysis_batch_size: int = 8  # Pages per nlp.pipe batch
+    pdf_extraction_queue_size: int = 16  # Extracted pages waiting for analysis, per request
+    pdf_extraction_workers: int = 4  # Requests extracting pages at the same time
+    
+    # Sentence memo of the PDF pipelines: each distinct sentence of a document is analyzed once
+    sentence_memo_enabled: bool = False  # Opt-in: entities across sentence boundaries and context from neighbouring sentences are lost
+    sentence_memo_tenant_enabled: bool = False  # Also reuse results across requests of the same API key
+    sentence_memo_tenant_max_entries: int = 10000  # Sentences kept per tenant (entity offsets only, no text)
+    sentence_memo_max_tenants: int = 100
+    
+    # Text, log and JSON Lines file jobs, streamed from a memory-mapped upload
+    text_file_max_size: int = 1024 * 1024 * 1024  # 1GB, memory use does not grow with the file
+    text_file_max_unit_bytes: int = 64 * 1024  # Longer lines or paragraphs are cut
+    text_file_batch_units: int = 64  # Lines or paragraphs per nlp.pipe batch
+    text_file_max_concurrent_jobs: int = 2  # Per worker, further jobs wait
+    text_file_progress_interval: float = 1.0  # Seconds between progress updates of a job
+    text_file_jobs_dir: str = "./jobs"  # Job status files, shared by all workers
+    
+    # DOCX processing
+    docx_paragraph_batch_size: int = 64  # Paragraphs analyzed per NLP batch
+    
+    # Image output encoding
+    image_output_format: str = "source"  # source, png, jpeg or webp when the request does not choose
+    image_jpeg_quality: int = 85
+    image_webp_quality: int = 80
+    image_png_compress_level: int = 6
+    image_ocr_scale: float = 1.0  # Below 1.0, OCR runs on a downscaled copy and boxes are mapped back
+    
+    # Large image processing
+    image_tiling_min_pixels: int = 16_000_000  # Larger images (and multi-page TIFFs) are processed in tiles
+    image_tile_size: int = 2048  # Rows per OCR band, bands span the full page width so text lines are never split
+    image_tile_overlap: int = 128  # Rows shared by neighbouring bands, should exceed the height of a text line
+    image_tile_workers: int = 4  # Bands OCRed in parallel
     
     # OCR settings
+    ocr_backend: str = "auto"  # auto, tesserocr (in-process), tesseract (CLI), http or azure
     tesseract_cmd: str = "/usr/bin/tesseract"
     ocr_language: str = "eng"
+    ocr_tessdata_path: Optional[str] = None  # tesserocr model directory, library default when unset
+    ocr_remote_url: Optional[str] = None  # Base URL of the http backend, e.g. stub_server.py
+    ocr_remote_timeout: float = 30.0
+    ocr_azure_endpoint: Optional[str] = None
+    ocr_azure_key: Optional[str] = None
+    
+    # Response encoding
+    response_compression_min_size: int = 1024  # Bytes, smaller bodies are sent uncompressed
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 4
+    
+    # Audit store of analysis results
+    result_store_enabled: bool = False
+    result_store_path: str = "./analysis_results.sqlite3"
+    result_store_include_text: bool = False  # Store entity texts, i.e. the PII itself
+    # Secret of the HMAC default document ids, which then stay the same for the same text; random ids without it
+    result_store_id_key: Optional[str] = None
+    result_store_batch_size: int = 500  # Entities per write transaction
+    result_store_flush_interval_ms: float = 200.0
+    result_store_queue_size: int = 10000  # Documents waiting to be written, newer ones are dropped when full
+    
+    # Admin and audit endpoints (/api/v1/admin, /api/v1/audit) and on-demand profiling, disabled without a key
+    admin_api_key: Optional[str] = None
+    
+    # Request profiling
+    profiling_enabled: bool = False  # Profile every API request and keep the slow ones
+    profiling_slow_ms: float = 1000.0  # Latency above which a profiled request is saved
+    profiling_dir: str = "./profiles"
+    profiling_keep: int = 50  # Newest saved profiles kept on disk
+    profiling_interval_ms: float = 1.0  # Sampling interval (pyinstrument only)
+    profiling_recognizer_timings: bool = False  # Time every recognizer of the analyzer registry (a lock and timer per call)
+    
+    # OpenTelemetry tracing (needs opentelemetry-sdk, plus the OTLP exporter for otlp)
+    tracing_enabled: bool = False
+    tracing_exporter: str = "otlp"  # otlp, file (JSON lines) or console
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "./traces.jsonl"
+    tracing_service_name: str = "presidio-ui-backend"
+    tracing_sample_ratio: float = 1.0  # Share of new traces recorded, callers' sampling decisions are kept
     
     # Logging
     log_level: str = "INFO"
     
+    # Rate limiting (per API key, falling back to client IP)
+    rate_limit_enabled: bool = False
+    rate_limit_backend: str = "memory"  # 'memory' (per worker) or 'sqlite' (shared by all workers)
+    rate_limit_store_path: str = "./rate_limits.sqlite3"
+    rate_limit_trust_forwarded_for: bool = False
+    # Limits per endpoint group, 0 disables a limit
+    rate_limits: Dict[str, Dict[str, float]] = {
+        "text": {"requests_per_second": 10, "characters_per_minute": 1_000_000, "pages_per_hour": 0},
+        "files": {"requests_per_second": 2, "characters_per_minute": 0, "pages_per_hour": 1000},
+    }
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
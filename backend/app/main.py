@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 from contextlib import asynccontextmanager
@@ -7,8 +8,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.api import health, anonymization, extended
+from app.api import health, anonymization, extended, incremental, streaming, tabular, audit, admin
 from app.models import ErrorResponse
+from app.services.result_store import close_result_store
+from app.services.file_store import run_file_retention
+from app.services.upstream import close_upstream_pools
+from app.services.profiling import ProfilingMiddleware
+from app.services.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
 
 
 # Configure logging
@@ -30,11 +36,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Presidio Anonymization Backend")
     logger.info(f"Anonymization mode: {settings.anonymization_mode}")
     logger.info(f"Debug mode: {settings.debug}")
+    setup_tracing()
+    retention_task = asyncio.create_task(run_file_retention(settings.file_retention_interval))
     
     yield
     
     # Shutdown
     logger.info("Shutting down Presidio Anonymization Backend")
+    retention_task.cancel()
+    close_result_store()
+    await close_upstream_pools()
+    shutdown_tracing()
 
 
 def create_app() -> FastAPI:
@@ -57,10 +69,21 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Profile API requests on demand or when PROFILING_ENABLED is set
+    app.add_middleware(ProfilingMiddleware)
+    
+    # Server span per request, outermost so it covers all other middleware
+    app.add_middleware(TracingMiddleware)
+    
     # Add routers
     app.include_router(health.router)
     app.include_router(anonymization.router)
     app.include_router(extended.router)
+    app.include_router(incremental.router)
+    app.include_router(streaming.router)
+    app.include_router(tabular.router)
+    app.include_router(audit.router)
+    app.include_router(admin.router)
     
     # Global exception handler
     @app.exception_handler(HTTPException)
@@ -70,7 +93,8 @@ def create_app() -> FastAPI:
             content=ErrorResponse(
                 error=exc.detail,
                 code=str(exc.status_code)
-            ).dict()
+            ).dict(),
+            headers=getattr(exc, "headers", None)
         )
     
     @app.exception_handler(Exception)
@@ -29,6 +29,10 @@ class AnalyzeRequest(BaseModel):
         le=1.0, 
         description="Minimum confidence score for entity detection"
     )
+    document_id: Optional[str] = Field(
+        default=None,
+        description="Identifier for stored audit results, defaults to a keyed hash of the text or a random id"
+    )
 
 
 class AnonymizeRequest(BaseModel):
@@ -52,6 +56,10 @@ class AnonymizeRequest(BaseModel):
         default=None,
         description="Custom anonymizers configuration"
     )
+    document_id: Optional[str] = Field(
+        default=None,
+        description="Identifier for stored audit results, defaults to a keyed hash of the text or a random id"
+    )
 
 
 class BatchAnonymizeRequest(BaseModel):
@@ -73,12 +81,14 @@ class EntityResult(BaseModel):
 class AnalyzeResponse(BaseModel):
     entities: List[EntityResult] = Field(..., description="List of detected entities")
     processing_time: float = Field(..., description="Processing time in seconds")
+    document_id: Optional[str] = Field(default=None, description="Identifier the results were stored under")
 
 
 class AnonymizeResponse(BaseModel):
     text: str = Field(..., description="Anonymized text")
     entities: List[EntityResult] = Field(..., description="List of anonymized entities")
     processing_time: float = Field(..., description="Processing time in seconds")
+    document_id: Optional[str] = Field(default=None, description="Identifier the results were stored under")
 
 
 class BatchAnonymizeResponse(BaseModel):
@@ -103,3 +113,52 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error message")
     detail: Optional[str] = Field(default=None, description="Detailed error information")
     code: Optional[str] = Field(default=None, description="Error code")
+
+
+class TextEdit(BaseModel):
+    start: int = Field(..., ge=0, description="Start offset of the replaced range in the current text")
+    end: int = Field(..., ge=0, description="End offset (exclusive) of the replaced range in the current text")
+    text: str = Field(default="", description="Inserted text, empty for a pure deletion")
+
+
+class IncrementalSessionRequest(BaseModel):
+    document_id: str = Field(..., description="Client chosen identifier of the edited document")
+    text: str = Field(..., description="Full initial text of the document")
+    entities: Optional[List[str]] = Field(default=None, description="List of entity types to detect")
+    language: str = Field(default="en", description="Language of the text")
+    score_threshold: float = Field(default=0.35, ge=0.0, le=1.0, description="Minimum confidence score")
+
+
+class IncrementalUpdateRequest(BaseModel):
+    edits: List[TextEdit] = Field(..., description="Edits applied in order, each relative to the text after the previous one")
+    base_version: Optional[int] = Field(
+        default=None,
+        description="Version the edits were made against. Rejected with 409 if the session has moved on"
+    )
+
+
+class IncrementalAnalyzeResponse(BaseModel):
+    document_id: str = Field(..., description="Identifier of the edited document")
+    version: int = Field(..., description="Session version after applying the request")
+    entities: List[EntityResult] = Field(..., description="Entities of the whole current document")
+    reanalyzed_ranges: List[List[int]] = Field(..., description="[start, end) ranges that were analyzed again")
+    processing_time: float = Field(..., description="Processing time in seconds")
+
+
+class ColumnProfileMode(str, Enum):
+    NER = "ner"  # Full analyzer including the NLP model
+    REGEX = "regex"  # Pattern recognizers only, for structured columns
+
+
+class ColumnProfile(BaseModel):
+    entities: Optional[List[str]] = Field(default=None, description="Entity types to detect in this column")
+    mode: ColumnProfileMode = Field(default=ColumnProfileMode.NER, description="Detection mode for this column")
+    language: str = Field(default="en", description="Language of the column values")
+    score_threshold: float = Field(default=0.35, ge=0.0, le=1.0, description="Minimum confidence score")
+
+
+class ImageOutputFormat(str, Enum):
+    SOURCE = "source"  # Same format as the upload, PNG when it cannot be written
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
@@ -0,0 +1,206 @@
+"""
+Pre-fork multi-worker server.
+
+The parent process loads and warms up the Presidio engines once, freezes the
+garbage collector and then forks the workers, so the spaCy model and the
+recognizer registry live in copy-on-write pages shared by all workers instead
+of being loaded once per worker.
+"""
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import threading
+from typing import Dict, Optional
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_memory_usage(pid: int) -> Optional[Dict[str, int]]:
+    """Read memory counters of a process in KiB from /proc, None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            usage = {}
+            for line in smaps:
+                name, _, value = line.partition(":")
+                if name in MEMORY_FIELDS:
+                    usage[name] = int(value.split()[0])
+            return usage
+    except (OSError, ValueError):
+        return None
+
+
+def log_memory_report(parent_pid: int, worker_pids):
+    """Log shared and private memory of the parent and every worker"""
+    rows = [("parent", parent_pid)] + [(f"worker {i + 1}", pid) for i, pid in enumerate(worker_pids)]
+    total_private = 0
+
+    for name, pid in rows:
+        usage = read_memory_usage(pid)
+        if usage is None:
+            logger.info(f"Memory report unavailable for {name} (pid {pid})")
+            continue
+
+        private = usage["Private_Clean"] + usage["Private_Dirty"]
+        shared = usage["Shared_Clean"] + usage["Shared_Dirty"]
+        total_private += private
+        logger.info(
+            f"Memory {name} (pid {pid}): rss={usage['Rss'] // 1024}MiB pss={usage['Pss'] // 1024}MiB "
+            f"shared={shared // 1024}MiB private={private // 1024}MiB"
+        )
+
+    logger.info(f"Memory total private across processes: {total_private // 1024}MiB")
+
+
+class RestartBackoff:
+    """
+    Restart delays of workers that exit.
+
+    A worker that dies within `stable_after` seconds of starting counts as a
+    failed start; the delay before its restart doubles with every consecutive
+    failed start, up to `max_delay`. After `max_failures` of them (0 for never)
+    no delay is returned: the worker cannot start and the server gives up.
+    """
+
+    def __init__(self, stable_after: float = 30.0, max_delay: float = 60.0, max_failures: int = 10):
+        self.stable_after = stable_after
+        self.max_delay = max_delay
+        self.max_failures = max_failures
+        self.failures: Dict[int, int] = {}
+
+    def delay(self, slot: int, uptime: float) -> Optional[float]:
+        failures = self.failures[slot] = self.failures.get(slot, 0) + 1 if uptime < self.stable_after else 0
+        if self.max_failures and failures >= self.max_failures:
+            return None
+        return min(self.max_delay, 2.0 ** (failures - 1)) if failures else 0.0
+
+
+def _create_socket() -> socket.socket:
+    family = socket.AF_INET6 if ":" in settings.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.host, settings.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket):
+    """Serve requests in a forked worker, never returns"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+
+    exit_code = 0
+    try:
+        config = uvicorn.Config(app, log_level=settings.log_level.lower(), lifespan="on")
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception:
+        logger.exception("Worker crashed")
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def serve_prefork(workers: int):
+    """Load engines in this process, fork `workers` children and supervise them"""
+    from app.main import app
+    from app.services.engines import warmup_engines
+
+    # Collections during warmup would only move objects between generations
+    gc.disable()
+    warmup_engines()
+
+    if settings.gc_freeze:
+        # Move everything allocated so far into the permanent generation, so the
+        # workers' collector never writes to (and un-shares) the model's pages
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Froze {gc.get_freeze_count()} objects before forking")
+
+    sock = _create_socket()
+    logger.info(f"Listening on {settings.host}:{settings.port} with {workers} workers")
+
+    children: Dict[int, int] = {}
+    started: Dict[int, float] = {}
+    restarts: Dict[int, float] = {}  # Slot to the time of its delayed restart
+    backoff = RestartBackoff(max_delay=settings.worker_restart_backoff_max, max_failures=settings.worker_max_failed_starts)
+    shutting_down = threading.Event()
+    exit_code = 0
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, sock)
+        children[pid] = slot
+        started[slot] = time.monotonic()
+        logger.info(f"Started worker {slot + 1} (pid {pid})")
+
+    def shutdown(signum, frame):
+        shutting_down.set()
+        restarts.clear()
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for slot in range(workers):
+        spawn(slot)
+
+    gc.enable()
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    report_at = time.monotonic() + settings.memory_report_delay
+    while children or restarts:
+        now = time.monotonic()
+        if report_at and now >= report_at:
+            log_memory_report(os.getpid(), list(children))
+            report_at = None
+
+        for slot, restart_at in list(restarts.items()):
+            # The signal handler may clear the restarts at any point
+            if now >= restart_at and restarts.pop(slot, None) is not None and not shutting_down.is_set():
+                spawn(slot)
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        except InterruptedError:
+            continue
+
+        if pid == 0:
+            time.sleep(0.5)
+            continue
+
+        slot = children.pop(pid)
+        if shutting_down.is_set():
+            continue
+
+        delay = backoff.delay(slot, time.monotonic() - started[slot])
+        if delay is None:
+            logger.error(
+                f"Worker {slot + 1} (pid {pid}) exited with status {status} "
+                f"{backoff.failures[slot]} times right after starting, shutting down"
+            )
+            exit_code = 1
+            shutdown(None, None)
+            continue
+
+        logger.warning(f"Worker {slot + 1} (pid {pid}) exited with status {status}, restarting in {delay:.0f}s")
+        restarts[slot] = time.monotonic() + delay
+
+    sock.close()
+    logger.info("All workers stopped")
+    sys.exit(exit_code)
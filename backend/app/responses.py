@@ -0,0 +1,153 @@
+"""
+Response shaping and content negotiation.
+
+Routes returning potentially large payloads pass them through
+`encode_response`, which drops echoed input text on request, can return
+entity spans as parallel arrays, and picks the body encoding (orjson or
+msgpack) and compression (brotli or gzip) from the request headers.
+"""
+import gzip
+import json
+from enum import Enum
+from typing import Any, List
+
+from fastapi import Query, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.config import settings
+from app.spans import SpanList
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Keys holding a copy of the caller's input
+ECHO_FIELDS = ("original_text", "ocr_text")
+ENTITY_FIELDS = ("entity_type", "start", "end", "score", "text")
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class SpanFormat(str, Enum):
+    OBJECTS = "objects"
+    COLUMNS = "columns"
+
+
+class ResponseOptions(BaseModel):
+    omit_original_text: bool = False
+    omit_entity_text: bool = False
+    span_format: SpanFormat = SpanFormat.OBJECTS
+
+    @property
+    def is_default(self) -> bool:
+        return not self.omit_original_text and not self.omit_entity_text and self.span_format == SpanFormat.OBJECTS
+
+
+def get_response_options(
+    omit_original_text: bool = Query(False, description="Leave out echoed input text (original_text, ocr_text)"),
+    omit_entity_text: bool = Query(False, description="Leave out the text of detected entities, clients can slice it"),
+    span_format: SpanFormat = Query(SpanFormat.OBJECTS, description="Return entities as objects or as parallel arrays")
+) -> ResponseOptions:
+    """Dependency reading response shaping options from the query string"""
+    return ResponseOptions(
+        omit_original_text=omit_original_text,
+        omit_entity_text=omit_entity_text,
+        span_format=span_format
+    )
+
+
+def _to_plain(value: Any):
+    if isinstance(value, SpanList):
+        return value.to_rows()
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def _shape_entities(entities: List[Any], options: ResponseOptions):
+    if isinstance(entities, SpanList):
+        if options.span_format == SpanFormat.COLUMNS:
+            return entities.to_columns(include_text=not options.omit_entity_text)
+        return entities.to_rows(include_text=not options.omit_entity_text)
+
+    fields = [field for field in ENTITY_FIELDS if not (options.omit_entity_text and field == "text")]
+    rows = [entity if isinstance(entity, dict) else entity.dict() for entity in entities]
+
+    if options.span_format == SpanFormat.COLUMNS:
+        return {field: [row[field] for row in rows] for field in fields}
+
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def shape_payload(payload: Any, options: ResponseOptions):
+    """Apply the shaping options to a response payload, returning plain data"""
+    if isinstance(payload, BaseModel):
+        payload = payload.dict()
+
+    if isinstance(payload, dict):
+        shaped = {}
+        for key, value in payload.items():
+            if options.omit_original_text and key in ECHO_FIELDS:
+                continue
+            if key == "entities" and isinstance(value, (list, SpanList)):
+                shaped[key] = _shape_entities(value, options)
+            else:
+                shaped[key] = shape_payload(value, options)
+        return shaped
+
+    if isinstance(payload, list):
+        return [shape_payload(item, options) for item in payload]
+
+    return payload
+
+
+def _encode_body(request: Request, payload: Any):
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return msgpack.packb(payload, default=_to_plain), "application/msgpack"
+
+    if orjson is not None:
+        return orjson.dumps(payload, default=_to_plain), "application/json"
+
+    return json.dumps(payload, default=_to_plain, separators=(",", ":")).encode(), "application/json"
+
+
+def _compress_body(request: Request, body: bytes):
+    if len(body) < settings.response_compression_min_size:
+        return body, None
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if brotli is not None and "br" in accept_encoding:
+        return brotli.compress(body, quality=settings.response_brotli_quality), "br"
+    if "gzip" in accept_encoding:
+        return gzip.compress(body, compresslevel=settings.response_gzip_level), "gzip"
+
+    return body, None
+
+
+def encode_response(request: Request, payload: Any, options: ResponseOptions = None, status_code: int = 200) -> Response:
+    """Shape, encode and compress a payload according to the options and request headers"""
+    if options is not None and not options.is_default:
+        payload = shape_payload(payload, options)
+
+    body, media_type = _encode_body(request, payload)
+    body, content_encoding = _compress_body(request, body)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
@@ -3,25 +3,36 @@ import logging
 from typing import List, Optional, Dict, Any
 from abc import ABC, abstractmethod
 
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
-import httpx
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.services.batching import get_analysis_batcher
+from app.services.engines import get_analyzer_engine, get_anonymizer_engine
+from app.services.hybrid_routing import get_hybrid_router
+from app.services.operator_plans import get_operator_plan
+from app.services.prefilter import get_prefilter
+from app.services.tracing import traced_service_method
+from app.services.upstream import get_upstream_pool
 from app.models import (
     AnalyzeRequest,
     AnonymizeRequest,
     AnalyzeResponse,
     AnonymizeResponse,
-    EntityResult,
     EngineInfo
 )
+from app.spans import SpanList
 
 logger = logging.getLogger(__name__)
 
 
 class BaseAnonymizationService(ABC):
-    """Base class for anonymization services"""
+    """
+    Base class for anonymization services.
+    
+    Responses carry their entities as a SpanList and are built with
+    `construct()`, skipping per-entity validation; `encode_response`
+    serializes them directly.
+    """
     
     @abstractmethod
     async def analyze(self, request: AnalyzeRequest) -> AnalyzeResponse:
@@ -40,82 +51,101 @@ class LocalPresidioService(BaseAnonymizationService):
     """Local Presidio service using built-in engines"""
     
     def __init__(self):
-        self.analyzer = AnalyzerEngine()
-        self.anonymizer = AnonymizerEngine()
-        logger.info("Initialized local Presidio engines")
+        self.analyzer = get_analyzer_engine()
+        self.anonymizer = get_anonymizer_engine()
+        logger.debug("Initialized local Presidio service")
+    
+    async def _analyze_text(self, text: str, entities: Optional[List[str]], language: str, score_threshold: float):
+        """Run the analyzer behind the PII pre-filter when enabled"""
+        prefilter = get_prefilter(self.analyzer)
+        if prefilter is None:
+            return await self._run_analyzer(text, entities, language, score_threshold)
+        
+        return await prefilter.analyze(
+            text,
+            language,
+            entities,
+            score_threshold,
+            lambda screened: self._run_analyzer(screened, entities, language, score_threshold)
+        )
+    
+    async def _run_analyzer(self, text: str, entities: Optional[List[str]], language: str, score_threshold: float):
+        """Run the analyzer, through the micro-batcher when enabled"""
+        if settings.micro_batching_enabled:
+            return await get_analysis_batcher().analyze(
+                text,
+                language=language,
+                entities=entities,
+                score_threshold=score_threshold
+            )
+        
+        return self.analyzer.analyze(
+            text=text,
+            entities=entities,
+            language=language,
+            score_threshold=score_threshold
+        )
     
+    @traced_service_method("service.analyze")
     async def analyze(self, request: AnalyzeRequest) -> AnalyzeResponse:
         start_time = time.time()
         
         try:
             # Run analysis
-            analyzer_results = self.analyzer.analyze(
-                text=request.text,
-                entities=request.entities,
-                language=request.language,
-                score_threshold=request.score_threshold
+            analyzer_results = await self._analyze_text(
+                request.text,
+                request.entities,
+                request.language,
+                request.score_threshold
             )
             
-            # Convert results to our model
-            entities = [
-                EntityResult(
-                    entity_type=result.entity_type,
-                    start=result.start,
-                    end=result.end,
-                    text=request.text[result.start:result.end],
-                    score=result.score
-                )
-                for result in analyzer_results
-            ]
+            # Compact spans, serialized directly by the response encoder
+            entities = SpanList.from_results(request.text, analyzer_results)
             
             processing_time = time.time() - start_time
             
-            return AnalyzeResponse(
+            return AnalyzeResponse.construct(
                 entities=entities,
-                processing_time=processing_time
+                processing_time=processing_time,
+                document_id=None
             )
             
         except Exception as e:
             logger.error(f"Analysis failed: {str(e)}")
             raise
     
+    @traced_service_method("service.anonymize")
     async def anonymize(self, request: AnonymizeRequest) -> AnonymizeResponse:
         start_time = time.time()
         
         try:
+            # Invalid operator configs fail before any analysis work
+            plan = get_operator_plan(request.anonymization_mode, request.anonymizers)
+            
             # First analyze the text
-            analyzer_results = self.analyzer.analyze(
-                text=request.text,
-                entities=request.entities,
-                language=request.language,
-                score_threshold=request.score_threshold
+            analyzer_results = await self._analyze_text(
+                request.text,
+                request.entities,
+                request.language,
+                request.score_threshold
             )
             
-            # Then anonymize
+            # Then anonymize with the compiled operators of the requested mode
             anonymization_result = self.anonymizer.anonymize(
                 text=request.text,
                 analyzer_results=analyzer_results,
-                anonymizers=request.anonymizers
+                operators=plan.operators_for(analyzer_results)
             )
             
-            # Convert analyzer results to our model
-            entities = [
-                EntityResult(
-                    entity_type=result.entity_type,
-                    start=result.start,
-                    end=result.end,
-                    text=request.text[result.start:result.end],
-                    score=result.score
-                )
-                for result in analyzer_results
-            ]
+            entities = SpanList.from_results(request.text, analyzer_results)
             
             processing_time = time.time() - start_time
             
-            return AnonymizeResponse(
+            return AnonymizeResponse.construct(
                 text=anonymization_result.text,
                 entities=entities,
-                processing_time=processing_time
+                processing_time=processing_time,
+                document_id=None
             )
             
         except Exception as e:
@@ -124,7 +154,7 @@ class LocalPresidioService(BaseAnonymizationService):
     
     async def get_engine_info(self) -> EngineInfo:
         supported_entities = self.analyzer.get_supported_entities()
-        supported_languages = self.analyzer.get_supported_languages()
+        supported_languages = self.analyzer.supported_languages
         
         return EngineInfo(
             name="presidio-local",
@@ -134,22 +164,55 @@ class LocalPresidioService(BaseAnonymizationService):
         )
 
 
+class HybridPresidioService(LocalPresidioService):
+    """Local pattern recognizers with NER offloaded to the external analyzer pool"""
+    
+    def __init__(self):
+        super().__init__()
+        self.router = get_hybrid_router(self.analyzer)
+    
+    async def _analyze_text(self, text: str, entities: Optional[List[str]], language: str, score_threshold: float):
+        """Route the analysis between the local engine and the external analyzer"""
+        return await self.router.analyze(
+            text,
+            language,
+            entities,
+            score_threshold,
+            lambda: super(HybridPresidioService, self)._analyze_text(text, entities, language, score_threshold)
+        )
+    
+    async def _run_analyzer(self, text: str, entities: Optional[List[str]], language: str, score_threshold: float):
+        """Run local analyses off the event loop, so the router sees how many are in flight"""
+        if settings.micro_batching_enabled:
+            return await super()._run_analyzer(text, entities, language, score_threshold)
+        
+        return await run_in_threadpool(
+            self.analyzer.analyze,
+            text=text,
+            entities=entities,
+            language=language,
+            score_threshold=score_threshold
+        )
+    
+    async def get_engine_info(self) -> EngineInfo:
+        engine_info = await super().get_engine_info()
+        engine_info.name = "presidio-hybrid"
+        return engine_info
+
+
 class ExternalPresidioService(BaseAnonymizationService):
     """External Presidio service using HTTP APIs (compatible with current PHP implementation)"""
     
     def __init__(self):
-        self.analyzer_url = settings.presidio_analyzer_api_url
-        self.anonymizer_url = settings.presidio_anonymizer_api_url
-        self.analyzer_key = settings.presidio_analyzer_api_key
-        self.anonymizer_key = settings.presidio_anonymizer_api_key
-        logger.info(f"Initialized external Presidio service: analyzer={self.analyzer_url}, anonymizer={self.anonymizer_url}")
-    
-    def _build_headers(self, key: Optional[str]) -> Dict[str, str]:
-        headers = {"Content-Type": "application/json"}
-        if key:
-            headers["Authorization"] = f"Bearer {key}"
-        return headers
+        # Pools are shared by all requests so connections, breakers and latencies persist
+        self.analyzer_pool = get_upstream_pool("analyzer")
+        self.anonymizer_pool = get_upstream_pool("anonymizer")
+        logger.debug(
+            f"Using external Presidio service: analyzer={settings.presidio_analyzer_api_url}, "
+            f"anonymizer={settings.presidio_anonymizer_api_url}"
+        )
     
+    @traced_service_method("service.analyze")
     async def analyze(self, request: AnalyzeRequest) -> AnalyzeResponse:
         start_time = time.time()
         
@@ -163,43 +226,32 @@ class ExternalPresidioService(BaseAnonymizationService):
             if request.score_threshold != 0.35:  # Only add if different from default
                 body["score_threshold"] = request.score_threshold
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.analyzer_url}/analyze",
-                    json=body,
-                    headers=self._build_headers(self.analyzer_key),
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                analyzer_results = response.json()
+            # Analysis has no side effects, so it may be retried and hedged
+            analyzer_results = await self.analyzer_pool.post("/analyze", body, idempotent=True)
             
-            # Convert results to our model
-            entities = [
-                EntityResult(
-                    entity_type=result["entity_type"],
-                    start=result["start"],
-                    end=result["end"],
-                    text=request.text[result["start"]:result["end"]],
-                    score=result["score"]
-                )
-                for result in analyzer_results
-            ]
+            entities = SpanList.from_dicts(request.text, analyzer_results)
             
             processing_time = time.time() - start_time
             
-            return AnalyzeResponse(
+            return AnalyzeResponse.construct(
                 entities=entities,
-                processing_time=processing_time
+                processing_time=processing_time,
+                document_id=None
             )
             
         except Exception as e:
             logger.error(f"External analysis failed: {str(e)}")
             raise
     
+    @traced_service_method("service.anonymize")
     async def anonymize(self, request: AnonymizeRequest) -> AnonymizeResponse:
         start_time = time.time()
         
         try:
+            plan = get_operator_plan(request.anonymization_mode, request.anonymizers)
+            # Refuses operators the external anonymizer cannot apply before anything is analyzed
+            anonymizers = plan.external_anonymizers()
+            
             # First analyze
             analyze_request = AnalyzeRequest(
                 text=request.text,
@@ -210,40 +262,25 @@ class ExternalPresidioService(BaseAnonymizationService):
             analyze_response = await self.analyze(analyze_request)
             
             # Convert entities back to analyzer format for anonymizer
-            analyzer_results = [
-                {
-                    "entity_type": entity.entity_type,
-                    "start": entity.start,
-                    "end": entity.end,
-                    "score": entity.score
-                }
-                for entity in analyze_response.entities
-            ]
+            analyzer_results = analyze_response.entities.to_analyzer_dicts()
             
             # Then anonymize
             body = {
                 "text": request.text,
-                "analyzer_results": analyzer_results
+                "analyzer_results": analyzer_results,
+                "anonymizers": anonymizers
             }
-            if request.anonymizers:
-                body["anonymizers"] = request.anonymizers
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.anonymizer_url}/anonymize",
-                    json=body,
-                    headers=self._build_headers(self.anonymizer_key),
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                anonymization_result = response.json()
+            # Operators such as encrypt are not deterministic, only retried when the call never reached a replica
+            anonymization_result = await self.anonymizer_pool.post("/anonymize", body, idempotent=False)
             
             processing_time = time.time() - start_time
             
-            return AnonymizeResponse(
+            return AnonymizeResponse.construct(
                 text=anonymization_result.get("text", ""),
                 entities=analyze_response.entities,
-                processing_time=processing_time
+                processing_time=processing_time,
+                document_id=None
             )
             
         except Exception as e:
@@ -270,5 +307,7 @@ def get_anonymization_service() -> BaseAnonymizationService:
     """Factory function to get the appropriate anonymization service"""
     if settings.anonymization_mode == "local":
         return LocalPresidioService()
+    elif settings.anonymization_mode == "hybrid":
+        return HybridPresidioService()
     else:
         return ExternalPresidioService()
@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerResult
+
+from app.config import settings
+from app.services.engines import get_analyzer_engine
+
+logger = logging.getLogger(__name__)
+
+BatchKey = Tuple[str, Optional[Tuple[str, ...]], float]
+
+
+class AnalysisBatcher:
+    """
+    Collects concurrent analysis calls for a few milliseconds and runs them as
+    one batch through spaCy's `nlp.pipe`, grouped by language, entities and
+    score threshold.
+    """
+
+    def __init__(self, analyzer: AnalyzerEngine, max_batch_size: int, max_delay: float):
+        self.batch_analyzer = BatchAnalyzerEngine(analyzer_engine=analyzer)
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: Dict[BatchKey, List[Tuple[str, asyncio.Future, float]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._stats = {"batches": 0, "items": 0, "full_batches": 0, "fill_ratio_sum": 0.0, "wait_time_sum": 0.0}
+        # A single thread keeps spaCy off the event loop without running pipelines concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis-batch")
+
+    async def analyze(
+        self,
+        text: str,
+        language: str = "en",
+        entities: Optional[List[str]] = None,
+        score_threshold: float = 0.35
+    ) -> List[RecognizerResult]:
+        """Queue a text for the next batch of its group and wait for its results"""
+        loop = asyncio.get_running_loop()
+        key: BatchKey = (language, tuple(sorted(entities)) if entities else None, score_threshold)
+        future = loop.create_future()
+
+        group = self._pending.setdefault(key, [])
+        group.append((text, future, time.monotonic()))
+
+        if len(group) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_delay, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        group = self._pending.pop(key, None)
+        if group:
+            self._record_batch(group)
+            asyncio.get_running_loop().create_task(self._run(key, group))
+
+    def _record_batch(self, group):
+        now = time.monotonic()
+        self._stats["batches"] += 1
+        self._stats["items"] += len(group)
+        self._stats["full_batches"] += len(group) >= self.max_batch_size
+        self._stats["fill_ratio_sum"] += len(group) / self.max_batch_size
+        self._stats["wait_time_sum"] += sum(now - queued_at for _, _, queued_at in group)
+
+    def get_stats(self) -> dict:
+        """Batch counters and averages since startup"""
+        batches = self._stats["batches"]
+        items = self._stats["items"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": batches,
+            "items": items,
+            "full_batches": self._stats["full_batches"],
+            "average_batch_size": items / batches if batches else 0,
+            "average_fill_ratio": self._stats["fill_ratio_sum"] / batches if batches else 0,
+            "average_wait_ms": self._stats["wait_time_sum"] / items * 1000 if items else 0
+        }
+
+    async def _run(self, key: BatchKey, group: List[Tuple[str, asyncio.Future, float]]):
+        language, entities, score_threshold = key
+        texts = [text for text, _, _ in group]
+
+        try:
+            batch_results = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                lambda: self.batch_analyzer.analyze_iterator(
+                    texts,
+                    language=language,
+                    entities=list(entities) if entities else None,
+                    score_threshold=score_threshold
+                )
+            )
+        except Exception as e:
+            logger.error(f"Batch analysis of {len(texts)} texts failed: {str(e)}")
+            for _, future, _ in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), results in zip(group, batch_results):
+            if not future.done():
+                future.set_result(results)
+
+
+_batcher: Optional[AnalysisBatcher] = None
+
+
+def get_analysis_batcher() -> AnalysisBatcher:
+    """Get the process-wide batcher in front of the shared analyzer engine"""
+    global _batcher
+
+    if _batcher is None:
+        _batcher = AnalysisBatcher(
+            get_analyzer_engine(),
+            max_batch_size=settings.micro_batch_max_size,
+            max_delay=settings.micro_batch_max_delay_ms / 1000
+        )
+
+    return _batcher
+
+
+def get_batching_stats() -> Optional[dict]:
+    """Stats of the batcher, None while nothing has been batched in this process"""
+    return _batcher.get_stats() if _batcher is not None else None
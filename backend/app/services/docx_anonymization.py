@@ -0,0 +1,100 @@
+import logging
+from typing import Iterator, List, Tuple
+
+from docx.document import Document as DocumentObject
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from presidio_analyzer import RecognizerResult
+
+logger = logging.getLogger(__name__)
+
+# Runs of a paragraph in document order, including those wrapped in hyperlinks,
+# tracked insertions, smart tags, simple fields and inline content controls
+PARAGRAPH_RUNS = (
+    "./w:r | ./w:hyperlink/w:r | ./w:ins/w:r | ./w:smartTag/w:r"
+    " | ./w:fldSimple/w:r | ./w:sdt/w:sdtContent/w:r"
+)
+
+
+def _iter_table_paragraphs(table: Table, seen_cells: set) -> Iterator[Paragraph]:
+    for row in table.rows:
+        for cell in row.cells:
+            # Merged cells show up once per grid position
+            if id(cell._tc) in seen_cells:
+                continue
+            seen_cells.add(id(cell._tc))
+
+            yield from cell.paragraphs
+            for nested_table in cell.tables:
+                yield from _iter_table_paragraphs(nested_table, seen_cells)
+
+
+def _iter_container_paragraphs(container, seen_cells: set) -> Iterator[Paragraph]:
+    yield from container.paragraphs
+    for table in container.tables:
+        yield from _iter_table_paragraphs(table, seen_cells)
+
+
+def iter_paragraphs(document: DocumentObject) -> Iterator[Paragraph]:
+    """Lazily yield every paragraph of the body, tables, headers and footers"""
+    seen_cells: set = set()
+    yield from _iter_container_paragraphs(document, seen_cells)
+
+    for section in document.sections:
+        for part in (
+            section.header, section.first_page_header, section.even_page_header,
+            section.footer, section.first_page_footer, section.even_page_footer
+        ):
+            if not part.is_linked_to_previous:
+                yield from _iter_container_paragraphs(part, seen_cells)
+
+
+def paragraph_runs(paragraph: Paragraph) -> List[Run]:
+    """
+    Every run of a paragraph; `paragraph.runs` only has the direct children,
+    missing e.g. the text of hyperlinks.
+    """
+    return [Run(r, paragraph) for r in paragraph._p.xpath(PARAGRAPH_RUNS)]
+
+
+def paragraph_text(paragraph: Paragraph) -> str:
+    """Text of a paragraph exactly as the concatenation of its runs"""
+    return "".join(run.text for run in paragraph_runs(paragraph))
+
+
+def resolve_overlaps(results: List[RecognizerResult]) -> List[RecognizerResult]:
+    """Keep the highest scoring (then longest) span of every overlapping group"""
+    accepted: List[RecognizerResult] = []
+    for result in sorted(results, key=lambda r: (-r.score, r.start - r.end)):
+        if all(result.end <= other.start or result.start >= other.end for other in accepted):
+            accepted.append(result)
+    return sorted(accepted, key=lambda r: r.start)
+
+
+def replace_spans_in_runs(paragraph: Paragraph, replacements: List[Tuple[int, int, str]]):
+    """
+    Replace [start, end) ranges of the paragraph text, which may cross run boundaries.
+
+    The replacement goes into the run where the span starts, keeping that run's
+    formatting; the covered text is removed from the following runs.
+    """
+    runs = paragraph_runs(paragraph)
+    run_starts = []
+    offset = 0
+    for run in runs:
+        run_starts.append(offset)
+        offset += len(run.text)
+
+    # Right to left, so run offsets of spans further left stay valid
+    for start, end, replacement in sorted(replacements, reverse=True):
+        for run, run_start in zip(runs, run_starts):
+            text = run.text
+            run_end = run_start + len(text)
+            if run_end <= start or run_start >= end:
+                continue
+
+            if run_start <= start:
+                run.text = text[:start - run_start] + replacement + text[max(0, end - run_start):]
+            else:
+                run.text = text[end - run_start:]
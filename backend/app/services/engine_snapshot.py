@@ -0,0 +1,130 @@
+import json
+import time
+import shutil
+import pickle
+import logging
+from pathlib import Path
+from typing import Optional
+from importlib.metadata import version
+
+import numpy
+import spacy
+from presidio_analyzer import AnalyzerEngine
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+REGISTRY = "registry.pkl"
+FORMAT_VERSION = 1
+
+
+def _versions() -> dict:
+    return {
+        "format": FORMAT_VERSION,
+        "spacy": spacy.__version__,
+        "numpy": numpy.__version__,
+        "presidio_analyzer": version("presidio-analyzer")
+    }
+
+
+def build_snapshot(analyzer: AnalyzerEngine, path: str) -> dict:
+    """
+    Serialize a fully configured analyzer into a snapshot directory.
+
+    Every spaCy pipeline is written with `Language.to_disk`, leaving out the
+    components Presidio disables, and its vectors table is moved next to it as
+    a plain `.npy` file so it can be memory-mapped on restore. The recognizer
+    registry is pickled as a whole. Pass a freshly built analyzer: recognizers
+    wrapped for timing cannot be pickled.
+    """
+    nlp_engine = analyzer.nlp_engine
+    if not isinstance(nlp_engine, SpacyNlpEngine):
+        raise ValueError(f"Snapshots need a spaCy NLP engine, got {type(nlp_engine).__name__}")
+
+    target = Path(path)
+    # Build next to the target and swap, a half written snapshot is never picked up
+    staging = target.with_name(target.name + ".building")
+    shutil.rmtree(staging, ignore_errors=True)
+    (staging / "vectors").mkdir(parents=True)
+
+    vectors = {}
+    for language, nlp in nlp_engine.nlp.items():
+        for name in list(nlp.disabled):
+            nlp.remove_pipe(name)
+        nlp_dir = staging / "nlp" / language
+        nlp_dir.parent.mkdir(exist_ok=True)
+        nlp.to_disk(nlp_dir)
+
+        vectors_file = nlp_dir / "vocab" / "vectors"
+        if vectors_file.is_file() and nlp.vocab.vectors.shape[0]:
+            vectors_file.replace(staging / "vectors" / f"{language}.npy")
+            vectors[language] = list(nlp.vocab.vectors.shape)
+
+    with open(staging / REGISTRY, "wb") as registry_file:
+        pickle.dump(analyzer.registry, registry_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    manifest = {
+        "versions": _versions(),
+        "created_at": time.time(),
+        "languages": list(nlp_engine.nlp),
+        "supported_languages": list(analyzer.supported_languages),
+        "recognizers": len(analyzer.registry.recognizers),
+        "vectors": vectors
+    }
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    if target.exists():
+        shutil.rmtree(target)
+    staging.rename(target)
+    logger.info(f"Wrote engine snapshot of {manifest['languages']} with {manifest['recognizers']} recognizers to {target}")
+    return manifest
+
+
+def read_manifest(path: str) -> Optional[dict]:
+    """The snapshot's manifest, or None when there is no usable snapshot at `path`"""
+    manifest_file = Path(path) / MANIFEST
+    if not manifest_file.is_file():
+        return None
+
+    manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+    if manifest.get("versions") != _versions():
+        logger.warning(
+            f"Engine snapshot {path} was built with {manifest.get('versions')}, running {_versions()}; ignoring it"
+        )
+        return None
+    return manifest
+
+
+def restore_analyzer(path: str, mmap_vectors: bool = True) -> Optional[AnalyzerEngine]:
+    """
+    Restore an analyzer from a snapshot built by `build_snapshot`.
+
+    Vectors are memory-mapped read-only when `mmap_vectors` is set, so they
+    are paged in on use and shared by all processes on the host. Returns None
+    when there is no snapshot for this spaCy/Presidio version. The registry is
+    unpickled, only restore snapshots this deployment built itself.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        return None
+
+    snapshot = Path(path)
+    nlp_engine = SpacyNlpEngine.__new__(SpacyNlpEngine)
+    nlp_engine.nlp = {}
+    for language in manifest["languages"]:
+        nlp = spacy.load(snapshot / "nlp" / language)
+        if language in manifest["vectors"]:
+            nlp.vocab.vectors.data = numpy.load(
+                snapshot / "vectors" / f"{language}.npy", mmap_mode="r" if mmap_vectors else None
+            )
+        nlp_engine.nlp[language] = nlp
+
+    with open(snapshot / REGISTRY, "rb") as registry_file:
+        registry = pickle.load(registry_file)
+
+    return AnalyzerEngine(
+        registry=registry,
+        nlp_engine=nlp_engine,
+        supported_languages=manifest["supported_languages"]
+    )
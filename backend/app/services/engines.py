@@ -0,0 +1,100 @@
+import time
+import logging
+import threading
+from typing import Optional
+
+from presidio_analyzer import AnalyzerEngine
+from presidio_anonymizer import AnonymizerEngine
+from presidio_image_redactor import ImageRedactorEngine, ImageAnalyzerEngine
+
+from app.config import settings
+from app.services.ocr import get_ocr_backend
+from app.services.engine_snapshot import restore_analyzer
+from app.services.profiling import instrument_analyzer
+
+logger = logging.getLogger(__name__)
+
+# Process-wide engines shared by all services. Loading the spaCy model and the
+# recognizer registry is expensive, so every service reuses the same instances
+# and forked workers inherit them from the parent process.
+_lock = threading.Lock()
+_analyzer: Optional[AnalyzerEngine] = None
+_anonymizer: Optional[AnonymizerEngine] = None
+_image_redactor: Optional[ImageRedactorEngine] = None
+_analyzer_load: Optional[dict] = None
+
+
+def get_analyzer_engine() -> AnalyzerEngine:
+    """Get the shared analyzer engine, restored from ENGINE_SNAPSHOT_DIR when there is a snapshot"""
+    global _analyzer, _analyzer_load
+
+    if _analyzer is None:
+        with _lock:
+            if _analyzer is None:
+                start_time = time.time()
+                analyzer, source = None, "built"
+                if settings.engine_snapshot_dir:
+                    try:
+                        analyzer = restore_analyzer(settings.engine_snapshot_dir, settings.engine_snapshot_mmap_vectors)
+                        source = "snapshot" if analyzer is not None else source
+                    except Exception as e:
+                        logger.error(f"Restoring engine snapshot {settings.engine_snapshot_dir} failed: {str(e)}")
+                if analyzer is None:
+                    analyzer = AnalyzerEngine()
+                load_seconds = time.time() - start_time
+                _analyzer_load = {"source": source, "seconds": load_seconds}
+                logger.info(f"Loaded analyzer engine in {load_seconds:.2f}s ({source})")
+                if settings.profiling_recognizer_timings:
+                    instrument_analyzer(analyzer)
+                _analyzer = analyzer
+
+    return _analyzer
+
+
+def get_analyzer_load_stats() -> Optional[dict]:
+    """How the analyzer engine was loaded (snapshot or built) and how long it took"""
+    return _analyzer_load
+
+
+def get_anonymizer_engine() -> AnonymizerEngine:
+    """Get the shared anonymizer engine"""
+    global _anonymizer
+
+    if _anonymizer is None:
+        with _lock:
+            if _anonymizer is None:
+                _anonymizer = AnonymizerEngine()
+
+    return _anonymizer
+
+
+def get_image_redactor_engine() -> ImageRedactorEngine:
+    """Get the shared image redactor, backed by the shared analyzer engine and OCR backend"""
+    global _image_redactor
+
+    if _image_redactor is None:
+        analyzer = get_analyzer_engine()
+        ocr = get_ocr_backend()
+        with _lock:
+            if _image_redactor is None:
+                _image_redactor = ImageRedactorEngine(
+                    image_analyzer_engine=ImageAnalyzerEngine(analyzer_engine=analyzer, ocr=ocr)
+                )
+
+    return _image_redactor
+
+
+def warmup_engines():
+    """Load all engines and run a small analysis so lazily built state exists up front"""
+    start_time = time.time()
+
+    analyzer = get_analyzer_engine()
+    anonymizer = get_anonymizer_engine()
+    get_image_redactor_engine()
+
+    sample = "John Smith lives in Berlin, call 212-555-0100 or mail john@example.com"
+    for language in analyzer.supported_languages:
+        results = analyzer.analyze(text=sample, language=language)
+        anonymizer.anonymize(text=sample, analyzer_results=results)
+
+    logger.info(f"Engines warmed up in {time.time() - start_time:.2f}s")
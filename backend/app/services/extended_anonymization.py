@@ -1,40 +1,53 @@
 import io
+import math
 import time
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import fitz  # PyMuPDF
-import pytesseract
 from PIL import Image, ImageDraw
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
-from presidio_image_redactor import ImageRedactorEngine
-from python_docx import Document
+from docx import Document
+from presidio_analyzer import BatchAnalyzerEngine, RecognizerResult
 
 from app.config import settings
-from app.models import EntityResult
+from app.models import AnonymizationMode, ImageOutputFormat
+from app.services.docx_anonymization import iter_paragraphs, paragraph_text, resolve_overlaps, replace_spans_in_runs
+from app.services.engines import get_analyzer_engine, get_anonymizer_engine, get_image_redactor_engine
+from app.services.operator_plans import get_operator_plan
+from app.services.ocr import get_ocr_backend
+from app.services.page_pipeline import PagePipeline
+from app.services.sentence_memo import SentenceMemo
+from app.services.tracing import annotate, start_span
+from app.services.tiled_image import TiledImageRedactor, count_pages
+from app.spans import SpanList
 
 logger = logging.getLogger(__name__)
 
+# Output formats the image redaction can write, by PIL format name
+IMAGE_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp", "TIFF": "tiff"}
+
 
 class ExtendedAnonymizationService:
     """Extended anonymization service with features from peterhubina/anonymization repository"""
     
     def __init__(self):
-        self.analyzer = AnalyzerEngine()
-        self.anonymizer = AnonymizerEngine()
-        self.image_redactor = ImageRedactorEngine()
-        
-        # Set Tesseract command if configured
-        if settings.tesseract_cmd:
-            pytesseract.pytesseract.tesseract_cmd = settings.tesseract_cmd
+        self.analyzer = get_analyzer_engine()
+        self.anonymizer = get_anonymizer_engine()
+        self.image_redactor = get_image_redactor_engine()
+        self.batch_analyzer = BatchAnalyzerEngine(analyzer_engine=self.analyzer)
+        self.ocr = get_ocr_backend()
         
-        logger.info("Initialized extended anonymization service")
+        logger.debug("Initialized extended anonymization service")
     
     async def anonymize_text_advanced(self, text: str, **kwargs) -> dict:
         """Advanced text anonymization with detailed analysis"""
         start_time = time.time()
         
         try:
+            plan = get_operator_plan(
+                kwargs.get('anonymization_mode', AnonymizationMode.REPLACE),
+                kwargs.get('anonymizers')
+            )
+            
             # Analyze text
             analyzer_results = self.analyzer.analyze(
                 text=text,
@@ -47,20 +60,11 @@ class ExtendedAnonymizationService:
             anonymized_result = self.anonymizer.anonymize(
                 text=text,
                 analyzer_results=analyzer_results,
-                anonymizers=kwargs.get('anonymizers')
+                operators=plan.operators_for(analyzer_results)
             )
             
-            # Convert results
-            entities = [
-                EntityResult(
-                    entity_type=result.entity_type,
-                    start=result.start,
-                    end=result.end,
-                    text=text[result.start:result.end],
-                    score=result.score
-                )
-                for result in analyzer_results
-            ]
+            # Compact spans, serialized directly by the response encoder
+            entities = SpanList.from_results(text, analyzer_results)
             
             processing_time = time.time() - start_time
             
@@ -71,8 +75,8 @@ class ExtendedAnonymizationService:
                 "processing_time": processing_time,
                 "analysis_details": {
                     "total_entities": len(entities),
-                    "entity_types": list(set(e.entity_type for e in entities)),
-                    "average_confidence": sum(e.score for e in entities) / len(entities) if entities else 0
+                    "entity_types": entities.distinct_entity_types(),
+                    "average_confidence": entities.average_score()
                 }
             }
             
@@ -80,162 +84,290 @@ class ExtendedAnonymizationService:
             logger.error(f"Advanced text anonymization failed: {str(e)}")
             raise
     
-    async def anonymize_pdf_text_only(self, pdf_content: bytes) -> dict:
+    def _sentence_memo(self, tenant: Optional[str]) -> Optional[SentenceMemo]:
+        """Per-request sentence memo of the PDF pipelines, None when disabled"""
+        if not settings.sentence_memo_enabled:
+            return None
+        return SentenceMemo(self.analyzer, language='en', tenant=tenant)
+    
+    def _analyze_document_text(self, text: str, memo: Optional[SentenceMemo]) -> List[RecognizerResult]:
+        if memo is None:
+            return self.analyzer.analyze(text=text, language='en')
+        return memo.analyze(text)
+    
+    def _analyze_page_batch(self, texts: List[str], memo: Optional[SentenceMemo]) -> List[List[RecognizerResult]]:
+        with start_span("pdf.analyze_batch", page__count=len(texts), text__length=sum(map(len, texts))) as span:
+            if memo is not None:
+                batch_results = memo.analyze_many(texts)
+            else:
+                batch_results = self.batch_analyzer.analyze_iterator(texts, language='en')
+            span.set_attribute("entity.count", sum(map(len, batch_results)))
+            return batch_results
+    
+    def _page_pipeline(self, memo: Optional[SentenceMemo]) -> PagePipeline:
+        """Pages extracted on the extraction pool while earlier pages are analyzed in batches"""
+        return PagePipeline(
+            lambda texts: self._analyze_page_batch(texts, memo),
+            batch_size=settings.pdf_analysis_batch_size,
+            queue_size=settings.pdf_extraction_queue_size
+        )
+    
+    async def anonymize_pdf_text_only(self, pdf_content: bytes, tenant: Optional[str] = None) -> dict:
         """Extract and anonymize text from PDF (text-based approach)"""
         start_time = time.time()
         
         try:
             doc = fitz.open(stream=pdf_content, filetype="pdf")
+            page_count = len(doc)
+            annotate(page__count=page_count, pdf__size=len(pdf_content))
+            memo = self._sentence_memo(tenant)
             anonymized_pages = []
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
+            def extract_pages():
+                for page_num in range(page_count):
+                    with start_span("pdf.page", pipeline="text", page__number=page_num + 1) as span:
+                        text = doc[page_num].get_text()
+                        span.set_attribute("text.length", len(text))
+                    if text.strip():  # Only process pages with text
+                        yield page_num, text
+            
+            pipeline = self._page_pipeline(memo)
+            for page_num, text, results in pipeline.run(extract_pages()):
+                # Anonymize text
+                anonymized_result = self.anonymizer.anonymize(text=text, analyzer_results=results)
                 
-                if text.strip():  # Only process pages with text
-                    # Analyze text
-                    results = self.analyzer.analyze(text=text, language='en')
-                    
-                    # Anonymize text
-                    anonymized_result = self.anonymizer.anonymize(text=text, analyzer_results=results)
-                    
-                    anonymized_pages.append({
-                        "page_number": page_num + 1,
-                        "original_text": text,
-                        "anonymized_text": anonymized_result.text,
-                        "entities_found": len(results)
-                    })
+                anonymized_pages.append({
+                    "page_number": page_num + 1,
+                    "original_text": text,
+                    "anonymized_text": anonymized_result.text,
+                    "entities_found": len(results)
+                })
             
             doc.close()
             processing_time = time.time() - start_time
             
             return {
-                "total_pages": len(doc),
+                "total_pages": page_count,
                 "processed_pages": len(anonymized_pages),
                 "pages": anonymized_pages,
-                "processing_time": processing_time
+                "processing_time": processing_time,
+                "analysis_batches": pipeline.stats["batches"],
+                "sentence_memo": memo.stats if memo else None
             }
             
         except Exception as e:
             logger.error(f"PDF text anonymization failed: {str(e)}")
             raise
     
-    async def anonymize_pdf_ocr(self, pdf_content: bytes) -> dict:
+    async def anonymize_pdf_ocr(self, pdf_content: bytes, tenant: Optional[str] = None) -> dict:
         """Convert PDF to images, apply OCR, and anonymize text"""
         start_time = time.time()
         
         try:
             doc = fitz.open(stream=pdf_content, filetype="pdf")
+            page_count = len(doc)
+            annotate(page__count=page_count, pdf__size=len(pdf_content))
+            memo = self._sentence_memo(tenant)
             full_text = ""
             page_texts = []
             
             for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Convert page to image
-                pix = page.get_pixmap(dpi=300)
-                img = Image.open(io.BytesIO(pix.tobytes("png")))
-                
-                # Apply OCR
-                text = pytesseract.image_to_string(img, lang=settings.ocr_language)
-                full_text += text + "\n"
-                page_texts.append({
-                    "page_number": page_num + 1,
-                    "text": text
-                })
-            
-            # Analyze full text
-            results = self.analyzer.analyze(text=full_text, language='en')
+                with start_span("pdf.page", pipeline="ocr", page__number=page_num + 1, ocr__backend=self.ocr.name) as span:
+                    page = doc[page_num]
+                    
+                    # Convert page to image
+                    pix = page.get_pixmap(dpi=300)
+                    img = Image.open(io.BytesIO(pix.tobytes("png")))
+                    
+                    # Apply OCR
+                    text = self.ocr.image_to_string(img, lang=settings.ocr_language)
+                    span.set_attribute("text.length", len(text))
+                    full_text += text + "\n"
+                    page_texts.append({
+                        "page_number": page_num + 1,
+                        "text": text
+                    })
             
-            # Anonymize full text
-            anonymized_result = self.anonymizer.anonymize(text=full_text, analyzer_results=results)
+            with start_span("pdf.analyze", pipeline="ocr", page__count=page_count, text__length=len(full_text)) as span:
+                # Analyze full text, repeated sentences only once
+                results = self._analyze_document_text(full_text, memo)
+                
+                # Anonymize full text
+                anonymized_result = self.anonymizer.anonymize(text=full_text, analyzer_results=results)
+                span.set_attribute("entity.count", len(results))
             
             doc.close()
             processing_time = time.time() - start_time
             
             return {
-                "total_pages": len(doc),
+                "total_pages": page_count,
                 "original_text": full_text,
                 "anonymized_text": anonymized_result.text,
                 "pages": page_texts,
                 "entities_found": len(results),
-                "processing_time": processing_time
+                "processing_time": processing_time,
+                "sentence_memo": memo.stats if memo else None
             }
             
         except Exception as e:
             logger.error(f"PDF OCR anonymization failed: {str(e)}")
             raise
     
-    async def anonymize_image_with_presidio(self, image_content: bytes) -> bytes:
+    async def anonymize_image_with_presidio(
+        self,
+        image_content: bytes,
+        output_format: ImageOutputFormat = ImageOutputFormat.SOURCE,
+        quality: Optional[int] = None,
+        ocr_scale: Optional[float] = None
+    ) -> dict:
         """Anonymize an image using Presidio Image Redactor"""
+        start_time = time.time()
+        
         try:
             # Convert bytes to PIL Image
             img = Image.open(io.BytesIO(image_content))
+            source_format = img.format
+            ocr_scale = ocr_scale or settings.image_ocr_scale
             
-            # Use Presidio Image Redactor
-            redacted_image = self.image_redactor.redact(img)
+            if ocr_scale < 1.0:
+                # Fast path: OCR a downscaled copy, redact the full resolution image
+                ocr_img = self._downscale_for_ocr(image_content, img, ocr_scale)
+                boxes = self.image_redactor.image_analyzer_engine.analyze(ocr_img)
+                redacted_image = self._redact_scaled_boxes(img, boxes, img.width / ocr_img.width, img.height / ocr_img.height)
+                ocr_size = ocr_img.size
+            else:
+                # Use Presidio Image Redactor
+                redacted_image = self.image_redactor.redact(img)
+                ocr_size = img.size
             
             # Convert back to bytes
+            save_format, save_options = self._output_encoding(source_format, output_format, quality)
+            if save_format in ("JPEG", "WEBP") and redacted_image.mode not in ("RGB", "L"):
+                redacted_image = redacted_image.convert("RGB")
+            if img.info.get("icc_profile"):
+                save_options["icc_profile"] = img.info["icc_profile"]
+            
             output_buffer = io.BytesIO()
-            redacted_image.save(output_buffer, format='PNG')
-            return output_buffer.getvalue()
+            redacted_image.save(output_buffer, format=save_format, **save_options)
+            content = output_buffer.getvalue()
+            
+            return {
+                "content": content,
+                "format": save_format,
+                "media_type": Image.MIME.get(save_format, "application/octet-stream"),
+                "extension": IMAGE_EXTENSIONS[save_format],
+                "quality": save_options.get("quality"),
+                "input_size": len(image_content),
+                "output_size": len(content),
+                "dimensions": img.size,
+                "ocr_dimensions": ocr_size,
+                "processing_time": time.time() - start_time
+            }
             
         except Exception as e:
             logger.error(f"Image anonymization failed: {str(e)}")
             raise
     
-    async def anonymize_pdf_mixed_content(self, pdf_content: bytes) -> dict:
+    def _output_encoding(self, source_format: Optional[str], output_format: ImageOutputFormat, quality: Optional[int]):
+        """PIL format name and save options for the requested output format"""
+        if output_format == ImageOutputFormat.SOURCE:
+            save_format = source_format if source_format in IMAGE_EXTENSIONS else "PNG"
+        else:
+            save_format = output_format.value.upper()
+        
+        if save_format == "JPEG":
+            return save_format, {"quality": quality or settings.image_jpeg_quality, "optimize": True}
+        if save_format == "WEBP":
+            return save_format, {"quality": quality or settings.image_webp_quality, "method": 4}
+        if save_format == "PNG":
+            return save_format, {"compress_level": settings.image_png_compress_level}
+        return save_format, {}
+    
+    def _downscale_for_ocr(self, image_content: bytes, img, scale: float):
+        """Downscaled copy for OCR; JPEGs are decoded directly at reduced size"""
+        target_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        
+        if img.format == "JPEG":
+            draft_img = Image.open(io.BytesIO(image_content))
+            # Picks the smallest DCT scale that is still at least the target size
+            draft_img.draft("RGB", target_size)
+            return draft_img.resize(target_size, Image.BILINEAR) if draft_img.size != target_size else draft_img
+        
+        return img.resize(target_size, Image.BILINEAR, reducing_gap=2.0)
+    
+    def _redact_scaled_boxes(self, img, boxes, scale_x: float, scale_y: float, fill=(0, 0, 0)):
+        """Draw boxes found on a downscaled copy onto the full resolution image"""
+        redacted_image = img.copy()
+        if redacted_image.mode not in ("RGB", "RGBA", "L"):
+            redacted_image = redacted_image.convert("RGB")
+        draw = ImageDraw.Draw(redacted_image)
+        # One source pixel of margin, rounding on a downscaled copy can cut off glyph edges
+        margin_x, margin_y = math.ceil(scale_x), math.ceil(scale_y)
+        
+        for box in boxes:
+            draw.rectangle([
+                box.left * scale_x - margin_x,
+                box.top * scale_y - margin_y,
+                (box.left + box.width) * scale_x + margin_x,
+                (box.top + box.height) * scale_y + margin_y
+            ], fill=fill if redacted_image.mode != "L" else 0)
+        
+        return redacted_image
+    
+    def needs_tiling(self, image_content: bytes) -> bool:
+        """Whether an image is multi-page or too large to redact in one piece"""
+        pages, width, height = count_pages(image_content)
+        return pages > 1 or width * height > settings.image_tiling_min_pixels
+    
+    def anonymize_image_tiled(self, image_content: bytes, **kwargs) -> Iterator[bytes]:
+        """Redact a large or multi-page image band by band, yielding the output as it is written"""
+        redactor = TiledImageRedactor(
+            self.image_redactor.image_analyzer_engine,
+            tile_size=settings.image_tile_size,
+            overlap=settings.image_tile_overlap,
+            workers=settings.image_tile_workers
+        )
+        return redactor.redact(image_content, **kwargs)
+    
+    async def anonymize_pdf_mixed_content(self, pdf_content: bytes, tenant: Optional[str] = None) -> dict:
         """Process PDF with both text and images (comprehensive approach)"""
         start_time = time.time()
         
         try:
             doc = fitz.open(stream=pdf_content, filetype="pdf")
+            page_count = len(doc)
+            annotate(page__count=page_count, pdf__size=len(pdf_content))
             results = {
-                "total_pages": len(doc),
+                "total_pages": page_count,
                 "text_pages": [],
                 "image_pages": [],
                 "processing_time": 0
             }
+            memo = self._sentence_memo(tenant)
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
+            pipeline = self._page_pipeline(memo)
+            for (page_num, page_type), text, analysis_results in pipeline.run(self._extract_mixed_pages(doc)):
+                anonymized_text = self.anonymizer.anonymize(text=text, analyzer_results=analysis_results).text
                 
-                # Determine page type
-                if len(text.strip()) > 100:  # Text-rich page
-                    # Process as text page
-                    analysis_results = self.analyzer.analyze(text=text, language='en')
-                    anonymized_result = self.anonymizer.anonymize(text=text, analyzer_results=analysis_results)
-                    
+                if page_type == "text":
                     results["text_pages"].append({
                         "page_number": page_num + 1,
                         "original_text": text,
-                        "anonymized_text": anonymized_result.text,
+                        "anonymized_text": anonymized_text,
                         "entities_found": len(analysis_results)
                     })
                 else:
-                    # Process as image page
-                    pix = page.get_pixmap(dpi=300)
-                    img_data = pix.tobytes("png")
-                    
-                    # Apply OCR
-                    img = Image.open(io.BytesIO(img_data))
-                    ocr_text = pytesseract.image_to_string(img, lang=settings.ocr_language)
-                    
-                    # Anonymize OCR text
-                    if ocr_text.strip():
-                        analysis_results = self.analyzer.analyze(text=ocr_text, language='en')
-                        anonymized_text = self.anonymizer.anonymize(text=ocr_text, analyzer_results=analysis_results)
-                        
-                        results["image_pages"].append({
-                            "page_number": page_num + 1,
-                            "ocr_text": ocr_text,
-                            "anonymized_text": anonymized_text.text,
-                            "entities_found": len(analysis_results)
-                        })
+                    results["image_pages"].append({
+                        "page_number": page_num + 1,
+                        "ocr_text": text,
+                        "anonymized_text": anonymized_text,
+                        "entities_found": len(analysis_results)
+                    })
             
             doc.close()
             results["processing_time"] = time.time() - start_time
+            results["analysis_batches"] = pipeline.stats["batches"]
+            results["sentence_memo"] = memo.stats if memo else None
             
             return results
             
@@ -243,6 +375,89 @@ class ExtendedAnonymizationService:
             logger.error(f"Mixed content PDF anonymization failed: {str(e)}")
             raise
     
+    def _extract_mixed_pages(self, doc) -> Iterator[tuple]:
+        """Text of each page of a mixed PDF, by OCR when the page has little text"""
+        for page_num in range(len(doc)):
+            with start_span("pdf.page", pipeline="mixed", page__number=page_num + 1) as span:
+                page = doc[page_num]
+                text = page.get_text()
+                
+                # Determine page type
+                if len(text.strip()) > 100:  # Text-rich page
+                    page_type = "text"
+                else:
+                    # Process as image page
+                    page_type = "image"
+                    pix = page.get_pixmap(dpi=300)
+                    img = Image.open(io.BytesIO(pix.tobytes("png")))
+                    text = self.ocr.image_to_string(img, lang=settings.ocr_language)
+                span.set_attributes({"page.type": page_type, "text.length": len(text)})
+            
+            if page_type == "text" or text.strip():
+                yield (page_num, page_type), text
+    
+    async def anonymize_docx(self, docx_content: bytes, **kwargs) -> dict:
+        """Anonymize a Word document in place, keeping run formatting"""
+        start_time = time.time()
+        
+        try:
+            document = Document(io.BytesIO(docx_content))
+            batch_size = settings.docx_paragraph_batch_size
+            stats = {"paragraphs": 0, "characters": 0, "entities_found": 0}
+            
+            batch = []
+            for paragraph in iter_paragraphs(document):
+                text = paragraph_text(paragraph)
+                if text.strip():
+                    batch.append((paragraph, text))
+                if len(batch) >= batch_size:
+                    self._anonymize_paragraph_batch(batch, stats, **kwargs)
+                    batch = []
+            if batch:
+                self._anonymize_paragraph_batch(batch, stats, **kwargs)
+            
+            output_buffer = io.BytesIO()
+            document.save(output_buffer)
+            
+            return {
+                "content": output_buffer.getvalue(),
+                "paragraphs": stats["paragraphs"],
+                "characters": stats["characters"],
+                "entities_found": stats["entities_found"],
+                "processing_time": time.time() - start_time
+            }
+            
+        except Exception as e:
+            logger.error(f"DOCX anonymization failed: {str(e)}")
+            raise
+    
+    def _anonymize_paragraph_batch(self, batch: list, stats: dict, **kwargs):
+        """Analyze a batch of paragraphs in one NLP pass and rewrite their runs"""
+        batch_results = self.batch_analyzer.analyze_iterator(
+            [text for _, text in batch],
+            language=kwargs.get('language', 'en'),
+            entities=kwargs.get('entities'),
+            score_threshold=kwargs.get('score_threshold', 0.35)
+        )
+        
+        for (paragraph, text), results in zip(batch, batch_results):
+            stats["paragraphs"] += 1
+            stats["characters"] += len(text)
+            if not results:
+                continue
+            
+            replacements = []
+            for result in resolve_overlaps(results):
+                entity_text = text[result.start:result.end]
+                replacement = self.anonymizer.anonymize(
+                    text=entity_text,
+                    analyzer_results=[RecognizerResult(result.entity_type, 0, len(entity_text), result.score)]
+                ).text
+                replacements.append((result.start, result.end, replacement))
+            
+            replace_spans_in_runs(paragraph, replacements)
+            stats["entities_found"] += len(replacements)
+    
     def _is_text_page(self, page, threshold: int = 100) -> bool:
         """Simple heuristic to determine if a page is primarily text"""
         text = page.get_text()
@@ -1,55 +1,54 @@
-import os
-import shutil
 import logging
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 
 from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.services.file_store import get_results_store, get_upload_store
 
 logger = logging.getLogger(__name__)
 
 
 class FileService:
-    """Service for handling file uploads and management"""
+    """
+    Service for handling file uploads and management.
+    
+    Uploads and results are kept in content-addressed stores: identical files
+    are stored once, and the retention task of the lifespan evicts them by age
+    and total size.
+    """
     
     def __init__(self):
         self.upload_dir = Path(settings.upload_dir)
         self.results_dir = Path(settings.results_dir)
+        self.uploads = get_upload_store()
+        self.results = get_results_store()
         
-        # Create directories if they don't exist
-        self.upload_dir.mkdir(parents=True, exist_ok=True)
-        self.results_dir.mkdir(parents=True, exist_ok=True)
-        
-        logger.info(f"File service initialized: upload_dir={self.upload_dir}, results_dir={self.results_dir}")
+        logger.debug(f"File service initialized: upload_dir={self.upload_dir}, results_dir={self.results_dir}")
     
-    async def save_upload_file(self, upload_file: UploadFile) -> Path:
+    async def save_upload_file(self, upload_file: UploadFile, max_size: Optional[int] = None) -> Path:
         """Save uploaded file to upload directory"""
+        max_size = max_size or settings.max_file_size
         try:
             # Validate file size
-            if upload_file.size and upload_file.size > settings.max_file_size:
+            if upload_file.size and upload_file.size > max_size:
                 raise HTTPException(
                     status_code=413,
-                    detail=f"File too large. Maximum size is {settings.max_file_size} bytes"
+                    detail=f"File too large. Maximum size is {max_size} bytes"
                 )
             
-            # Create unique filename
-            file_path = self.upload_dir / upload_file.filename
-            counter = 1
-            original_stem = file_path.stem
-            
-            while file_path.exists():
-                file_path = self.upload_dir / f"{original_stem}_{counter}{file_path.suffix}"
-                counter += 1
+            # Stored under its content hash, so re-uploads of the same file are free
+            stored = await run_in_threadpool(
+                self.uploads.put_stream, upload_file.file, upload_file.filename, max_size
+            )
             
-            # Save file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(upload_file.file, buffer)
-            
-            logger.info(f"File saved: {file_path}")
-            return file_path
+            logger.info(f"File saved: {upload_file.filename} -> {stored.path}{' (deduplicated)' if stored.deduplicated else ''}")
+            return stored.path
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Failed to save upload file: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to save file")
@@ -68,39 +67,27 @@ class FileService:
     async def save_result_file(self, content: bytes, filename: str) -> Path:
         """Save result content to results directory"""
         try:
-            file_path = self.results_dir / filename
-            
-            with open(file_path, "wb") as file:
-                file.write(content)
+            stored = await run_in_threadpool(self.results.put_bytes, content, filename)
             
-            logger.info(f"Result file saved: {file_path}")
-            return file_path
+            logger.info(f"Result file saved: {filename} -> {stored.path}")
+            return stored.path
             
         except Exception as e:
             logger.error(f"Failed to save result file: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to save result file")
     
     async def cleanup_old_files(self, max_age_hours: int = 24):
-        """Clean up old files from upload and results directories"""
+        """Evict files not used within `max_age_hours` from the upload and results stores"""
         try:
-            import time
-            current_time = time.time()
-            max_age_seconds = max_age_hours * 3600
-            
-            for directory in [self.upload_dir, self.results_dir]:
-                for file_path in directory.iterdir():
-                    if file_path.is_file():
-                        file_age = current_time - file_path.stat().st_mtime
-                        if file_age > max_age_seconds:
-                            file_path.unlink()
-                            logger.info(f"Cleaned up old file: {file_path}")
+            for store in (self.uploads, self.results):
+                await run_in_threadpool(store.enforce_retention, max_age_hours * 3600)
             
         except Exception as e:
             logger.error(f"Failed to cleanup old files: {str(e)}")
     
     def get_supported_file_types(self) -> List[str]:
         """Get list of supported file types"""
-        return [".pdf", ".txt", ".png", ".jpg", ".jpeg"]
+        return [".pdf", ".docx", ".txt", ".log", ".jsonl", ".png", ".jpg", ".jpeg", ".tif", ".tiff"]
     
     def validate_file_type(self, filename: str) -> bool:
         """Validate if file type is supported"""
@@ -0,0 +1,279 @@
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, NamedTuple, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS blobs ("
+    "digest TEXT PRIMARY KEY, size INTEGER NOT NULL, filename TEXT, "
+    "created_at REAL NOT NULL, last_access REAL NOT NULL)",
+    # Eviction walks this index from the oldest entry instead of scanning the directory
+    "CREATE INDEX IF NOT EXISTS idx_blobs_last_access ON blobs (last_access)",
+    "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL, blobs INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO totals (id, bytes, blobs) VALUES (0, 0, 0)",
+]
+
+CHUNK_SIZE = 1024 * 1024
+EVICTION_BATCH = 500
+
+
+class StoredFile(NamedTuple):
+    digest: str
+    path: Path
+    size: int
+    deduplicated: bool
+
+
+class BlobWriter:
+    """New blob written incrementally and hashed on the way, stored by `commit`"""
+
+    def __init__(self, store: "ContentAddressedStore", filename: Optional[str]):
+        self.store = store
+        self.filename = filename
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        handle, tmp_name = tempfile.mkstemp(dir=store.tmp_dir)
+        self._tmp_path = Path(tmp_name)
+        self._file = os.fdopen(handle, "wb")
+
+    def write(self, data: bytes):
+        self._hasher.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> StoredFile:
+        try:
+            self._file.close()
+            return self.store._commit(self._tmp_path, self._hasher.hexdigest(), self.size, self.filename)
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+    def discard(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class ContentAddressedStore:
+    """
+    Files stored under the SHA-256 of their content.
+
+    Blobs live in two levels of hash-sharded directories
+    (`objects/ab/cd/abcd...`), so identical files are stored once and no
+    directory grows large. A SQLite index next to them records size and last
+    access of every blob plus running totals; eviction by age and by a byte
+    quota reads the oldest entries from the index and never lists the
+    directories. Writes to the index and the blob files happen under the
+    index's write lock, so workers sharing a store do not race.
+    """
+
+    def __init__(self, root: str, max_bytes: int, max_age: float):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._local = threading.local()
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, in autocommit mode with explicit transactions
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.root / "index.sqlite3", timeout=30.0, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def path_for(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:4] / digest
+
+    def put_stream(self, source: BinaryIO, filename: Optional[str] = None, max_size: Optional[int] = None) -> StoredFile:
+        """Store a file object, hashing it while it is copied to a temporary file"""
+        hasher = hashlib.sha256()
+        size = 0
+        handle, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(handle, "wb") as tmp_file:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise HTTPException(status_code=413, detail=f"File too large. Maximum size is {max_size} bytes")
+                    hasher.update(chunk)
+                    tmp_file.write(chunk)
+            return self._commit(Path(tmp_name), hasher.hexdigest(), size, filename)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def put_bytes(self, content: bytes, filename: Optional[str] = None) -> StoredFile:
+        handle, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(handle, "wb") as tmp_file:
+                tmp_file.write(content)
+            return self._commit(Path(tmp_name), hashlib.sha256(content).hexdigest(), len(content), filename)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def open_writer(self, filename: Optional[str] = None) -> BlobWriter:
+        """Writer for a blob produced piece by piece, e.g. a streamed result"""
+        return BlobWriter(self, filename)
+
+    def _commit(self, tmp_path: Path, digest: str, size: int, filename: Optional[str]) -> StoredFile:
+        path = self.path_for(digest)
+        now = time.time()
+        connection = self._connection()
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            known = connection.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if known and path.exists():
+                connection.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (now, digest))
+                deduplicated = True
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+                if not known:
+                    connection.execute(
+                        "INSERT INTO blobs (digest, size, filename, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                        (digest, size, filename, now, now)
+                    )
+                    connection.execute("UPDATE totals SET bytes = bytes + ?, blobs = blobs + 1 WHERE id = 0", (size,))
+                deduplicated = False
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        if deduplicated:
+            logger.debug(f"Deduplicated {filename or digest} ({size} bytes)")
+        return StoredFile(digest, path, size, deduplicated)
+
+    def touch(self, digest: str):
+        self._connection().execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+
+    def _evict(self, connection: sqlite3.Connection, rows) -> int:
+        freed = 0
+        for digest, size in rows:
+            connection.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self.path_for(digest).unlink(missing_ok=True)
+            freed += size
+        connection.execute("UPDATE totals SET bytes = bytes - ?, blobs = blobs - ? WHERE id = 0", (freed, len(rows)))
+        return freed
+
+    def enforce_retention(self, max_age: Optional[float] = None) -> Dict[str, int]:
+        """Evict blobs not accessed within `max_age` seconds, then the oldest ones beyond the byte quota"""
+        max_age = self.max_age if max_age is None else max_age
+        cutoff = time.time() - max_age
+        connection = self._connection()
+        evicted = freed = 0
+
+        # Small transactions so uploads are never blocked for long
+        while True:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    "SELECT digest, size FROM blobs WHERE last_access < ? ORDER BY last_access LIMIT ?",
+                    (cutoff, EVICTION_BATCH)
+                ).fetchall()
+                if not rows:
+                    total = connection.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+                    if total <= self.max_bytes:
+                        connection.execute("COMMIT")
+                        break
+                    rows = connection.execute(
+                        "SELECT digest, size FROM blobs ORDER BY last_access LIMIT ?", (EVICTION_BATCH,)
+                    ).fetchall()
+                    # Only as many of the oldest as needed to get under the quota
+                    needed, selected = total - self.max_bytes, []
+                    for digest, size in rows:
+                        if needed <= 0:
+                            break
+                        selected.append((digest, size))
+                        needed -= size
+                    rows = selected
+                freed += self._evict(connection, rows)
+                evicted += len(rows)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            if not rows:
+                break
+
+        if evicted:
+            logger.info(f"Evicted {evicted} files ({freed} bytes) from {self.root}")
+        return {"evicted": evicted, "freed_bytes": freed}
+
+    def clear_tmp(self, older_than: float = 3600.0):
+        """Remove temporary files left behind by crashed writes"""
+        cutoff = time.time() - older_than
+        for tmp_path in self.tmp_dir.iterdir():
+            if tmp_path.stat().st_mtime < cutoff:
+                tmp_path.unlink(missing_ok=True)
+
+    def get_stats(self) -> dict:
+        total_bytes, blobs = self._connection().execute("SELECT bytes, blobs FROM totals WHERE id = 0").fetchone()
+        return {"root": str(self.root), "blobs": blobs, "bytes": total_bytes, "max_bytes": self.max_bytes, "max_age": self.max_age}
+
+
+_stores: Dict[str, ContentAddressedStore] = {}
+_lock = threading.Lock()
+
+
+def _get_store(name: str, root: str) -> ContentAddressedStore:
+    if name not in _stores:
+        with _lock:
+            if name not in _stores:
+                _stores[name] = ContentAddressedStore(
+                    root,
+                    max_bytes=settings.file_store_max_bytes,
+                    max_age=settings.file_retention_hours * 3600
+                )
+    return _stores[name]
+
+
+def get_upload_store() -> ContentAddressedStore:
+    return _get_store("uploads", settings.upload_dir)
+
+
+def get_results_store() -> ContentAddressedStore:
+    return _get_store("results", settings.results_dir)
+
+
+def get_file_store_stats() -> Optional[Dict[str, dict]]:
+    """Stats of the stores used in this process, None before the first file was stored"""
+    return {name: store.get_stats() for name, store in _stores.items()} or None
+
+
+async def run_file_retention(interval: float):
+    """Background task of the lifespan: evict old files periodically from both stores"""
+    while True:
+        await asyncio.sleep(interval)
+        for store in (get_upload_store(), get_results_store()):
+            try:
+                await run_in_threadpool(store.enforce_retention)
+                await run_in_threadpool(store.clear_tmp)
+            except Exception as e:
+                logger.error(f"File retention for {store.root} failed: {str(e)}")
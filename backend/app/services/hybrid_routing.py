@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional
+
+from presidio_analyzer import AnalyzerEngine, EntityRecognizer, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts
+from presidio_analyzer.predefined_recognizers import SpacyRecognizer
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.prefilter import get_prefilter
+from app.services.upstream import get_upstream_pool
+
+logger = logging.getLogger(__name__)
+
+# Routes of an analysis: patterns only, everything in-process, or patterns in-process and NER remote
+HYBRID_ROUTES = ("pattern", "local", "split")
+
+
+class HybridRouter:
+    """
+    Splits analysis between in-process pattern recognizers and the external
+    analyzer pool, which takes the NER.
+
+    The recognizers are cheap, the spaCy NER is not. When no requested
+    entity needs NER, the text is analyzed in-process with the NER
+    components skipped (the rest of the pipeline still runs, so context
+    words keep their lemmas and scores match a full analysis). Short texts
+    are analyzed fully in-process while fewer than `max_in_flight` local
+    analyses are in flight, which keeps simple requests off the network;
+    the hybrid service runs them on the threadpool or the micro-batcher, so
+    that count is the local load. Every other text takes the split route:
+    patterns in-process, the NER entity types from the external analyzer
+    concurrently, and the spans merged as the analyzer merges its
+    recognizers' results. With the pre-filter on, sentences it finds clean
+    are blanked before the text is sent, and a text without any signal is
+    not sent at all.
+    """
+
+    def __init__(self, analyzer: AnalyzerEngine, max_local_chars: int, max_in_flight: int, remote_fallback: bool):
+        self.analyzer = analyzer
+        self.max_local_chars = max_local_chars
+        self.max_in_flight = max_in_flight
+        self.remote_fallback = remote_fallback
+        self.local_in_flight = 0
+        self._ner_entities: Dict[str, FrozenSet[str]] = {}
+        self._ner_components: Dict[str, FrozenSet[str]] = {}
+
+        self._lock = threading.Lock()
+        self._routes = {route: 0 for route in HYBRID_ROUTES}
+        self._stats = {"remote_calls": 0, "remote_skipped": 0, "remote_characters": 0, "remote_fallbacks": 0}
+
+    def ner_entities(self, language: str) -> FrozenSet[str]:
+        """Entity types found by the NER-based recognizers of a language"""
+        if language not in self._ner_entities:
+            self._ner_entities[language] = frozenset(
+                entity
+                for recognizer in self.analyzer.registry.get_recognizers(language, all_fields=True)
+                if isinstance(recognizer, SpacyRecognizer)
+                for entity in recognizer.supported_entities
+            )
+        return self._ner_entities[language]
+
+    def route(self, text: str, language: str, entities: Optional[List[str]]) -> str:
+        ner_entities = self.ner_entities(language)
+        if entities and not ner_entities.intersection(entities):
+            return "pattern"
+        if len(text) <= self.max_local_chars and self.local_in_flight < self.max_in_flight:
+            return "local"
+        return "split"
+
+    def _pattern_artifacts(self, text: str, language: str) -> NlpArtifacts:
+        """NLP artifacts of the pipeline without the components that set entities"""
+        nlp = self.analyzer.nlp_engine.nlp[language]
+        if language not in self._ner_components:
+            self._ner_components[language] = frozenset(
+                name for name in nlp.pipe_names if "doc.ents" in nlp.get_pipe_meta(name).assigns
+            )
+
+        doc = nlp.make_doc(text)
+        for name, component in nlp.pipeline:
+            if name not in self._ner_components[language]:
+                doc = component(doc)
+        return self.analyzer.nlp_engine._doc_to_nlp_artifact(doc, language)
+
+    def analyze_patterns(
+        self,
+        text: str,
+        language: str,
+        entities: Optional[List[str]],
+        score_threshold: float
+    ) -> List[RecognizerResult]:
+        return self.analyzer.analyze(
+            text=text,
+            entities=entities,
+            language=language,
+            score_threshold=score_threshold,
+            nlp_artifacts=self._pattern_artifacts(text, language)
+        )
+
+    async def _analyze_remote(
+        self,
+        text: str,
+        language: str,
+        entities: List[str],
+        score_threshold: float
+    ) -> List[RecognizerResult]:
+        prefilter = get_prefilter(self.analyzer)
+        if prefilter is not None:
+            text = prefilter.screen(text, language)
+            if text is None:
+                self._count(remote_skipped=1)
+                return []
+
+        self._count(remote_calls=1, remote_characters=len(text))
+        body = {"text": text, "language": language, "entities": entities, "score_threshold": score_threshold}
+        # Analysis has no side effects, so it may be retried and hedged
+        response = await get_upstream_pool("analyzer").post("/analyze", body, idempotent=True)
+        return [
+            RecognizerResult(item["entity_type"], item["start"], item["end"], item["score"])
+            for item in response
+        ]
+
+    async def analyze(
+        self,
+        text: str,
+        language: str,
+        entities: Optional[List[str]],
+        score_threshold: float,
+        analyze_local: Callable[[], Awaitable[List[RecognizerResult]]]
+    ) -> List[RecognizerResult]:
+        """
+        Analyze the text on the route the policy picks; `analyze_local` runs
+        the full in-process analysis.
+        """
+        route = self.route(text, language, entities)
+        self._count_route(route)
+
+        if route == "pattern":
+            return await run_in_threadpool(self.analyze_patterns, text, language, entities, score_threshold)
+        if route == "local":
+            return await self._analyze_local(analyze_local)
+
+        ner_entities = self.ner_entities(language)
+        remote_entities = sorted(ner_entities.intersection(entities) if entities else ner_entities)
+        remote = asyncio.ensure_future(self._analyze_remote(text, language, remote_entities, score_threshold))
+        try:
+            # Off the event loop, so the remote request is sent while the patterns run
+            pattern_results = await run_in_threadpool(self.analyze_patterns, text, language, entities, score_threshold)
+        except Exception:
+            remote.cancel()
+            raise
+
+        try:
+            remote_results = await remote
+        except Exception as e:
+            if not self.remote_fallback:
+                raise
+            logger.warning(f"External NER failed, analyzing locally: {str(e)}")
+            self._count(remote_fallbacks=1)
+            return await self._analyze_local(analyze_local)
+
+        return EntityRecognizer.remove_duplicates(pattern_results + remote_results)
+
+    async def _analyze_local(self, analyze_local: Callable[[], Awaitable[List[RecognizerResult]]]) -> List[RecognizerResult]:
+        self.local_in_flight += 1
+        try:
+            return await analyze_local()
+        finally:
+            self.local_in_flight -= 1
+
+    def _count_route(self, route: str):
+        with self._lock:
+            self._routes[route] += 1
+
+    def _count(self, **counts: int):
+        with self._lock:
+            for name, count in counts.items():
+                self._stats[name] += count
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            routes = dict(self._routes)
+            stats = dict(self._stats)
+
+        return {
+            "routes": routes,
+            **stats,
+            "local_in_flight": self.local_in_flight,
+            "max_local_chars": self.max_local_chars,
+            "max_in_flight": self.max_in_flight
+        }
+
+
+_router: Optional[HybridRouter] = None
+_lock = threading.Lock()
+
+
+def get_hybrid_router(analyzer: AnalyzerEngine) -> HybridRouter:
+    """The process-wide router of the hybrid mode"""
+    global _router
+
+    if _router is None:
+        with _lock:
+            if _router is None:
+                _router = HybridRouter(
+                    analyzer,
+                    max_local_chars=settings.hybrid_local_max_chars,
+                    max_in_flight=settings.hybrid_local_max_in_flight,
+                    remote_fallback=settings.hybrid_remote_fallback
+                )
+    return _router
+
+
+def get_hybrid_routing_stats() -> Optional[dict]:
+    """Route and remote call counters, None outside the hybrid mode or before its first analysis"""
+    return _router.get_stats() if _router is not None else None
@@ -0,0 +1,232 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import List, Tuple
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models import (
+    AnalyzeRequest,
+    EntityResult,
+    IncrementalAnalyzeResponse,
+    IncrementalSessionRequest,
+    IncrementalUpdateRequest,
+)
+from app.services.anonymization import BaseAnonymizationService
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_TERMINATORS = ".!?"
+
+
+class DocumentSession:
+    """Cached text and entities of one edited document"""
+
+    def __init__(self, request: IncrementalSessionRequest, owner: str):
+        self.document_id = request.document_id
+        self.owner = owner
+        self.text = request.text
+        self.entities_filter = request.entities
+        self.language = request.language
+        self.score_threshold = request.score_threshold
+        self.entities: List[EntityResult] = []
+        self.version = 0
+        self.last_access = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+# Sessions are kept per process, clients of a multi-worker deployment need sticky routing.
+# They are keyed by owner and document id, so a client only ever sees its own sessions.
+_sessions: "OrderedDict[Tuple[str, str], DocumentSession]" = OrderedDict()
+
+
+def _sentence_start(text: str, pos: int) -> int:
+    """Offset where the sentence containing `pos` starts"""
+    lower = max(0, pos - settings.incremental_max_sentence_length)
+    i = pos
+    while i > lower:
+        previous = text[i - 1]
+        if previous == "\n" or (previous.isspace() and i >= 2 and text[i - 2] in SENTENCE_TERMINATORS):
+            return i
+        i -= 1
+    return lower
+
+
+def _sentence_end(text: str, pos: int) -> int:
+    """Offset right after the sentence containing `pos`"""
+    upper = min(len(text), pos + settings.incremental_max_sentence_length)
+    i = pos
+    while i < upper:
+        char = text[i]
+        if char == "\n" or (char in SENTENCE_TERMINATORS and (i + 1 == len(text) or text[i + 1].isspace())):
+            return i + 1
+        i += 1
+    return upper
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class IncrementalAnalysisService:
+    """
+    Re-analyzes only the sentences touched by edits and shifts all other cached spans.
+
+    Every session belongs to the client that opened it (`owner`, its API key or
+    IP address as the rate limiter identifies it); other clients get a 404 for
+    its document id.
+    """
+
+    def __init__(self, analysis_service: BaseAnonymizationService):
+        self.analysis_service = analysis_service
+
+    def _get_session(self, document_id: str, owner: str) -> DocumentSession:
+        self._expire_sessions()
+        session = _sessions.get((owner, document_id))
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"No analysis session for document '{document_id}'")
+
+        _sessions.move_to_end((owner, document_id))
+        session.last_access = time.monotonic()
+        return session
+
+    def _expire_sessions(self):
+        """Drop idle sessions and the least recently used ones above the limit"""
+        cutoff = time.monotonic() - settings.incremental_session_ttl
+        for key in [key for key, session in _sessions.items() if session.last_access < cutoff]:
+            del _sessions[key]
+
+        while len(_sessions) > settings.incremental_max_sessions:
+            _sessions.popitem(last=False)
+
+    async def _analyze_range(self, session: DocumentSession, text: str, start: int, end: int) -> List[EntityResult]:
+        """Analyze text[start:end] with the session's settings and return entities in document coordinates"""
+        response = await self.analysis_service.analyze(AnalyzeRequest(
+            text=text[start:end],
+            entities=session.entities_filter,
+            language=session.language,
+            score_threshold=session.score_threshold
+        ))
+
+        return [
+            EntityResult(
+                entity_type=span.entity_type,
+                start=span.start + start,
+                end=span.end + start,
+                text=span.text,
+                score=span.score
+            )
+            for span in response.entities
+        ]
+
+    def _response(self, session: DocumentSession, ranges: List[Tuple[int, int]], start_time: float) -> IncrementalAnalyzeResponse:
+        return IncrementalAnalyzeResponse(
+            document_id=session.document_id,
+            version=session.version,
+            entities=session.entities,
+            reanalyzed_ranges=[[start, end] for start, end in ranges],
+            processing_time=time.time() - start_time
+        )
+
+    async def open_session(self, request: IncrementalSessionRequest, owner: str) -> IncrementalAnalyzeResponse:
+        """Start (or restart) a session of the owner with a full analysis of the document"""
+        start_time = time.time()
+
+        session = DocumentSession(request, owner)
+        session.entities = await self._analyze_range(session, session.text, 0, len(session.text))
+
+        _sessions[(owner, request.document_id)] = session
+        _sessions.move_to_end((owner, request.document_id))
+        self._expire_sessions()
+
+        logger.info(f"Opened analysis session {request.document_id} with {len(session.entities)} entities")
+        return self._response(session, [(0, len(session.text))], start_time)
+
+    async def apply_edits(self, document_id: str, request: IncrementalUpdateRequest, owner: str) -> IncrementalAnalyzeResponse:
+        """Apply edits to the owner's cached document and re-analyze the affected sentences"""
+        start_time = time.time()
+        session = self._get_session(document_id, owner)
+
+        async with session.lock:
+            if request.base_version is not None and request.base_version != session.version:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Session is at version {session.version}, edits were made against {request.base_version}"
+                )
+
+            # Every edit is checked before anything changes, each against the text left by the previous ones
+            length = len(session.text)
+            for edit in request.edits:
+                if edit.start > edit.end or edit.end > length:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Edit range [{edit.start}, {edit.end}) is outside of the text (length {length})"
+                    )
+                length += len(edit.text) - (edit.end - edit.start)
+
+            # The session is only updated once the analysis succeeded, cached entities are never shifted in place
+            text = session.text
+            entities = session.entities
+            dirty: List[Tuple[int, int]] = []
+
+            for edit in request.edits:
+                delta = len(edit.text) - (edit.end - edit.start)
+                text = text[:edit.start] + edit.text + text[edit.end:]
+
+                # Untouched spans keep or shift their offsets, spans touching the edit are dropped
+                shifted = []
+                for entity in entities:
+                    if entity.end <= edit.start:
+                        shifted.append(entity)
+                    elif entity.start >= edit.end:
+                        shifted.append(entity.copy(update={"start": entity.start + delta, "end": entity.end + delta}))
+                entities = shifted
+
+                dirty = [
+                    (start, end) if end <= edit.start else (start + delta, end + delta) if start >= edit.end
+                    else (min(start, edit.start), max(end + delta, edit.start + len(edit.text)))
+                    for start, end in dirty
+                ]
+                dirty.append((edit.start, edit.start + len(edit.text)))
+
+            # Grow every dirty range to whole sentences plus context, and over any span it cuts
+            windows = []
+            for start, end in _merge_ranges(dirty):
+                for _ in range(settings.incremental_context_sentences + 1):
+                    start = _sentence_start(text, max(0, start - 1)) if start > 0 else 0
+                    end = _sentence_end(text, min(len(text), end + 1)) if end < len(text) else len(text)
+                for entity in entities:
+                    if entity.start < end and entity.end > start:
+                        start, end = min(start, entity.start), max(end, entity.end)
+                windows.append((start, end))
+            windows = _merge_ranges(windows)
+
+            kept = [
+                entity for entity in entities
+                if not any(entity.start < end and entity.end > start for start, end in windows)
+            ]
+            for start, end in windows:
+                kept.extend(await self._analyze_range(session, text, start, end))
+
+            session.text = text
+            session.entities = sorted(kept, key=lambda entity: (entity.start, entity.end))
+            session.version += 1
+
+            logger.debug(
+                f"Session {document_id} v{session.version}: re-analyzed "
+                f"{sum(end - start for start, end in windows)} of {len(text)} characters"
+            )
+            return self._response(session, windows, start_time)
+
+    def close_session(self, document_id: str, owner: str):
+        """Forget a session of the owner and its cached entities"""
+        if _sessions.pop((owner, document_id), None) is None:
+            raise HTTPException(status_code=404, detail=f"No analysis session for document '{document_id}'")
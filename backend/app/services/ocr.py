@@ -0,0 +1,275 @@
+import io
+import logging
+import weakref
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+import pytesseract
+from PIL import Image
+from presidio_image_redactor import OCR
+
+from app.config import settings
+from app.services.tracing import inject_trace_context, start_span
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+try:
+    from presidio_image_redactor.document_intelligence_ocr import DocumentIntelligenceOCR
+except ImportError:
+    DocumentIntelligenceOCR = None
+
+logger = logging.getLogger(__name__)
+
+# Keys of the Tesseract style word dictionary Presidio's image analyzer works on
+OCR_DICT_KEYS = ("left", "top", "width", "height", "conf", "text")
+
+
+def _to_pil(image) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray)):
+        return Image.open(io.BytesIO(image))
+    if isinstance(image, str):
+        return Image.open(image)
+    return Image.fromarray(image)
+
+
+class OCRBackend(OCR):
+    """
+    Common interface of all OCR backends.
+
+    `perform_ocr` returns Tesseract style word boxes, which makes every backend
+    usable by Presidio's image analyzer; `image_to_string` returns the plain
+    text with line breaks, as used for PDF pages.
+    """
+
+    name = "base"
+
+    def image_to_string(self, image, lang: Optional[str] = None) -> str:
+        return self.get_text_from_ocr_dict(self.perform_ocr(image, lang=lang))
+
+    def close(self):
+        pass
+
+
+class TesseractCLIOCR(OCRBackend):
+    """Tesseract through pytesseract, one tesseract process per call"""
+
+    name = "tesseract"
+
+    def __init__(self, tesseract_cmd: Optional[str] = None):
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    def perform_ocr(self, image, **kwargs) -> dict:
+        lang = kwargs.pop("lang", None) or settings.ocr_language
+        return pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT, **kwargs)
+
+    def image_to_string(self, image, lang: Optional[str] = None) -> str:
+        return pytesseract.image_to_string(image, lang=lang or settings.ocr_language)
+
+
+class _ThreadAPIs:
+    """Tesseract APIs of one thread by language, ended once the exiting thread drops them"""
+
+    def __init__(self):
+        self.by_language: Dict[str, object] = {}
+
+    def end(self):
+        for api in self.by_language.values():
+            api.End()
+        self.by_language = {}
+
+    def __del__(self):
+        self.end()
+
+
+class TesserocrOCR(OCRBackend):
+    """
+    Tesseract through its C++ API, loaded once in the process.
+
+    The API objects are not thread-safe, so every thread keeps its own instance
+    per language; models are loaded on first use and then reused for every page.
+    Only the thread holds its instances, they are ended when it exits.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, tessdata_path: Optional[str] = None):
+        if tesserocr is None:
+            raise RuntimeError("The tesserocr backend requires the tesserocr package")
+        self.tessdata_path = tessdata_path
+        self._local = threading.local()
+        self._threads = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _api(self, lang: str):
+        thread_apis = getattr(self._local, "apis", None)
+        if thread_apis is None:
+            thread_apis = self._local.apis = _ThreadAPIs()
+            with self._lock:
+                self._threads.add(thread_apis)
+        apis = thread_apis.by_language
+
+        if lang not in apis:
+            kwargs = {"lang": lang}
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            apis[lang] = tesserocr.PyTessBaseAPI(**kwargs)
+            logger.debug(f"Loaded tesserocr API for '{lang}' in {threading.current_thread().name}")
+
+        return apis[lang]
+
+    def _set_image(self, image, lang: Optional[str]):
+        image = _to_pil(image)
+        if image.mode not in ("1", "L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        api = self._api(lang or settings.ocr_language)
+        api.SetImage(image)
+        return api
+
+    def perform_ocr(self, image, **kwargs) -> dict:
+        api = self._set_image(image, kwargs.get("lang"))
+        api.Recognize()
+
+        result = {key: [] for key in OCR_DICT_KEYS}
+        level = tesserocr.RIL.WORD
+        iterator = api.GetIterator()
+        if iterator is None:
+            return result
+
+        for word in tesserocr.iterate_level(iterator, level):
+            text = word.GetUTF8Text(level)
+            box = word.BoundingBox(level)
+            if not text or box is None:
+                continue
+            left, top, right, bottom = box
+            result["left"].append(left)
+            result["top"].append(top)
+            result["width"].append(right - left)
+            result["height"].append(bottom - top)
+            result["conf"].append(word.Confidence(level))
+            result["text"].append(text)
+
+        return result
+
+    def image_to_string(self, image, lang: Optional[str] = None) -> str:
+        return self._set_image(image, lang).GetUTF8Text()
+
+    def close(self):
+        with self._lock:
+            threads = list(self._threads)
+            self._threads = weakref.WeakSet()
+        for thread_apis in threads:
+            thread_apis.end()
+
+
+class HTTPOCR(OCRBackend):
+    """
+    OCR through a remote service.
+
+    The service takes a multipart `file` (PNG), `lang` and `mode` at `POST /ocr`
+    and answers `{"text": "..."}` for mode `text` or
+    `{"words": {"left": [...], "top": [...], ...}}` with Tesseract style word
+    boxes for mode `words`. `stub_server.py` implements it locally.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        if not url:
+            raise RuntimeError("The http OCR backend requires OCR_REMOTE_URL")
+        self.client = httpx.Client(base_url=url, timeout=timeout)
+
+    def _request(self, image, lang: Optional[str], mode: str) -> dict:
+        buffer = io.BytesIO()
+        _to_pil(image).save(buffer, format="PNG")
+        with start_span("ocr.http", kind="client", ocr__mode=mode, http__url=f"{self.client.base_url}ocr") as span:
+            response = self.client.post(
+                "/ocr",
+                files={"file": ("page.png", buffer.getvalue(), "image/png")},
+                data={"lang": lang or settings.ocr_language, "mode": mode},
+                headers=inject_trace_context({})
+            )
+            span.set_attribute("http.status_code", response.status_code)
+            response.raise_for_status()
+            return response.json()
+
+    def perform_ocr(self, image, **kwargs) -> dict:
+        return self._request(image, kwargs.get("lang"), "words")["words"]
+
+    def image_to_string(self, image, lang: Optional[str] = None) -> str:
+        return self._request(image, lang, "text")["text"]
+
+    def close(self):
+        self.client.close()
+
+
+if DocumentIntelligenceOCR is not None:
+    class AzureOCR(OCRBackend, DocumentIntelligenceOCR):
+        """Azure AI Document Intelligence (Form Recognizer) read model"""
+
+        name = "azure"
+
+        def __init__(self, endpoint: Optional[str] = None, key: Optional[str] = None):
+            DocumentIntelligenceOCR.__init__(self, endpoint=endpoint, key=key, model_id="prebuilt-read")
+
+        def perform_ocr(self, image, **kwargs) -> dict:
+            # Tesseract language codes do not apply, the read model detects the language
+            kwargs.pop("lang", None)
+            return DocumentIntelligenceOCR.perform_ocr(self, image, **kwargs)
+
+        def image_to_string(self, image, lang: Optional[str] = None) -> str:
+            return self.analyze_document(self.get_imgbytes(image)).content
+else:
+    AzureOCR = None
+
+
+def available_backends() -> List[str]:
+    """Names of the OCR backends usable in this installation"""
+    backends = ["tesseract", "http"]
+    if tesserocr is not None:
+        backends.insert(0, "tesserocr")
+    if AzureOCR is not None:
+        backends.append("azure")
+    return backends
+
+
+def create_ocr_backend(name: str) -> OCRBackend:
+    """Create an OCR backend by name; 'auto' prefers the in-process Tesseract API"""
+    if name == "auto":
+        name = "tesserocr" if tesserocr is not None else "tesseract"
+
+    if name == "tesserocr":
+        return TesserocrOCR(tessdata_path=settings.ocr_tessdata_path)
+    if name == "tesseract":
+        return TesseractCLIOCR(tesseract_cmd=settings.tesseract_cmd)
+    if name == "http":
+        return HTTPOCR(settings.ocr_remote_url, timeout=settings.ocr_remote_timeout)
+    if name == "azure":
+        if AzureOCR is None:
+            raise RuntimeError("The azure OCR backend requires azure-ai-formrecognizer")
+        return AzureOCR(endpoint=settings.ocr_azure_endpoint, key=settings.ocr_azure_key)
+
+    raise ValueError(f"Unknown OCR backend '{name}'")
+
+
+_backends: Dict[str, OCRBackend] = {}
+_lock = threading.Lock()
+
+
+def get_ocr_backend(name: Optional[str] = None) -> OCRBackend:
+    """Get the shared OCR backend configured by OCR_BACKEND (or the one named)"""
+    name = name or settings.ocr_backend
+
+    if name not in _backends:
+        with _lock:
+            if name not in _backends:
+                _backends[name] = create_ocr_backend(name)
+                logger.info(f"Using OCR backend '{_backends[name].name}'")
+
+    return _backends[name]
@@ -0,0 +1,173 @@
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+from presidio_anonymizer.entities import InvalidParamException, OperatorConfig
+from presidio_anonymizer.operators import OperatorsFactory, OperatorType
+from presidio_anonymizer.operators.aes_cipher import AESCipher
+
+from app.config import settings
+from app.models import AnonymizationMode
+
+logger = logging.getLogger(__name__)
+
+# Operator applied to entities without an override, per anonymization mode
+MODE_OPERATORS: Dict[AnonymizationMode, Dict[str, Any]] = {
+    AnonymizationMode.REPLACE: {"type": "replace"},
+    AnonymizationMode.REDACT: {"type": "redact"},
+    AnonymizationMode.HASH: {"type": "hash", "hash_type": "sha256"},
+    AnonymizationMode.MASK: {"type": "mask", "masking_char": "*", "chars_to_mask": 1 << 30, "from_end": False},
+    AnonymizationMode.ENCRYPT: {"type": "encrypt"},
+}
+
+HASH_TYPES = ("sha256", "sha512", "md5")
+
+
+def _salted_hash(hash_type: str, salt: str):
+    # The salt is absorbed once; every entity continues from a copy of that state
+    salted = hashlib.new(hash_type)
+    salted.update(salt.encode("utf-8"))
+
+    def operate(text: str) -> str:
+        hasher = salted.copy()
+        hasher.update(text.encode("utf-8"))
+        return hasher.hexdigest()
+
+    return operate
+
+
+class OperatorPlan:
+    """
+    Compiled anonymization operators for one mode and set of overrides.
+
+    `spec` holds the declarative per-entity configs in the format of the
+    Presidio REST API (`{"PERSON": {"type": "mask", ...}, "DEFAULT": {...}}`),
+    `operators` the validated `OperatorConfig` objects handed to the engine.
+    Encryption keys and hash salts are resolved and prepared when the plan is
+    built, not per entity. Every entity type gets its own config because the
+    engine writes the entity type into the config params while operating.
+    """
+
+    def __init__(self, mode: AnonymizationMode, spec: Dict[str, Dict[str, Any]]):
+        self.mode = mode
+        self.spec = spec
+        self._operators: Dict[str, OperatorConfig] = {
+            entity_type: self._compile(entity_type, config) for entity_type, config in spec.items()
+        }
+
+    def _compile(self, entity_type: str, config: Dict[str, Any]) -> OperatorConfig:
+        params = {key: value for key, value in config.items() if key != "type"}
+        operator_name = config.get("type")
+        if not operator_name:
+            raise HTTPException(status_code=400, detail=f"Anonymizer for {entity_type} has no 'type'")
+
+        if operator_name == "hash":
+            hash_type = params.get("hash_type", "sha256")
+            if hash_type not in HASH_TYPES:
+                raise HTTPException(status_code=400, detail=f"Invalid hash_type '{hash_type}' for {entity_type}")
+            salt = params.get("salt") or settings.anonymization_hash_salt
+            if salt:
+                return OperatorConfig("custom", {"lambda": _salted_hash(hash_type, salt)})
+            return OperatorConfig("hash", {"hash_type": hash_type})
+
+        if operator_name == "encrypt":
+            key = params.get("key") or settings.anonymization_encrypt_key
+            if not key:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Encryption of {entity_type} needs a key, pass one or set ANONYMIZATION_ENCRYPT_KEY"
+                )
+            key_bytes = key.encode("utf-8")
+            if not AESCipher.is_valid_key_size(key_bytes):
+                raise HTTPException(status_code=400, detail="Encryption key must be 128, 192 or 256 bits long")
+            # Same output as Presidio's encrypt operator, so its decrypt operator restores the text
+            return OperatorConfig("custom", {"lambda": lambda text: AESCipher.encrypt(key_bytes, text)})
+
+        # Validated once here; the engine validates again per entity but can no longer fail
+        try:
+            operator = OperatorsFactory().create_operator_class(operator_name, OperatorType.Anonymize)
+            operator.validate(params=params)
+        except InvalidParamException as e:
+            raise HTTPException(status_code=400, detail=f"Invalid anonymizer for {entity_type}: {e.err_msg}")
+        return OperatorConfig(operator_name, params)
+
+    def operators_for(self, results: Iterable) -> Dict[str, OperatorConfig]:
+        """Operators covering the entity types of the given analyzer results"""
+        operators = self._operators
+        default = operators["DEFAULT"]
+        for result in results:
+            if result.entity_type not in operators:
+                operators[result.entity_type] = OperatorConfig(default.operator_name, dict(default.params))
+        return operators
+
+    def external_anonymizers(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The plan for the Presidio REST anonymizer. It has no salted hashing, so
+        a plan that hashes with a salt is refused rather than sent unsalted.
+        """
+        anonymizers = {}
+        for entity_type, config in self.spec.items():
+            if config["type"] == "hash" and (config.get("salt") or settings.anonymization_hash_salt):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Salted hashing of {entity_type} is not supported by the external anonymizer, "
+                           f"use the local mode or hash without a salt"
+                )
+            config = dict(config)
+            if config["type"] == "encrypt" and not config.get("key"):
+                config["key"] = settings.anonymization_encrypt_key
+            anonymizers[entity_type] = config
+        return anonymizers
+
+
+def build_spec(
+    mode: AnonymizationMode = AnonymizationMode.REPLACE,
+    anonymizers: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Per-entity configs of a mode with the request's overrides applied"""
+    spec = {"DEFAULT": dict(MODE_OPERATORS[AnonymizationMode(mode)])}
+    for entity_type, config in (anonymizers or {}).items():
+        if not isinstance(config, dict):
+            raise HTTPException(status_code=400, detail=f"Anonymizer for {entity_type} must be an object")
+        spec[entity_type] = dict(config)
+    return spec
+
+
+_plans: "OrderedDict[str, OperatorPlan]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_operator_plan(
+    mode: AnonymizationMode = AnonymizationMode.REPLACE,
+    anonymizers: Optional[Dict[str, Dict[str, Any]]] = None
+) -> OperatorPlan:
+    """Get the compiled plan of a mode and overrides, cached by a hash of the config"""
+    mode = AnonymizationMode(mode)
+    spec = build_spec(mode, anonymizers)
+    cache_key = hashlib.sha256(
+        json.dumps([mode.value, spec], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+    with _lock:
+        plan = _plans.get(cache_key)
+        if plan is not None:
+            _plans.move_to_end(cache_key)
+            return plan
+
+    plan = OperatorPlan(mode, spec)
+    logger.debug(f"Compiled operator plan for mode {mode.value} with {len(spec) - 1} overrides")
+
+    with _lock:
+        _plans[cache_key] = plan
+        while len(_plans) > settings.operator_plan_cache_size:
+            _plans.popitem(last=False)
+
+    return plan
+
+
+def get_plan_stats() -> dict:
+    return {"cached_plans": len(_plans), "max_plans": settings.operator_plan_cache_size}
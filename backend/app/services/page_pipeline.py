@@ -0,0 +1,114 @@
+import queue
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from presidio_analyzer import RecognizerResult
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class PagePipeline:
+    """
+    Page extraction on a producer thread feeding batched analysis.
+
+    The producer runs the extraction iterable (text extraction, rendering and
+    OCR) on the extraction pool, whose long-lived threads keep their OCR
+    engines loaded, and puts `(item, text)` pairs into a bounded queue. The
+    consumer takes whatever is ready, up to `batch_size` pages, and analyzes
+    them with one `analyze_batch` call, so spaCy processes them through
+    `nlp.pipe` while the next pages are being extracted. Results keep their
+    item, so attribution to pages is unchanged. The producer runs in a copy of
+    the caller's context and its spans nest under the caller's span.
+    """
+
+    def __init__(
+        self,
+        analyze_batch: Callable[[List[str]], List[List[RecognizerResult]]],
+        batch_size: int,
+        queue_size: int
+    ):
+        self.analyze_batch = analyze_batch
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(self.batch_size, queue_size)
+        self.stats = {"pages": 0, "batches": 0}
+
+    def run(self, pages: Iterable[Tuple[T, str]]) -> Iterator[Tuple[T, str, List[RecognizerResult]]]:
+        """Analyze the extracted pages, yielding `(item, text, results)` in page order"""
+        pending: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(entry) -> bool:
+            while not stop.is_set():
+                try:
+                    pending.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page in pages:
+                    if not put(page):
+                        return
+                put(_DONE)
+            except BaseException as e:
+                put(e)
+
+        producer = _get_extraction_executor().submit(contextvars.copy_context().run, produce)
+
+        try:
+            done = False
+            while not done:
+                batch = []
+                entry = pending.get()
+                # Take what is ready without waiting for a full batch, extraction keeps going meanwhile
+                while True:
+                    if entry is _DONE:
+                        done = True
+                        break
+                    if isinstance(entry, BaseException):
+                        raise entry
+                    batch.append(entry)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        entry = pending.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    batch_results = self.analyze_batch([text for _, text in batch])
+                    self.stats["pages"] += len(batch)
+                    self.stats["batches"] += 1
+                    for (item, text), results in zip(batch, batch_results):
+                        yield item, text, results
+        finally:
+            stop.set()
+            producer.result()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _get_extraction_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.pdf_extraction_workers,
+                    thread_name_prefix="pdf-extract"
+                )
+    return _executor
@@ -0,0 +1,255 @@
+import re
+import random
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from presidio_analyzer import AnalyzerEngine, RecognizerResult
+from spacy.util import get_lang_class
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFILTER_MODES = ("off", "text", "sentence")
+
+# Sentence ends: terminal punctuation followed by whitespace, or line breaks
+SENTENCE_BOUNDARY = re.compile(r"[.!?]+\s+|\n+")
+# Characters that may sit between a sentence boundary and its first word
+SENTENCE_OPENERS = " \t\"'([{«“‘-–—*•"
+
+
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    spans, start = [], 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        if boundary.end() > start:
+            spans.append((start, boundary.end()))
+            start = boundary.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+class PiiPrefilter:
+    """
+    Cheap screen in front of the analyzer for text without any PII signal.
+
+    A single compiled regex looks for the signals every default recognizer
+    needs: digits (phone, card, IBAN, dates, ids), `@` (email), domain-like
+    tokens (URL), capitalized words (names and places for spaCy NER) and the
+    deny-list terms, which cover lowercase time expressions spaCy tags as
+    DATE_TIME as well as the deny lists of the registry's pattern recognizers.
+    A capitalized word starting a sentence only counts when it is not a stop
+    word of the language, otherwise nearly every text would pass.
+
+    In `text` mode a text without any signal is not analyzed at all. In
+    `sentence` mode sentences without a signal are blanked out with spaces
+    before analysis, so offsets stay the same and spaCy skips their tokens.
+    Recognizers added to the registry that match text without these signals
+    are not covered; the shadow mode measures what the filter misses.
+    """
+
+    def __init__(self, analyzer: AnalyzerEngine, mode: str, deny_list: Iterable[str], shadow_rate: float):
+        if mode not in PREFILTER_MODES:
+            raise ValueError(f"Unknown pre-filter mode '{mode}', use {', '.join(PREFILTER_MODES)}")
+
+        self.analyzer = analyzer
+        self.mode = mode
+        self.shadow_rate = shadow_rate
+
+        terms = {term.lower() for term in deny_list if term}
+        for recognizer in analyzer.registry.recognizers:
+            terms.update(term.lower() for term in getattr(recognizer, "deny_list", None) or [])
+        # Longest first, so the alternation prefers whole terms
+        term_pattern = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+        self._pattern = re.compile(
+            r"(?P<digit>\d)"
+            r"|(?P<at>@)"
+            r"|(?P<domain>\w\.[A-Za-z]{2,}\b)"
+            + (rf"|(?P<term>\b(?i:{term_pattern})\b)" if term_pattern else "")
+            + r"|(?P<capitalized>\b[A-ZÀ-ÖØ-Þ]\w*)"
+        )
+        self._stop_words: Dict[str, FrozenSet[str]] = {}
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "texts": 0, "texts_skipped": 0, "sentences": 0, "sentences_skipped": 0,
+            "characters": 0, "characters_skipped": 0
+        }
+        self._triggers: Dict[str, int] = {}
+        self._shadow = {"compared": 0, "texts_with_misses": 0, "missed_entities": 0}
+        self._missed_by_type: Dict[str, int] = {}
+        self._shadow_tasks = set()
+
+    def _stop_words_for(self, language: str) -> FrozenSet[str]:
+        if language not in self._stop_words:
+            try:
+                self._stop_words[language] = frozenset(get_lang_class(language).Defaults.stop_words)
+            except Exception:
+                self._stop_words[language] = frozenset()
+        return self._stop_words[language]
+
+    def _trigger(self, text: str, stop_words: FrozenSet[str]) -> Optional[str]:
+        """The kind of the first PII signal in the text, or None when it is clean"""
+        for match in self._pattern.finditer(text):
+            kind = match.lastgroup
+            if kind == "capitalized" and match.group().lower() in stop_words:
+                # Ignore a capitalized stop word only where any word would be capitalized
+                before = text[:match.start()].rstrip(SENTENCE_OPENERS)
+                if not before or before[-1] in ".!?\n:":
+                    continue
+            return kind
+        return None
+
+    def screen(self, text: str, language: str) -> Optional[str]:
+        """
+        The text to analyze: unchanged, with clean sentences blanked out, or
+        None when nothing needs to be analyzed.
+        """
+        stop_words = self._stop_words_for(language)
+        triggers: List[str] = []
+
+        if self.mode == "text":
+            trigger = self._trigger(text, stop_words)
+            spans, kept = [(0, len(text))], ([(0, len(text))] if trigger else [])
+            triggers.append(trigger)
+        else:
+            spans, kept = _sentence_spans(text), []
+            for start, end in spans:
+                trigger = self._trigger(text[start:end], stop_words)
+                triggers.append(trigger)
+                if trigger:
+                    kept.append((start, end))
+
+        kept_characters = sum(end - start for start, end in kept)
+        with self._lock:
+            self._stats["texts"] += 1
+            self._stats["texts_skipped"] += not kept
+            self._stats["sentences"] += len(spans)
+            self._stats["sentences_skipped"] += len(spans) - len(kept)
+            self._stats["characters"] += len(text)
+            self._stats["characters_skipped"] += len(text) - kept_characters
+            for trigger in triggers:
+                if trigger:
+                    self._triggers[trigger] = self._triggers.get(trigger, 0) + 1
+
+        if not kept:
+            return None
+        if len(kept) == len(spans):
+            return text
+
+        parts, position = [], 0
+        for start, end in kept:
+            parts.append(" " * (start - position))
+            parts.append(text[start:end])
+            position = end
+        parts.append(" " * (len(text) - position))
+        return "".join(parts)
+
+    async def analyze(
+        self,
+        text: str,
+        language: str,
+        entities: Optional[List[str]],
+        score_threshold: float,
+        analyze: Callable[[str], Awaitable[List[RecognizerResult]]]
+    ) -> List[RecognizerResult]:
+        """
+        Run `analyze` on the screened text, or return no results for clean text.
+
+        With a shadow rate, that share of the calls where the filter removed
+        anything is analyzed again in full in the background, counting the
+        entities the filter made the analyzer miss.
+        """
+        screened = self.screen(text, language)
+        results = await analyze(screened) if screened is not None else []
+
+        if screened != text and self.shadow_rate and random.random() < self.shadow_rate:
+            task = asyncio.get_running_loop().create_task(
+                self._shadow_compare(text, language, entities, score_threshold, results)
+            )
+            self._shadow_tasks.add(task)
+            task.add_done_callback(self._shadow_tasks.discard)
+
+        return results
+
+    async def _shadow_compare(
+        self,
+        text: str,
+        language: str,
+        entities: Optional[List[str]],
+        score_threshold: float,
+        results: List[RecognizerResult]
+    ):
+        try:
+            full_results = await run_in_threadpool(
+                self.analyzer.analyze,
+                text=text,
+                entities=entities,
+                language=language,
+                score_threshold=score_threshold
+            )
+        except Exception as e:
+            logger.error(f"Pre-filter shadow analysis failed: {str(e)}")
+            return
+
+        found = {(result.entity_type, result.start, result.end) for result in results}
+        missed = [result.entity_type for result in full_results if (result.entity_type, result.start, result.end) not in found]
+
+        with self._lock:
+            self._shadow["compared"] += 1
+            self._shadow["texts_with_misses"] += bool(missed)
+            self._shadow["missed_entities"] += len(missed)
+            for entity_type in missed:
+                self._missed_by_type[entity_type] = self._missed_by_type.get(entity_type, 0) + 1
+
+        if missed:
+            # Entity types only, the text itself must not end up in the logs
+            logger.warning(f"Pre-filter ({self.mode}) missed {len(missed)} entities: {', '.join(sorted(set(missed)))}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            shadow = {**self._shadow, "missed_by_type": dict(self._missed_by_type)}
+            triggers = dict(self._triggers)
+
+        return {
+            "mode": self.mode,
+            **stats,
+            "text_skip_rate": stats["texts_skipped"] / stats["texts"] if stats["texts"] else 0,
+            "sentence_skip_rate": stats["sentences_skipped"] / stats["sentences"] if stats["sentences"] else 0,
+            "character_skip_rate": stats["characters_skipped"] / stats["characters"] if stats["characters"] else 0,
+            "triggers": triggers,
+            "shadow_rate": self.shadow_rate,
+            "shadow": shadow
+        }
+
+
+_prefilter: Optional[PiiPrefilter] = None
+_lock = threading.Lock()
+
+
+def get_prefilter(analyzer: AnalyzerEngine) -> Optional[PiiPrefilter]:
+    """The process-wide pre-filter, None when PREFILTER_MODE is off"""
+    global _prefilter
+
+    if settings.prefilter_mode == "off":
+        return None
+    if _prefilter is None:
+        with _lock:
+            if _prefilter is None:
+                _prefilter = PiiPrefilter(
+                    analyzer,
+                    mode=settings.prefilter_mode,
+                    deny_list=settings.prefilter_deny_list,
+                    shadow_rate=settings.prefilter_shadow_rate
+                )
+    return _prefilter
+
+
+def get_prefilter_stats() -> Optional[dict]:
+    """Skip and shadow counters, None while the pre-filter is off or unused"""
+    return _prefilter.get_stats() if _prefilter is not None else None
@@ -0,0 +1,308 @@
+import io
+import hmac
+import json
+import time
+import uuid
+import pstats
+import logging
+import cProfile
+import threading
+from pathlib import Path
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # Optional: sampling profiles need pyinstrument, otherwise cProfile is used
+    SamplingProfiler = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_KEY_HEADER = b"x-admin-key"
+
+# Time spent per recognizer (and in the NLP engine) during the current request
+_request_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("request_timings", default=None)
+
+
+class RecognizerTimings:
+    """Process-wide call counts and durations per recognizer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, list] = {}
+        self.since = time.time()
+
+    def add(self, name: str, duration: float):
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                self._timings[name] = [1, duration, duration]
+            else:
+                timing[0] += 1
+                timing[1] += duration
+                timing[2] = max(timing[2], duration)
+
+        request_timings = _request_timings.get()
+        if request_timings is not None:
+            request_timing = request_timings.setdefault(name, [0, 0.0])
+            request_timing[0] += 1
+            request_timing[1] += duration
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = {name: list(timing) for name, timing in self._timings.items()}
+
+        return {
+            "since": self.since,
+            "recognizers": {
+                name: {
+                    "calls": calls,
+                    "total_ms": total * 1000,
+                    "mean_ms": total / calls * 1000,
+                    "max_ms": longest * 1000
+                }
+                for name, (calls, total, longest) in sorted(timings.items(), key=lambda item: -item[1][1])
+            }
+        }
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self.since = time.time()
+
+
+recognizer_timings = RecognizerTimings()
+
+
+def _timed(name: str, function):
+    def timed(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            recognizer_timings.add(name, time.perf_counter() - start_time)
+
+    timed.__wrapped__ = function
+    return timed
+
+
+def _timed_batches(name: str, function):
+    # process_batch is lazy: the pipeline runs while the results are iterated, one call per batch
+    def timed(*args, **kwargs):
+        duration = 0.0
+        iterator = iter(function(*args, **kwargs))
+        try:
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    duration += time.perf_counter() - start_time
+                yield item
+        finally:
+            recognizer_timings.add(name, duration)
+
+    timed.__wrapped__ = function
+    return timed
+
+
+def instrument_analyzer(analyzer):
+    """Time every recognizer of the analyzer's registry and the NLP engine, single texts and batches"""
+    for recognizer in analyzer.registry.recognizers:
+        if not hasattr(recognizer.analyze, "__wrapped__"):
+            recognizer.analyze = _timed(recognizer.name, recognizer.analyze)
+
+    nlp_engine = analyzer.nlp_engine
+    name = f"nlp_engine:{type(nlp_engine).__name__}"
+    if not hasattr(nlp_engine.process_text, "__wrapped__"):
+        nlp_engine.process_text = _timed(name, nlp_engine.process_text)
+    if not hasattr(nlp_engine.process_batch, "__wrapped__"):
+        nlp_engine.process_batch = _timed_batches(f"{name}:batch", nlp_engine.process_batch)
+
+    logger.info(f"Timing {len(analyzer.registry.recognizers)} recognizers")
+
+
+class RequestProfiler:
+    """
+    Profiles the thread it is started on.
+
+    Uses the pyinstrument sampling profiler when installed, else cProfile.
+    Only one request is profiled at a time; `start` returns None while another
+    profile is running, and that request simply runs unprofiled.
+    Requests served concurrently on the same event loop show up in the
+    profile as well, and work handed to thread pools does not.
+    """
+
+    _busy = threading.Lock()
+
+    def __init__(self):
+        if SamplingProfiler is not None:
+            self.kind = "sampling"
+            self._profiler = SamplingProfiler(interval=settings.profiling_interval_ms / 1000, async_mode="enabled")
+        else:
+            self.kind = "cprofile"
+            self._profiler = cProfile.Profile()
+
+    @classmethod
+    def start(cls) -> Optional["RequestProfiler"]:
+        if not cls._busy.acquire(blocking=False):
+            return None
+        try:
+            profiler = cls()
+            if profiler.kind == "sampling":
+                profiler._profiler.start()
+            else:
+                profiler._profiler.enable()
+            return profiler
+        except Exception:
+            cls._busy.release()
+            raise
+
+    def stop(self) -> Dict[str, str]:
+        """Stop profiling and render the reports, by file extension"""
+        try:
+            if self.kind == "sampling":
+                self._profiler.stop()
+                return {
+                    "txt": self._profiler.output_text(unicode=False, color=False),
+                    "html": self._profiler.output_html()
+                }
+
+            self._profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(self._profiler, stream=report).sort_stats("cumulative").print_stats(60)
+            return {"txt": report.getvalue()}
+        finally:
+            RequestProfiler._busy.release()
+
+
+class ProfileStore:
+    """Saved profiles on disk, shared by all workers, keeping the newest `keep`"""
+
+    def __init__(self, directory: str, keep: int = 50):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def save(self, profile_id: str, metadata: dict, reports: Dict[str, str]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for extension, report in reports.items():
+            (self.directory / f"{profile_id}.{extension}").write_text(report, encoding="utf-8")
+        # Metadata last, listings only see profiles whose reports are complete
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(metadata), encoding="utf-8")
+        self._prune()
+
+    def _metadata_files(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def _prune(self):
+        for path in self._metadata_files()[self.keep:]:
+            for report in self.directory.glob(f"{path.stem}.*"):
+                report.unlink(missing_ok=True)
+
+    def list(self, limit: Optional[int] = None) -> List[dict]:
+        profiles = []
+        for path in self._metadata_files()[:limit]:
+            try:
+                profiles.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # Pruned by another worker meanwhile
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        path = self.directory / f"{profile_id}.json"
+        if not path.is_file() or path.parent != self.directory:
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def get_report(self, profile_id: str, extension: str) -> Optional[str]:
+        path = self.directory / f"{profile_id}.{extension}"
+        if not path.is_file() or path.parent != self.directory:
+            return None
+        return path.read_text(encoding="utf-8")
+
+
+profile_store = ProfileStore(settings.profiling_dir, keep=settings.profiling_keep)
+
+
+def is_admin_key(key: Optional[str]) -> bool:
+    return bool(settings.admin_api_key) and key is not None and hmac.compare_digest(key, settings.admin_api_key)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles API requests and saves the slow ones.
+
+    With PROFILING_ENABLED every API request is profiled and kept when it takes
+    longer than PROFILING_SLOW_MS. A single request can be profiled on demand
+    with an `X-Profile: 1` header and a valid `X-Admin-Key`; its profile is
+    always kept and its id returned in the `X-Profile-Id` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope["path"].startswith("/api/v1/admin"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        forced = PROFILE_HEADER in headers and is_admin_key(headers.get(ADMIN_KEY_HEADER, b"").decode("latin-1"))
+        if not (forced or settings.profiling_enabled):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = RequestProfiler.start()
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        timings: Dict[str, list] = {}
+        token = _request_timings.set(timings)
+        status = {"code": None}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if forced:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - start_time
+            _request_timings.reset(token)
+            reports = profiler.stop()
+
+            if forced or duration * 1000 >= settings.profiling_slow_ms:
+                metadata = {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status["code"],
+                    "duration_ms": duration * 1000,
+                    "started_at": time.time() - duration,
+                    "forced": forced,
+                    "profiler": profiler.kind,
+                    "reports": sorted(reports),
+                    "recognizers": {
+                        name: {"calls": calls, "total_ms": total * 1000}
+                        for name, (calls, total) in sorted(timings.items(), key=lambda item: -item[1][1])
+                    }
+                }
+                try:
+                    profile_store.save(profile_id, metadata, reports)
+                    logger.info(f"Saved profile {profile_id} of {scope['method']} {scope['path']} ({duration * 1000:.0f} ms)")
+                except OSError as e:
+                    logger.error(f"Saving profile {profile_id} failed: {str(e)}")
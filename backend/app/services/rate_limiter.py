@@ -0,0 +1,298 @@
+import math
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Quota dimensions and the window (in seconds) their configured limit refers to
+QUOTA_WINDOWS = {
+    "requests_per_second": ("requests", 1.0),
+    "characters_per_minute": ("characters", 60.0),
+    "pages_per_hour": ("pages", 3600.0),
+}
+
+
+# Token bucket to charge: key, capacity, refill rate per second and amount
+Bucket = Tuple[str, float, float, float]
+
+
+class TokenBucketStore(ABC):
+    """Base class for token bucket storage backends"""
+
+    # Whether calls may wait on I/O or other processes, async callers then run them on the threadpool
+    blocking = False
+
+    @abstractmethod
+    def consume_many(self, buckets: List[Bucket], allow_debt: bool = False) -> List[float]:
+        """
+        Take tokens from several buckets at once, all or nothing.
+
+        Returns one value per bucket: all 0.0 when the tokens were granted,
+        otherwise the seconds until each bucket will have enough tokens (0.0
+        for the buckets that already do), and nothing is taken. With
+        `allow_debt` the tokens are always taken and buckets may go negative.
+        """
+        pass
+
+    def consume(self, key: str, capacity: float, refill_rate: float, amount: float, allow_debt: bool = False) -> float:
+        """Take `amount` tokens from one bucket, returns 0.0 or the seconds to wait"""
+        return self.consume_many([(key, capacity, refill_rate, amount)], allow_debt)[0]
+
+    @staticmethod
+    def _take(states: List[Tuple[float, float]], buckets: List[Bucket], allow_debt: bool):
+        """
+        Shared token bucket arithmetic on the `(tokens, elapsed)` state of every
+        bucket, returns (new_tokens, retry_afters)
+        """
+        tokens = [
+            min(capacity, current + elapsed * refill_rate)
+            for (current, elapsed), (_, capacity, refill_rate, _) in zip(states, buckets)
+        ]
+
+        # A single request larger than the whole bucket is admitted once the bucket is full
+        retry_afters = [
+            0.0 if allow_debt or available >= min(amount, capacity) else (min(amount, capacity) - available) / refill_rate
+            for available, (_, capacity, refill_rate, amount) in zip(tokens, buckets)
+        ]
+        if any(retry_afters):
+            return tokens, retry_afters
+
+        return [available - bucket[3] for available, bucket in zip(tokens, buckets)], retry_afters
+
+
+class InMemoryTokenBucketStore(TokenBucketStore):
+    """Process-local token buckets, enforced per worker"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def consume_many(self, buckets: List[Bucket], allow_debt: bool = False) -> List[float]:
+        now = time.monotonic()
+
+        with self._lock:
+            states = []
+            for key, capacity, refill_rate, _ in buckets:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    if len(self._buckets) >= self.max_keys:
+                        self._evict_idle(now)
+                    bucket = self._buckets[key] = [capacity, now, capacity, refill_rate]
+                states.append((bucket[0], now - bucket[1]))
+
+            tokens, retry_afters = self._take(states, buckets, allow_debt)
+            for (key, capacity, refill_rate, _), available in zip(buckets, tokens):
+                self._buckets[key] = [available, now, capacity, refill_rate]
+            return retry_afters
+
+    def _evict_idle(self, now: float):
+        """Drop buckets that have refilled completely, they carry no state"""
+        idle = [
+            key for key, (tokens, updated, capacity, refill_rate) in self._buckets.items()
+            if tokens + (now - updated) * refill_rate >= capacity
+        ]
+        for key in idle:
+            del self._buckets[key]
+        logger.debug(f"Evicted {len(idle)} idle rate limit buckets")
+
+
+class SQLiteTokenBucketStore(TokenBucketStore):
+    """Token buckets in a SQLite file shared by all workers on the same host"""
+
+    # Waits for the write lock of other workers, up to the busy timeout
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def consume_many(self, buckets: List[Bucket], allow_debt: bool = False) -> List[float]:
+        # Wall clock time, monotonic clocks are not comparable across processes
+        now = time.time()
+        connection = self._connection()
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            states = []
+            for key, capacity, _, _ in buckets:
+                row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                states.append((tokens, max(0.0, now - updated)))
+
+            tokens, retry_afters = self._take(states, buckets, allow_debt)
+            connection.executemany(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                [(key, available, now) for (key, _, _, _), available in zip(buckets, tokens)]
+            )
+            connection.execute("COMMIT")
+            return retry_afters
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+
+def api_key_id(request: Request) -> Optional[str]:
+    """Short hash of the request's API key (X-API-Key or bearer token), None without one"""
+    api_key = request.headers.get("x-api-key")
+    authorization = request.headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[7:].strip()
+
+    # Never keep raw credentials in stores and caches
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else None
+
+
+def client_key(request: Request) -> str:
+    """Identify the client by API key, falling back to its IP address"""
+    key_id = api_key_id(request)
+    if key_id:
+        return "key:" + key_id
+
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if settings.rate_limit_trust_forwarded_for and forwarded_for:
+        return "ip:" + forwarded_for.split(",")[0].strip()
+
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class RateLimiter:
+    """Per-client quotas for requests, characters and pages per endpoint group"""
+
+    def __init__(self, store: TokenBucketStore, limits: Dict[str, Dict[str, float]]):
+        self.store = store
+        self.limits = limits
+
+    def client_key(self, request: Request) -> str:
+        return client_key(request)
+
+    def consume(self, client_key: str, group: str, allow_debt: bool = False, **amounts: float):
+        """
+        Charge the given amounts against the group limits, raising 429 when one
+        is exhausted; a rejected request is charged nothing.
+        """
+        group_limits = self.limits.get(group, {})
+        buckets: List[Bucket] = []
+        limit_names = []
+
+        for limit_name, (dimension, window) in QUOTA_WINDOWS.items():
+            amount = amounts.get(dimension, 0)
+            limit = group_limits.get(limit_name, 0)
+            if not amount or not limit:
+                continue
+            buckets.append((f"{group}:{dimension}:{client_key}", float(limit), limit / window, float(amount)))
+            limit_names.append(limit_name)
+
+        if not buckets:
+            return
+
+        retry_afters = self.store.consume_many(buckets, allow_debt=allow_debt)
+        retry_after, limit_name = max(zip(retry_afters, limit_names))
+        if retry_after > 0:
+            limit = group_limits[limit_name]
+            logger.warning(f"Rate limit exceeded for {client_key}: {group} {limit_name}={limit}")
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {limit_name} for '{group}' is {limit}",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    async def consume_async(self, client_key: str, group: str, allow_debt: bool = False, **amounts: float):
+        """`consume` for the event loop, on the threadpool when the store blocks"""
+        if self.store.blocking:
+            await run_in_threadpool(self.consume, client_key, group, allow_debt, **amounts)
+        else:
+            self.consume(client_key, group, allow_debt, **amounts)
+
+
+class RateLimitContext:
+    """
+    Quota handle bound to one request, used by routes to charge characters and
+    pages. Routes await the `_async` methods, the plain ones are for code
+    already running on a worker thread.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter], client_key: str, group: str):
+        self.limiter = limiter
+        self.client_key = client_key
+        self.group = group
+
+    def consume(self, **amounts: float):
+        """Check and charge amounts known before processing"""
+        if self.limiter:
+            self.limiter.consume(self.client_key, self.group, **amounts)
+
+    def charge(self, **amounts: float):
+        """Charge amounts only known after processing, never rejects the current request"""
+        if self.limiter:
+            self.limiter.consume(self.client_key, self.group, allow_debt=True, **amounts)
+
+    async def consume_async(self, **amounts: float):
+        if self.limiter:
+            await self.limiter.consume_async(self.client_key, self.group, **amounts)
+
+    async def charge_async(self, **amounts: float):
+        if self.limiter:
+            await self.limiter.consume_async(self.client_key, self.group, allow_debt=True, **amounts)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Get the process-wide rate limiter, or None when rate limiting is disabled"""
+    global _rate_limiter
+
+    if not settings.rate_limit_enabled:
+        return None
+
+    if _rate_limiter is None:
+        if settings.rate_limit_backend == "sqlite":
+            store = SQLiteTokenBucketStore(settings.rate_limit_store_path)
+        else:
+            store = InMemoryTokenBucketStore()
+        _rate_limiter = RateLimiter(store, settings.rate_limits)
+        logger.info(f"Initialized rate limiter: backend={settings.rate_limit_backend}, groups={list(settings.rate_limits)}")
+
+    return _rate_limiter
+
+
+def rate_limit(group: str):
+    """Dependency factory charging one request against the given endpoint group"""
+
+    async def dependency(request: Request) -> RateLimitContext:
+        limiter = get_rate_limiter()
+        if limiter is None:
+            return RateLimitContext(None, "", group)
+
+        context = RateLimitContext(limiter, limiter.client_key(request), group)
+        await context.consume_async(requests=1)
+        return context
+
+    return dependency
@@ -0,0 +1,336 @@
+import hmac
+import time
+import uuid
+import queue
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS documents ("
+    "document_id TEXT PRIMARY KEY, source TEXT NOT NULL, language TEXT, "
+    "characters INTEGER NOT NULL, entity_count INTEGER NOT NULL, analyzed_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS entities ("
+    "id INTEGER PRIMARY KEY, document_id TEXT NOT NULL, entity_type TEXT NOT NULL, "
+    "start INTEGER NOT NULL, \"end\" INTEGER NOT NULL, score REAL NOT NULL, text TEXT, analyzed_at REAL NOT NULL)",
+    # "Which documents contain X" and counts per type are answered from these indexes alone
+    "CREATE INDEX IF NOT EXISTS idx_entities_type_document ON entities (entity_type, document_id)",
+    "CREATE INDEX IF NOT EXISTS idx_entities_type_time ON entities (entity_type, analyzed_at)",
+    "CREATE INDEX IF NOT EXISTS idx_entities_document ON entities (document_id)",
+    "CREATE INDEX IF NOT EXISTS idx_documents_time ON documents (analyzed_at)",
+]
+
+_STOP = object()
+
+
+def content_document_id(text: str) -> str:
+    """
+    Default document id: an HMAC of the analyzed text under RESULT_STORE_ID_KEY,
+    so the same text keeps its id, or a random id without a key. A plain hash
+    of a short text (a name, an email) could be reversed by guessing.
+    """
+    if settings.result_store_id_key:
+        digest = hmac.new(settings.result_store_id_key.encode("utf-8"), text.encode("utf-8"), hashlib.sha256)
+        return "hmac-sha256:" + digest.hexdigest()
+    return uuid.uuid4().hex
+
+
+class ResultStore:
+    """
+    Persistent store of analysis results for audits.
+
+    Results are queued by the request handlers and written in batches by a
+    background thread, so recording never waits for the disk. Re-analyzing a
+    document replaces its previous results. Entity texts are only stored when
+    RESULT_STORE_INCLUDE_TEXT is set, otherwise the store holds positions only.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        include_text: bool = False,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        queue_size: int = 10_000
+    ):
+        self.path = path
+        self.include_text = include_text
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.dropped = 0
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _ensure_writer(self):
+        # Started lazily so pre-forked workers each get their own writer thread
+        if self._writer is None or not self._writer.is_alive():
+            with self._writer_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+                    self._writer.start()
+
+    def record(
+        self,
+        document_id: str,
+        text: str,
+        entities: Iterable,
+        source: str,
+        language: Optional[str] = None
+    ):
+        """Queue the results (spans or EntityResult models) of one analyzed document, dropping them if the writer falls behind"""
+        self._ensure_writer()
+        record = (
+            document_id, source, language, len(text), time.time(),
+            [
+                (entity.entity_type, entity.start, entity.end, entity.score, entity.text if self.include_text else None)
+                for entity in entities
+            ]
+        )
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Result store queue full, dropped results of {document_id}")
+
+    def _write_loop(self):
+        connection = self._connect()
+        stopping = False
+
+        while not stopping:
+            batch = []
+            entity_count = 0
+            try:
+                item = self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    entity_count += len(item[5])
+                    if entity_count >= self.batch_size:
+                        break
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._write_batch(connection, batch)
+                except Exception as e:
+                    logger.error(f"Writing {len(batch)} documents to the result store failed: {str(e)}")
+
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: list):
+        # Only the latest analysis of a document re-analyzed within the batch is kept
+        batch = list({record[0]: record for record in batch}.values())
+
+        with connection:
+            connection.executemany(
+                "DELETE FROM entities WHERE document_id = ?",
+                [(document_id,) for document_id, *_ in batch]
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO documents "
+                "(document_id, source, language, characters, entity_count, analyzed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (document_id, source, language, characters, len(entities), analyzed_at)
+                    for document_id, source, language, characters, analyzed_at, entities in batch
+                ]
+            )
+            connection.executemany(
+                "INSERT INTO entities (document_id, entity_type, start, \"end\", score, text, analyzed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (document_id, *entity, analyzed_at)
+                    for document_id, _, _, _, analyzed_at, entities in batch
+                    for entity in entities
+                ]
+            )
+        logger.debug(f"Stored results of {len(batch)} documents")
+
+    def close(self):
+        """Write everything still queued and stop the writer"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    # Queries, run on their own connection in the calling thread
+
+    def _time_filter(self, since: Optional[float], until: Optional[float], column: str = "analyzed_at"):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append(f"{column} < ?")
+            params.append(until)
+        return clauses, params
+
+    def entity_counts(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        document_id: Optional[str] = None
+    ) -> dict:
+        """Entity and document counts per entity type"""
+        clauses, params = self._time_filter(since, until)
+        if document_id:
+            clauses.append("document_id = ?")
+            params.append(document_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT entity_type, COUNT(*), COUNT(DISTINCT document_id) FROM entities {where} "
+                f"GROUP BY entity_type ORDER BY COUNT(*) DESC",
+                params
+            ).fetchall()
+            document_clauses, document_params = self._time_filter(since, until)
+            if document_id:
+                document_clauses.append("document_id = ?")
+                document_params.append(document_id)
+            documents = connection.execute(
+                "SELECT COUNT(*) FROM documents"
+                + (f" WHERE {' AND '.join(document_clauses)}" if document_clauses else ""),
+                document_params
+            ).fetchone()[0]
+        finally:
+            connection.close()
+
+        return {
+            "documents_analyzed": documents,
+            "entity_types": {
+                entity_type: {"entities": entities, "documents": document_count}
+                for entity_type, entities, document_count in rows
+            }
+        }
+
+    def find_documents(
+        self,
+        entity_type: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[dict]:
+        """Documents containing an entity type (or any entity), with their match counts"""
+        clauses, params = self._time_filter(since, until, "e.analyzed_at")
+        if entity_type:
+            clauses.append("e.entity_type = ?")
+            params.append(entity_type)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT e.document_id, COUNT(*), MAX(e.score), d.source, d.analyzed_at "
+                f"FROM entities e JOIN documents d ON d.document_id = e.document_id {where} "
+                f"GROUP BY e.document_id ORDER BY d.analyzed_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return [
+            {"document_id": document_id, "matches": matches, "max_score": max_score, "source": source, "analyzed_at": analyzed_at}
+            for document_id, matches, max_score, source, analyzed_at in rows
+        ]
+
+    def get_document(self, document_id: str) -> Optional[dict]:
+        """Stored metadata and entities of one document"""
+        connection = self._connect()
+        try:
+            document = connection.execute(
+                "SELECT source, language, characters, entity_count, analyzed_at FROM documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+            if document is None:
+                return None
+            entities = connection.execute(
+                "SELECT entity_type, start, \"end\", score, text FROM entities WHERE document_id = ? ORDER BY start",
+                (document_id,)
+            ).fetchall()
+        finally:
+            connection.close()
+
+        source, language, characters, entity_count, analyzed_at = document
+        return {
+            "document_id": document_id,
+            "source": source,
+            "language": language,
+            "characters": characters,
+            "entity_count": entity_count,
+            "analyzed_at": analyzed_at,
+            "entities": [
+                {"entity_type": entity_type, "start": start, "end": end, "score": score, "text": text}
+                for entity_type, start, end, score, text in entities
+            ]
+        }
+
+    def delete_document(self, document_id: str) -> bool:
+        """Remove all stored results of a document"""
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM entities WHERE document_id = ?", (document_id,))
+                deleted = connection.execute("DELETE FROM documents WHERE document_id = ?", (document_id,)).rowcount
+        finally:
+            connection.close()
+        return deleted > 0
+
+    def get_stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "dropped": self.dropped, "include_text": self.include_text}
+
+
+_store: Optional[ResultStore] = None
+_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """Get the process-wide result store, None when storing results is disabled"""
+    global _store
+
+    if not settings.result_store_enabled:
+        return None
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = ResultStore(
+                    settings.result_store_path,
+                    include_text=settings.result_store_include_text,
+                    batch_size=settings.result_store_batch_size,
+                    flush_interval=settings.result_store_flush_interval_ms / 1000,
+                    queue_size=settings.result_store_queue_size
+                )
+
+    return _store
+
+
+def close_result_store():
+    """Flush and stop the result store of this process, if one was created"""
+    if _store is not None:
+        _store.close()
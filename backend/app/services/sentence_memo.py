@@ -0,0 +1,220 @@
+import re
+import bisect
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerResult
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends: terminal punctuation (and closing quotes) before the capitalized
+# or numeric start of the next sentence, or a blank line
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])|\n\s*\n")
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "st", "no", "nr", "inc", "ltd", "co", "corp", "jr", "sr",
+    "vs", "etc", "e.g", "i.e", "fig", "art", "sec", "ref", "dept", "approx"
+})
+TOKEN = re.compile(r"\S+")
+
+# (entity type, start, end, score) relative to the normalized sentence
+MemoEntry = Tuple[Tuple[str, int, int, float], ...]
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """Offsets of the sentences of a text, not splitting after abbreviations and initials"""
+    spans, start = [], 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        if text[boundary.start() - 1:boundary.start()] == "." and boundary.group().count("\n") < 2:
+            word = text[:boundary.start() - 1].rsplit(None, 1)[-1:] or [""]
+            word = word[0].lstrip("\"'([").lower()
+            if word in ABBREVIATIONS or len(word) == 1:
+                continue
+        if boundary.start() > start:
+            spans.append((start, boundary.start()))
+        start = boundary.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+class TenantSentenceCache:
+    """
+    Analysis results of sentences shared across the requests of a tenant.
+
+    Keyed by the digest of the normalized sentence and the analysis
+    parameters; only entity types, offsets and scores are kept, never text.
+    Each tenant has its own LRU so one tenant cannot learn another's
+    sentences from cache hits or evict them.
+    """
+
+    def __init__(self, max_entries: int, max_tenants: int):
+        self.max_entries = max_entries
+        self.max_tenants = max_tenants
+        self._tenants: "OrderedDict[str, OrderedDict[bytes, MemoEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant: str, digest: bytes) -> Optional[MemoEntry]:
+        with self._lock:
+            entries = self._tenants.get(tenant)
+            if entries is None or digest not in entries:
+                return None
+            self._tenants.move_to_end(tenant)
+            entries.move_to_end(digest)
+            return entries[digest]
+
+    def put(self, tenant: str, digest: bytes, entry: MemoEntry):
+        with self._lock:
+            entries = self._tenants.get(tenant)
+            if entries is None:
+                entries = self._tenants[tenant] = OrderedDict()
+                if len(self._tenants) > self.max_tenants:
+                    self._tenants.popitem(last=False)
+            self._tenants.move_to_end(tenant)
+            entries[digest] = entry
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "entries": sum(len(entries) for entries in self._tenants.values()),
+                "max_entries_per_tenant": self.max_entries
+            }
+
+
+class SentenceMemo:
+    """
+    Analyzes each distinct sentence of a request once.
+
+    Sentences are normalized by collapsing whitespace, so the same clause
+    wrapped differently on two pages is still the same sentence. Sentences
+    not seen before in the request (or the tenant's cache) are analyzed in
+    one `nlp.pipe` batch, and the results of every sentence are projected
+    back onto each of its occurrences. Entities spanning two sentences are
+    not found; the same holds for context words in a neighbouring sentence.
+    """
+
+    def __init__(
+        self,
+        analyzer: AnalyzerEngine,
+        language: str = "en",
+        entities: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
+        tenant: Optional[str] = None
+    ):
+        self.batch_analyzer = BatchAnalyzerEngine(analyzer_engine=analyzer)
+        self.language = language
+        self.entities = entities
+        self.score_threshold = score_threshold
+        self.tenant = tenant if settings.sentence_memo_tenant_enabled else None
+        self._params = f"{language}|{','.join(sorted(entities)) if entities else ''}|{score_threshold}|".encode()
+        self._memo: Dict[bytes, MemoEntry] = {}
+        self.stats = {"sentences": 0, "analyzed": 0, "request_hits": 0, "tenant_hits": 0}
+
+    def _digest(self, normalized: str) -> bytes:
+        return hashlib.blake2b(self._params + normalized.encode(), digest_size=16).digest()
+
+    def analyze(self, text: str) -> List[RecognizerResult]:
+        return self.analyze_many([text])[0]
+
+    def analyze_many(self, texts: List[str]) -> List[List[RecognizerResult]]:
+        """Analyze several texts (e.g. a batch of pages), their new sentences in one batch"""
+        occurrences = []
+        pending: Dict[bytes, str] = {}
+        counts = {"sentences": 0, "analyzed": 0, "request_hits": 0, "tenant_hits": 0}
+
+        for text_index, text in enumerate(texts):
+            for start, end in split_sentences(text):
+                tokens = list(TOKEN.finditer(text, start, end))
+                if not tokens:
+                    continue
+                normalized = " ".join(token.group() for token in tokens)
+                digest = self._digest(normalized)
+                occurrences.append((text_index, digest, tokens))
+                counts["sentences"] += 1
+
+                if digest in self._memo or digest in pending:
+                    counts["request_hits"] += 1
+                    continue
+                cached = _tenant_cache.get(self.tenant, digest) if self.tenant else None
+                if cached is not None:
+                    self._memo[digest] = cached
+                    counts["tenant_hits"] += 1
+                    continue
+                pending[digest] = normalized
+
+        if pending:
+            batch_results = self.batch_analyzer.analyze_iterator(
+                list(pending.values()),
+                language=self.language,
+                entities=self.entities,
+                score_threshold=self.score_threshold
+            )
+            for digest, results in zip(pending, batch_results):
+                entry = tuple((result.entity_type, result.start, result.end, result.score) for result in results)
+                self._memo[digest] = entry
+                if self.tenant:
+                    _tenant_cache.put(self.tenant, digest, entry)
+            counts["analyzed"] = len(pending)
+
+        results: List[List[RecognizerResult]] = [[] for _ in texts]
+        for text_index, digest, tokens in occurrences:
+            entry = self._memo[digest]
+            if not entry:
+                continue
+
+            # Offset of every token in the normalized sentence
+            normalized_starts, position = [], 0
+            for token in tokens:
+                normalized_starts.append(position)
+                position += token.end() - token.start() + 1
+
+            for entity_type, start, end, score in entry:
+                first = bisect.bisect_right(normalized_starts, start) - 1
+                last = bisect.bisect_right(normalized_starts, end - 1) - 1
+                results[text_index].append(RecognizerResult(
+                    entity_type,
+                    tokens[first].start() + start - normalized_starts[first],
+                    tokens[last].start() + end - normalized_starts[last],
+                    score
+                ))
+
+        for name, count in counts.items():
+            self.stats[name] += count
+        _record(counts, len(texts))
+        return results
+
+
+_tenant_cache = TenantSentenceCache(
+    max_entries=settings.sentence_memo_tenant_max_entries,
+    max_tenants=settings.sentence_memo_max_tenants
+)
+_stats_lock = threading.Lock()
+_stats = {"texts": 0, "sentences": 0, "analyzed": 0, "request_hits": 0, "tenant_hits": 0}
+
+
+def _record(counts: dict, texts: int):
+    with _stats_lock:
+        _stats["texts"] += texts
+        for name, count in counts.items():
+            _stats[name] += count
+
+
+def get_sentence_memo_stats() -> Optional[dict]:
+    """Sentence counters since startup, None before the first memoized analysis"""
+    with _stats_lock:
+        stats = dict(_stats)
+    if not stats["texts"]:
+        return None
+    return {
+        **stats,
+        "hit_rate": 1 - stats["analyzed"] / stats["sentences"] if stats["sentences"] else 0,
+        "tenant_cache": _tenant_cache.get_stats() if settings.sentence_memo_tenant_enabled else None
+    }
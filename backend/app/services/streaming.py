@@ -0,0 +1,126 @@
+import re
+import logging
+from typing import List, Optional
+
+from app.config import settings
+from app.services.batching import get_analysis_batcher
+from app.services.engines import get_anonymizer_engine
+
+logger = logging.getLogger(__name__)
+
+# End of a sentence: terminator followed by whitespace, or a line break
+SENTENCE_BOUNDARY = re.compile(r"[.!?](?=\s)|\n")
+
+
+class StreamSegment:
+    """A piece of the input stream cut at a sentence boundary"""
+
+    __slots__ = ("offset", "text")
+
+    def __init__(self, offset: int, text: str):
+        self.offset = offset
+        self.text = text
+
+
+class StreamAnonymizer:
+    """
+    Per-connection state of a streaming anonymization session.
+
+    Incoming text is buffered until a sentence boundary, so every segment is
+    analyzed with its full sentence context. Offsets are counted in characters
+    from the start of the stream, on the input and on the anonymized output.
+    """
+
+    def __init__(
+        self,
+        language: str = "en",
+        entities: Optional[List[str]] = None,
+        score_threshold: float = 0.35
+    ):
+        self.language = language
+        self.entities = entities
+        self.score_threshold = score_threshold
+        self.batcher = get_analysis_batcher()
+        self.anonymizer = get_anonymizer_engine()
+
+        self._buffer = ""
+        self._buffer_offset = 0
+        self.anonymized_offset = 0
+
+    @property
+    def received_characters(self) -> int:
+        return self._buffer_offset + len(self._buffer)
+
+    def feed(self, text: str) -> List[StreamSegment]:
+        """
+        Add text to the buffer and cut off its complete sentences, in segments
+        of at most `stream_max_buffer_chars`. A run of text without a sentence
+        boundary is cut at its last whitespace once it fills a segment.
+        """
+        buffer = self._buffer + text
+        limit = settings.stream_max_buffer_chars
+        segments = []
+        position = 0
+
+        while True:
+            end = position + limit
+            cut = position
+            # One character past the segment, so a terminator at its end sees the following whitespace
+            for match in SENTENCE_BOUNDARY.finditer(buffer, position, min(len(buffer), end + 1)):
+                if match.end() <= end:
+                    cut = match.end()
+
+            if cut == position:
+                if len(buffer) - position < limit:
+                    break
+                cut = buffer.rfind(" ", position, end) + 1
+                if cut <= position:
+                    cut = end
+
+            segments.append(StreamSegment(self._buffer_offset + position, buffer[position:cut]))
+            position = cut
+
+        self._buffer = buffer[position:]
+        self._buffer_offset += position
+        return segments
+
+    def flush(self) -> Optional[StreamSegment]:
+        """Cut off whatever is buffered, e.g. at the end of the stream"""
+        if not self._buffer:
+            return None
+        return self._take(len(self._buffer))
+
+    def _take(self, length: int) -> StreamSegment:
+        segment = StreamSegment(self._buffer_offset, self._buffer[:length])
+        self._buffer = self._buffer[length:]
+        self._buffer_offset += length
+        return segment
+
+    async def anonymize(self, segment: StreamSegment) -> dict:
+        """Analyze a segment on the shared batcher and build its output message"""
+        results = await self.batcher.analyze(
+            segment.text,
+            language=self.language,
+            entities=self.entities,
+            score_threshold=self.score_threshold
+        )
+        anonymized = self.anonymizer.anonymize(text=segment.text, analyzer_results=results)
+
+        message = {
+            "type": "segment",
+            "offset": segment.offset,
+            "length": len(segment.text),
+            "anonymized_offset": self.anonymized_offset,
+            "text": anonymized.text,
+            "entities": [
+                {
+                    "entity_type": result.entity_type,
+                    "start": segment.offset + result.start,
+                    "end": segment.offset + result.end,
+                    "score": result.score
+                }
+                for result in results
+            ]
+        }
+        self.anonymized_offset += len(anonymized.text)
+        return message
@@ -0,0 +1,350 @@
+import os
+import re
+import json
+import mmap
+import time
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from presidio_analyzer import BatchAnalyzerEngine
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models import AnonymizationMode
+from app.services.engines import get_analyzer_engine, get_anonymizer_engine
+from app.services.file_store import get_results_store
+from app.services.operator_plans import get_operator_plan
+
+logger = logging.getLogger(__name__)
+
+# Default unit per file type: logs and JSON Lines by line, prose by paragraph
+TEXT_FILE_UNITS = {".txt": "paragraph", ".log": "line", ".jsonl": "line"}
+
+UNIT_SEPARATORS = {
+    "line": re.compile(rb"\r?\n"),
+    "paragraph": re.compile(rb"\r?\n(?:[ \t]*\r?\n)+"),
+}
+# Undecodable bytes, kept as lone surrogates so they are written back unchanged
+ESCAPED_BYTES = re.compile("[\udc80-\udcff]")
+
+
+def iter_units(data, unit: str, max_bytes: int) -> Iterator[Tuple[int, int, int]]:
+    """
+    `(start, end, separator_end)` byte offsets of the lines or paragraphs of a
+    buffer (e.g. an mmap), searched in place without copying. Units longer
+    than `max_bytes` are cut at their last line break, or at a UTF-8 character
+    boundary when there is none.
+    """
+    separator = UNIT_SEPARATORS[unit]
+    size = len(data)
+    position = 0
+
+    while position < size:
+        limit = min(size, position + max_bytes)
+        match = separator.search(data, position, limit)
+        if match:
+            yield position, match.start(), match.end()
+            position = match.end()
+            continue
+        if limit == size:
+            yield position, size, size
+            return
+
+        cut = data.rfind(b"\n", position, limit)
+        if cut > position:
+            yield position, cut, cut + 1
+            position = cut + 1
+            continue
+
+        cut = limit
+        while cut > position and data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        if cut == position:
+            # Only continuation bytes, not UTF-8 anyway: cut anywhere, but move on
+            cut = limit
+        yield position, cut, cut
+        position = cut
+
+
+def _string_leaves(value, fields: Optional[List[str]]) -> Iterator[Tuple[object, object]]:
+    """`(container, key)` of the non-empty strings of a JSON value, limited to top-level `fields`"""
+    if isinstance(value, dict):
+        keys = [key for key in (fields or value) if key in value]
+        children = ((value, key) for key in keys)
+    elif isinstance(value, list):
+        children = ((value, index) for index in range(len(value)))
+    else:
+        return
+
+    for container, key in children:
+        child = container[key]
+        if isinstance(child, str):
+            if child.strip():
+                yield container, key
+        else:
+            yield from _string_leaves(child, None)
+
+
+class TextJobStore:
+    """
+    Status of text file jobs as JSON files, readable by every worker.
+
+    Status files are replaced atomically, so a poll never sees a half
+    written one. Files of jobs older than the file retention are removed
+    when new jobs are created.
+    """
+
+    def __init__(self, directory: str, max_age: float):
+        self.directory = Path(directory)
+        self.max_age = max_age
+
+    def _path(self, job_id: str) -> Optional[Path]:
+        path = self.directory / f"{job_id}.json"
+        return path if path.parent == self.directory else None
+
+    def save(self, status: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(status["id"])
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(status), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        path = self._path(job_id)
+        if path is None or not path.is_file():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def create(self, **fields) -> dict:
+        self._prune()
+        now = time.time()
+        status = {
+            "id": uuid.uuid4().hex,
+            "state": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "bytes_total": 0,
+            "bytes_processed": 0,
+            "progress": 0.0,
+            "units": 0,
+            "entities_found": 0,
+            "entities_by_type": {},
+            "error": None,
+            "result": None,
+            **fields
+        }
+        self.save(status)
+        return status
+
+    def _prune(self):
+        if not self.directory.is_dir():
+            return
+        cutoff = time.time() - self.max_age
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                continue
+
+
+text_job_store = TextJobStore(settings.text_file_jobs_dir, max_age=settings.file_retention_hours * 3600)
+
+
+class TextFileAnonymizationService:
+    """
+    Anonymization of large text, log and JSON Lines files.
+
+    The uploaded file is memory-mapped and cut into lines or paragraphs
+    without being read into memory; batches of units are analyzed through
+    `nlp.pipe` and their anonymized text appended to a result blob, so memory
+    stays bounded by the batch size whatever the file size. JSON Lines keep
+    their structure: only string values (of `fields`, if given) are
+    anonymized. Progress is written to the job's status as it goes.
+    """
+
+    def __init__(self):
+        self.analyzer = get_analyzer_engine()
+        self.batch_analyzer = BatchAnalyzerEngine(analyzer_engine=self.analyzer)
+        self.anonymizer = get_anonymizer_engine()
+        self.results = get_results_store()
+
+    def _anonymize_batch(self, texts: List[str], plan, options: dict, status: dict) -> List[str]:
+        # spaCy cannot hash lone surrogates, one replacement character each keeps the offsets
+        batch_results = self.batch_analyzer.analyze_iterator(
+            [ESCAPED_BYTES.sub("\ufffd", text) for text in texts],
+            language=options["language"],
+            entities=options["entities"],
+            score_threshold=options["score_threshold"]
+        )
+
+        anonymized = []
+        for text, results in zip(texts, batch_results):
+            if not results:
+                anonymized.append(text)
+                continue
+            anonymized.append(self.anonymizer.anonymize(
+                text=text,
+                analyzer_results=results,
+                operators=plan.operators_for(results)
+            ).text)
+            status["entities_found"] += len(results)
+            for result in results:
+                status["entities_by_type"][result.entity_type] = status["entities_by_type"].get(result.entity_type, 0) + 1
+        return anonymized
+
+    def _write_batch(self, data, batch: List[Tuple[int, int, int]], writer, plan, options: dict, status: dict):
+        """Anonymize a batch of units and append them, with their separators, to the result"""
+        texts: List[str] = []
+        targets = []  # Per unit: the JSON record and its string leaves, or the index into texts
+
+        for start, end, _ in batch:
+            text = data[start:end].decode("utf-8", errors="surrogateescape")
+            if options["jsonl"]:
+                try:
+                    record = json.loads(text)
+                except ValueError:
+                    record = None
+                if isinstance(record, (dict, list)):
+                    leaves = list(_string_leaves(record, options["fields"]))
+                    targets.append((record, leaves, len(texts)))
+                    texts.extend(container[key] for container, key in leaves)
+                    continue
+            if text.strip():
+                targets.append((None, None, len(texts)))
+                texts.append(text)
+            else:
+                targets.append((None, None, None))
+
+        anonymized = self._anonymize_batch(texts, plan, options, status) if texts else []
+
+        for (start, end, separator_end), (record, leaves, index) in zip(batch, targets):
+            if record is not None:
+                for offset, (container, key) in enumerate(leaves):
+                    container[key] = anonymized[index + offset]
+                output = json.dumps(record, ensure_ascii=False)
+            elif index is not None:
+                output = anonymized[index]
+            else:
+                output = data[start:end].decode("utf-8", errors="surrogateescape")
+            writer.write(output.encode("utf-8", errors="surrogateescape"))
+            writer.write(data[end:separator_end])
+
+    def process(self, job_id: str, path: Path, options: dict):
+        """Run a job to completion, saving its progress on the way"""
+        status = text_job_store.get(job_id)
+        status.update(state="running", started_at=time.time())
+        plan = get_operator_plan(options["anonymization_mode"], None)
+        writer = self.results.open_writer(f"anonymized_{options['filename']}")
+        last_saved = 0.0
+
+        try:
+            with open(path, "rb") as source:
+                size = os.fstat(source.fileno()).st_size
+                status["bytes_total"] = size
+                data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+                try:
+                    batch = []
+                    for unit in iter_units(data, options["unit"], settings.text_file_max_unit_bytes):
+                        batch.append(unit)
+                        if len(batch) < settings.text_file_batch_units:
+                            continue
+                        self._write_batch(data, batch, writer, plan, options, status)
+                        status["units"] += len(batch)
+                        status["bytes_processed"] = batch[-1][2]
+                        batch = []
+
+                        if time.time() - last_saved >= settings.text_file_progress_interval:
+                            status["progress"] = status["bytes_processed"] / size
+                            status["updated_at"] = last_saved = time.time()
+                            text_job_store.save(status)
+                    if batch:
+                        self._write_batch(data, batch, writer, plan, options, status)
+                        status["units"] += len(batch)
+                finally:
+                    if size:
+                        data.close()
+
+            stored = writer.commit()
+            status.update(
+                state="done",
+                bytes_processed=size,
+                progress=1.0,
+                result={"digest": stored.digest, "size": stored.size, "filename": stored.path.name}
+            )
+            logger.info(
+                f"Text file job {job_id}: {status['units']} {options['unit']}s, "
+                f"{status['entities_found']} entities in {time.time() - status['started_at']:.2f}s"
+            )
+        except Exception as e:
+            writer.discard()
+            logger.error(f"Text file job {job_id} failed: {str(e)}")
+            status.update(state="failed", error=str(e))
+        finally:
+            status["updated_at"] = status["finished_at"] = time.time()
+            text_job_store.save(status)
+
+
+_job_slots: Optional[asyncio.Semaphore] = None
+_job_tasks = set()
+
+
+async def _run_job(service: TextFileAnonymizationService, job_id: str, path: Path, options: dict):
+    global _job_slots
+
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(settings.text_file_max_concurrent_jobs)
+    async with _job_slots:
+        await run_in_threadpool(service.process, job_id, path, options)
+
+
+def submit_text_file_job(
+    path: Path,
+    filename: str,
+    unit: str,
+    language: str = "en",
+    entities: Optional[List[str]] = None,
+    score_threshold: float = 0.35,
+    anonymization_mode: AnonymizationMode = AnonymizationMode.REPLACE,
+    fields: Optional[List[str]] = None
+) -> dict:
+    """Create a job for a stored upload and start it in the background, returns its status"""
+    jsonl = filename.lower().endswith(".jsonl")
+    # Invalid operator configs fail the request, not the job
+    get_operator_plan(anonymization_mode, None)
+
+    status = text_job_store.create(filename=filename, unit=unit, bytes_total=path.stat().st_size)
+    options = {
+        "filename": filename,
+        "unit": unit,
+        "jsonl": jsonl,
+        "fields": fields,
+        "language": language,
+        "entities": entities,
+        "score_threshold": score_threshold,
+        "anonymization_mode": anonymization_mode
+    }
+
+    task = asyncio.get_running_loop().create_task(_run_job(TextFileAnonymizationService(), status["id"], path, options))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return status
+
+
+def get_text_file_job(job_id: str) -> Optional[dict]:
+    return text_job_store.get(job_id)
+
+
+def get_text_file_result_path(status: dict) -> Optional[Path]:
+    """Path of a finished job's result, None once the retention evicted it"""
+    if not status.get("result"):
+        return None
+    store = get_results_store()
+    path = store.path_for(status["result"]["digest"])
+    if not path.is_file():
+        return None
+    store.touch(status["result"]["digest"])
+    return path
@@ -0,0 +1,270 @@
+import io
+import zlib
+import struct
+import logging
+import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+from presidio_image_redactor import ImageAnalyzerEngine
+
+from app.config import settings
+from app.services.chunk_sink import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[str, int, int, int, int]  # entity type, left, top, right, bottom
+
+# PNG color types of the modes written as-is, everything else is converted to RGB
+PNG_COLOR_TYPES = {"L": 0, "RGB": 2, "RGBA": 6}
+BYTES_PER_PIXEL = {"L": 1, "RGB": 3, "RGBA": 4}
+
+
+def count_pages(image_content: bytes) -> Tuple[int, int, int]:
+    """Page count and size of the first page, read from the header only"""
+    with Image.open(io.BytesIO(image_content)) as image:
+        return getattr(image, "n_frames", 1), image.width, image.height
+
+
+class PageSource:
+    """
+    Reads horizontal bands of one page of an image.
+
+    Uncompressed top-down layouts (raw TIFF, PPM and the like) are read band by
+    band straight from the file, so the page is never decoded as a whole.
+    Pillow can only decode compressed pages completely; those are decoded once
+    and kept while the page is processed.
+    """
+
+    def __init__(self, image_content: bytes, frame: int):
+        self.image_content = image_content
+        self.frame = frame
+
+        image = self._open()
+        self.width, self.height = image.size
+        self.mode = image.mode
+        self._page: Optional[Image.Image] = None
+        self._raw_tile = None
+
+        tile = image.tile[0] if len(image.tile) == 1 else None
+        if tile and tile.codec_name == "raw" and tile.extents == (0, 0, self.width, self.height):
+            rawmode, stride, orientation = (tuple(tile.args) + (0, 1))[:3]
+            if orientation == 1:
+                self._raw_tile = (tile.offset, rawmode, stride or self._raw_stride(rawmode))
+
+        if self._raw_tile is None:
+            image.load()
+            self._page = image
+
+    def _open(self) -> Image.Image:
+        image = Image.open(io.BytesIO(self.image_content))
+        if self.frame:
+            image.seek(self.frame)
+        return image
+
+    def _raw_stride(self, rawmode: str) -> int:
+        return len(Image.new(self.mode, (self.width, 1)).tobytes("raw", rawmode))
+
+    def read_band(self, top: int, bottom: int) -> Image.Image:
+        if self._page is not None:
+            return self._page.crop((0, top, self.width, bottom))
+
+        offset, rawmode, stride = self._raw_tile
+        with self._open() as image:
+            image.fp.seek(offset + top * stride)
+            data = image.fp.read((bottom - top) * stride)
+        return Image.frombuffer(self.mode, (self.width, bottom - top), data, "raw", rawmode, stride, 1)
+
+    def close(self):
+        self._page = None
+
+
+class _PngStreamWriter:
+    """Writes a PNG row band by row band, without holding the whole image"""
+
+    def __init__(self, sink, width: int, height: int, mode: str, compression_level: int = 6):
+        self.sink = sink
+        self.mode = mode
+        self.compressor = zlib.compressobj(compression_level)
+        sink.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, PNG_COLOR_TYPES[mode], 0, 0, 0))
+
+    def _chunk(self, chunk_type: bytes, data: bytes):
+        self.sink.write(struct.pack(">I", len(data)) + chunk_type + data)
+        self.sink.write(struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
+
+    def write_band(self, band: Image.Image):
+        data = band.tobytes()
+        row_size = band.width * BYTES_PER_PIXEL[self.mode]
+        # Filter type 0 (none) in front of every row
+        rows = b"".join(b"\x00" + data[i:i + row_size] for i in range(0, len(data), row_size))
+        compressed = self.compressor.compress(rows)
+        if compressed:
+            self._chunk(b"IDAT", compressed)
+
+    def close(self):
+        self._chunk(b"IDAT", self.compressor.flush())
+        self._chunk(b"IEND", b"")
+
+
+def merge_boxes(boxes: List[Box], tolerance: int = 2) -> List[Box]:
+    """Merge boxes of the same entity type that overlap, e.g. found twice in an overlap zone"""
+    merged: List[Box] = []
+    for box in sorted(boxes, key=lambda b: (b[0], b[2], b[1])):
+        entity_type, left, top, right, bottom = box
+        for index, (other_type, other_left, other_top, other_right, other_bottom) in enumerate(merged):
+            if (
+                other_type == entity_type
+                and left <= other_right + tolerance and right >= other_left - tolerance
+                and top <= other_bottom + tolerance and bottom >= other_top - tolerance
+            ):
+                merged[index] = (
+                    entity_type,
+                    min(left, other_left), min(top, other_top),
+                    max(right, other_right), max(bottom, other_bottom)
+                )
+                break
+        else:
+            merged.append(box)
+
+    # A merged box can now reach boxes it did not touch before
+    return merged if len(merged) == len(boxes) else merge_boxes(merged, tolerance)
+
+
+class TiledImageRedactor:
+    """
+    Redacts very large and multi-page images band by band.
+
+    Pages are processed one at a time. Each page is cut into overlapping
+    horizontal bands of the full page width that are OCRed and analyzed in
+    parallel. Bands are never split vertically, so every text line is OCRed
+    whole and an entity cannot fall apart at a tile edge; the overlap only
+    has to exceed the height of a text line. Boxes found in two bands are
+    merged in page coordinates and the page is then written band by band as
+    PNG. Multi-page inputs become a ZIP archive with one PNG per page.
+    """
+
+    def __init__(
+        self,
+        image_analyzer: ImageAnalyzerEngine,
+        tile_size: int = 2048,
+        overlap: int = 128,
+        workers: int = 4,
+        fill: Tuple[int, int, int] = (0, 0, 0)
+    ):
+        if overlap >= tile_size:
+            raise ValueError("Band overlap must be smaller than the band height")
+
+        self.image_analyzer = image_analyzer
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers
+        self.fill = fill
+        self.stats = {"pages": 0, "bands": 0, "boxes": 0}
+
+    def _band_starts(self, height: int) -> List[int]:
+        return list(range(0, max(height - self.overlap, 1), self.tile_size - self.overlap))
+
+    def _analyze_band(self, band: Image.Image, top: int, analyzer_kwargs: dict) -> List[Box]:
+        results = self.image_analyzer.analyze(band, **analyzer_kwargs)
+        return [
+            (result.entity_type, result.left, top + result.top,
+             result.left + result.width, top + result.top + result.height)
+            for result in results
+        ]
+
+    def find_boxes(self, page: PageSource, executor: ThreadPoolExecutor, analyzer_kwargs: dict) -> List[Box]:
+        """OCR and analyze all bands of a page, returning merged boxes in page coordinates"""
+        boxes: List[Box] = []
+        in_flight = deque()
+
+        for top in self._band_starts(page.height):
+            band = page.read_band(top, min(top + self.tile_size, page.height))
+            in_flight.append(executor.submit(self._analyze_band, band, top, analyzer_kwargs))
+            self.stats["bands"] += 1
+
+            # Bound the number of bands held in memory, each spans the full page width
+            if len(in_flight) >= self.workers:
+                boxes.extend(in_flight.popleft().result())
+
+        while in_flight:
+            boxes.extend(in_flight.popleft().result())
+
+        merged = merge_boxes(boxes)
+        self.stats["boxes"] += len(merged)
+        return merged
+
+    def write_page(self, page: PageSource, boxes: List[Box], target, sink: ChunkSink) -> Iterator[bytes]:
+        """Write the redacted page as PNG to target, yielding what reached the sink so far"""
+        mode = page.mode if page.mode in PNG_COLOR_TYPES else "RGB"
+        fill = self.fill if mode != "L" else 0
+        writer = _PngStreamWriter(target, page.width, page.height, mode)
+
+        for top in range(0, page.height, self.tile_size):
+            bottom = min(top + self.tile_size, page.height)
+            band = page.read_band(top, bottom)
+            if band.mode != mode:
+                band = band.convert(mode)
+
+            draw = ImageDraw.Draw(band)
+            for _, left, box_top, right, box_bottom in boxes:
+                if box_top < bottom and box_bottom >= top:
+                    draw.rectangle([left, box_top - top, right, box_bottom - top], fill=fill)
+
+            writer.write_band(band)
+            yield sink.take()
+
+        writer.close()
+        yield sink.take()
+
+    def redact(self, image_content: bytes, **analyzer_kwargs) -> Iterator[bytes]:
+        """Redact all pages of an image, yielding a PNG (single page) or ZIP (multi-page) stream"""
+        page_count, _, _ = count_pages(image_content)
+        sink = ChunkSink()
+        archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) if page_count > 1 else None
+
+        executor = _get_band_executor()
+        for frame in range(page_count):
+            page = PageSource(image_content, frame)
+            boxes = self.find_boxes(page, executor, analyzer_kwargs)
+            logger.debug(f"Page {frame + 1}/{page_count}: {page.width}x{page.height}, {len(boxes)} boxes")
+
+            if archive is None:
+                yield from self.write_page(page, boxes, sink, sink)
+            else:
+                with archive.open(f"page_{frame + 1:04d}.png", "w", force_zip64=True) as entry:
+                    yield from self.write_page(page, boxes, entry, sink)
+                yield sink.take()
+
+            page.close()
+            self.stats["pages"] += 1
+
+        if archive is not None:
+            archive.close()
+            yield sink.take()
+
+        logger.info(
+            f"Tiled redaction: {self.stats['pages']} pages, {self.stats['bands']} bands, "
+            f"{self.stats['boxes']} boxes"
+        )
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _get_band_executor() -> ThreadPoolExecutor:
+    """Process-wide OCR threads, so in-process OCR engines are loaded once per thread and not per request"""
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.image_tile_workers,
+                    thread_name_prefix="image-band"
+                )
+    return _executor
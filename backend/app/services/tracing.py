@@ -0,0 +1,215 @@
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # Optional: tracing needs opentelemetry-api and -sdk
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_provider = None
+_trace_file = None
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is off"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def update_name(self, name: str):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _create_exporter():
+    global _trace_file
+
+    exporter = settings.tracing_exporter
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    if exporter == "file":
+        # One JSON span per line, readable without a collector
+        _trace_file = open(settings.tracing_file_path, "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=_trace_file, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if exporter == "console":
+        return ConsoleSpanExporter()
+
+    raise ValueError(f"Unknown tracing exporter '{exporter}', use otlp, file or console")
+
+
+def setup_tracing():
+    """Install the tracer provider of this process; called once per worker at startup"""
+    global _tracer, _provider
+
+    if not settings.tracing_enabled or _tracer is not None:
+        return
+    if trace is None:
+        logger.warning("TRACING_ENABLED is set but opentelemetry is not installed, tracing stays off")
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio))
+    )
+    _provider.add_span_processor(BatchSpanProcessor(_create_exporter()))
+    _tracer = _provider.get_tracer("presidio-ui-backend")
+    logger.info(f"Tracing enabled, exporting to {settings.tracing_exporter}")
+
+
+def shutdown_tracing():
+    """Export pending spans and stop the exporter"""
+    global _tracer, _provider, _trace_file
+
+    if _provider is not None:
+        _provider.shutdown()
+    if _trace_file is not None:
+        _trace_file.close()
+    _tracer = None
+    _provider = None
+    _trace_file = None
+
+
+def _content_length(value: Optional[str]) -> Optional[int]:
+    """Request body size from the header, None when missing or malformed"""
+    try:
+        return int(value) or None
+    except (TypeError, ValueError):
+        return None
+
+
+@contextmanager
+def start_span(name: str, kind: Optional[str] = None, context=None, **attributes):
+    """Span around a block, or a no-op span while tracing is off"""
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+
+    span_kind = getattr(SpanKind, kind.upper()) if kind else SpanKind.INTERNAL
+    with _tracer.start_as_current_span(
+        name,
+        context=context,
+        kind=span_kind,
+        attributes={key.replace("__", "."): value for key, value in attributes.items() if value is not None}
+    ) as span:
+        yield span
+
+
+def annotate(**attributes):
+    """Set attributes on the current span, e.g. the page count on the route's span"""
+    if _tracer is not None:
+        trace.get_current_span().set_attributes(
+            {key.replace("__", "."): value for key, value in attributes.items() if value is not None}
+        )
+
+
+def inject_trace_context(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add the W3C trace context of the current span to outgoing request headers"""
+    if _tracer is not None:
+        propagate.inject(headers)
+    return headers
+
+
+def traced_service_method(name: str):
+    """
+    Trace an async service method taking a request with `text` and
+    returning a response with `entities`.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, request, *args, **kwargs):
+            if _tracer is None:
+                return await method(self, request, *args, **kwargs)
+
+            with start_span(
+                name,
+                service=type(self).__name__,
+                text__length=len(request.text),
+                language=getattr(request, "language", None)
+            ) as span:
+                result = await method(self, request, *args, **kwargs)
+                span.set_attribute("entity.count", len(result.entities))
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def _route_path(scope) -> str:
+    # Starlette 0.27 does not put the matched route into the scope, look it up by endpoint
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for route in getattr(app, "routes", []):
+            if getattr(route, "endpoint", None) is endpoint:
+                return route.path
+    return scope["path"]
+
+
+class TracingMiddleware:
+    """
+    Server span per HTTP request, continuing the caller's trace context.
+
+    The span is named after the route template (`POST /api/v1/anonymize`) and
+    carries the status code and request body size.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        request_size = _content_length(carrier.get("content-length"))
+        start_time = time.perf_counter()
+
+        with start_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            context=propagate.extract(carrier),
+            http__method=scope["method"],
+            http__target=scope["path"],
+            http__request_content_length=request_size
+        ) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = _route_path(scope)
+                span.update_name(f"{scope['method']} {route}")
+                span.set_attribute("http.route", route)
+                span.set_attribute("http.server_duration_ms", (time.perf_counter() - start_time) * 1000)
@@ -0,0 +1,329 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.tracing import inject_trace_context, start_span
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt on a different replica
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+# Statuses of requests the replica refused without processing them
+REJECTED_STATUS_CODES = {429, 503}
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an upstream after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens for
+    `reset_timeout` seconds; then a single trial request is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release(self):
+        """Free the trial slot of a request that ended without an outcome, e.g. a cancelled hedge"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """One replica of an external service with its breaker and latency window"""
+
+    def __init__(self, url: str, breaker: CircuitBreaker, window: int = 256):
+        self.url = url.rstrip("/")
+        self.breaker = breaker
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.stats = {"requests": 0, "failures": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0}
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def get_stats(self) -> dict:
+        p50, p95, p99 = (self.percentile(fraction) for fraction in (0.5, 0.95, 0.99))
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "in_flight": self.in_flight,
+            **self.stats,
+            "latency_ms": {
+                "p50": p50 * 1000 if p50 is not None else None,
+                "p95": p95 * 1000 if p95 is not None else None,
+                "p99": p99 * 1000 if p99 is not None else None,
+                "samples": len(self.latencies)
+            }
+        }
+
+
+class _RetryableError(Exception):
+    """Failure of one attempt that another attempt may not hit"""
+
+    def __init__(self, message: str, status_code: int = 502, sent: bool = True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.sent = sent
+
+
+class UpstreamPool:
+    """
+    Replicas of one external service behind a shared connection pool.
+
+    Requests go to the healthy replica with the fewest requests in flight.
+    Failed idempotent requests are retried on another replica with jittered
+    exponential backoff; non-idempotent ones only when the replica never
+    processed the request. With hedging enabled, an idempotent request still
+    running after the replica's p95 latency is duplicated to a second replica
+    and the first response wins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        urls: List[str],
+        api_key: Optional[str] = None,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.1,
+        backoff_max: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedging: bool = False,
+        hedge_min_delay: float = 0.05
+    ):
+        if not urls:
+            raise ValueError(f"No URLs configured for the {name} service")
+
+        self.name = name
+        self.upstreams = [Upstream(url, CircuitBreaker(failure_threshold, reset_timeout)) for url in urls]
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedging = hedging
+        self.hedge_min_delay = hedge_min_delay
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=connect_timeout))
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _pick(self, exclude: List[Upstream]) -> Optional[Upstream]:
+        candidates = [upstream for upstream in self.upstreams if upstream not in exclude] or list(self.upstreams)
+        # Random tie-break so idle replicas share the load and keep their latency window fresh
+        candidates.sort(key=lambda upstream: (upstream.in_flight, random.random()))
+        for upstream in candidates:
+            if upstream.breaker.allow():
+                return upstream
+        return None
+
+    def _hedge_delay(self, upstream: Upstream) -> float:
+        p95 = upstream.percentile(0.95)
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.hedge_min_delay)
+
+    async def _attempt(self, upstream: Upstream, path: str, body: dict):
+        with start_span(f"POST {self.name}{path}", kind="client", http__method="POST", http__url=f"{upstream.url}{path}") as span:
+            return await self._send(upstream, path, body, span)
+
+    async def _send(self, upstream: Upstream, path: str, body: dict, span):
+        upstream.in_flight += 1
+        upstream.stats["requests"] += 1
+        start_time = time.monotonic()
+
+        try:
+            # Propagate the trace so upstream spans join it
+            headers = inject_trace_context(self._headers())
+            response = await self.client.post(f"{upstream.url}{path}", json=body, headers=headers)
+        except httpx.TimeoutException as e:
+            upstream.stats["timeouts"] += 1
+            upstream.stats["failures"] += 1
+            upstream.breaker.record_failure()
+            raise _RetryableError(f"{upstream.url} timed out", status_code=504, sent=not isinstance(e, httpx.ConnectTimeout))
+        except httpx.TransportError as e:
+            upstream.stats["failures"] += 1
+            upstream.breaker.record_failure()
+            raise _RetryableError(f"{upstream.url} unreachable: {str(e)}", sent=not isinstance(e, httpx.ConnectError))
+        except asyncio.CancelledError:
+            # Neither success nor failure, but a half-open trial must not hold the replica forever
+            upstream.breaker.release()
+            raise
+        finally:
+            upstream.in_flight -= 1
+
+        upstream.latencies.append(time.monotonic() - start_time)
+        span.set_attribute("http.status_code", response.status_code)
+
+        if response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500:
+            upstream.stats["failures"] += 1
+            upstream.breaker.record_failure()
+            raise _RetryableError(
+                f"{upstream.url} answered {response.status_code}",
+                status_code=502,
+                sent=response.status_code not in REJECTED_STATUS_CODES
+            )
+
+        upstream.breaker.record_success()
+        if response.status_code >= 400:
+            # The request itself is invalid, no replica will accept it
+            raise HTTPException(status_code=response.status_code, detail=f"{self.name} service: {response.text}")
+        return response.json()
+
+    async def _hedged_attempt(self, upstream: Upstream, path: str, body: dict, tried: List[Upstream]):
+        primary = asyncio.ensure_future(self._attempt(upstream, path, body))
+        done, _ = await asyncio.wait([primary], timeout=self._hedge_delay(upstream))
+        if done:
+            return primary.result()
+
+        backup_upstream = self._pick(tried)
+        if backup_upstream is None or backup_upstream is upstream:
+            return await primary
+
+        tried.append(backup_upstream)
+        backup_upstream.stats["hedges"] += 1
+        backup = asyncio.ensure_future(self._attempt(backup_upstream, path, body))
+        pending = {primary, backup}
+        error = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            backup_upstream.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def post(self, path: str, body: dict, idempotent: bool = True):
+        """POST a JSON body to a healthy replica, retrying and hedging as configured"""
+        tried: List[Upstream] = []
+        last_error: Optional[_RetryableError] = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Full jitter keeps retries of many clients from arriving in lockstep
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))))
+
+            upstream = self._pick(tried)
+            if upstream is None:
+                raise HTTPException(status_code=503, detail=f"All {self.name} upstreams are unavailable (circuit open)")
+            tried.append(upstream)
+
+            try:
+                if self.hedging and idempotent and len(self.upstreams) > 1:
+                    return await self._hedged_attempt(upstream, path, body, tried)
+                return await self._attempt(upstream, path, body)
+            except _RetryableError as e:
+                last_error = e
+                logger.warning(f"{self.name} attempt {attempt + 1} failed: {str(e)}")
+                if e.sent and not idempotent:
+                    break
+
+        raise HTTPException(status_code=last_error.status_code, detail=f"{self.name} service failed: {str(last_error)}")
+
+    def get_stats(self) -> List[dict]:
+        return [upstream.get_stats() for upstream in self.upstreams]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def _split_urls(value: str) -> List[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def _create_pool(name: str, urls: str, api_key: Optional[str]) -> UpstreamPool:
+    return UpstreamPool(
+        name,
+        _split_urls(urls),
+        api_key=api_key,
+        timeout=settings.external_timeout,
+        connect_timeout=settings.external_connect_timeout,
+        max_retries=settings.external_max_retries,
+        backoff_base=settings.external_retry_backoff_ms / 1000,
+        backoff_max=settings.external_retry_backoff_max_ms / 1000,
+        failure_threshold=settings.external_breaker_failure_threshold,
+        reset_timeout=settings.external_breaker_reset_seconds,
+        hedging=settings.external_hedging_enabled,
+        hedge_min_delay=settings.external_hedge_min_delay_ms / 1000
+    )
+
+
+_pools: Dict[str, UpstreamPool] = {}
+
+
+def get_upstream_pool(name: str) -> UpstreamPool:
+    """Get the process-wide pool of the 'analyzer' or 'anonymizer' service"""
+    if name not in _pools:
+        if name == "analyzer":
+            _pools[name] = _create_pool(name, settings.presidio_analyzer_api_url, settings.presidio_analyzer_api_key)
+        elif name == "anonymizer":
+            _pools[name] = _create_pool(name, settings.presidio_anonymizer_api_url, settings.presidio_anonymizer_api_key)
+        else:
+            raise ValueError(f"Unknown upstream service '{name}'")
+
+    return _pools[name]
+
+
+def get_upstream_stats() -> Optional[Dict[str, List[dict]]]:
+    """Per-replica stats of the pools used in this process, None before the first external call"""
+    return {name: pool.get_stats() for name, pool in _pools.items()} or None
+
+
+async def close_upstream_pools():
+    for pool in _pools.values():
+        await pool.aclose()
+    _pools.clear()
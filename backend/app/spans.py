@@ -0,0 +1,120 @@
+"""
+Compact representation of detected entity spans.
+
+Services collect spans in a `SpanList`: entity types are interned once and
+referenced by a small id, positions and scores live in typed arrays, and the
+entity text is sliced from the source text only when a span is serialized.
+Pydantic `EntityResult` objects are built only where a caller really needs
+models; the response encoder serializes a `SpanList` directly.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple
+
+from app.models import EntityResult
+
+
+class Span(NamedTuple):
+    entity_type: str
+    start: int
+    end: int
+    score: float
+    text: str
+
+
+class SpanList:
+    """Column-oriented list of entity spans over one source text"""
+
+    __slots__ = ("source_text", "entity_types", "_type_ids", "type_ids", "starts", "ends", "scores")
+
+    def __init__(self, source_text: str):
+        self.source_text = source_text
+        self.entity_types: List[str] = []
+        self._type_ids: Dict[str, int] = {}
+        self.type_ids = array("H")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.scores = array("d")
+
+    @classmethod
+    def from_results(cls, source_text: str, results: Iterable) -> "SpanList":
+        """Build from Presidio RecognizerResult objects (or anything with the same attributes)"""
+        spans = cls(source_text)
+        for result in results:
+            spans.append(result.entity_type, result.start, result.end, result.score)
+        return spans
+
+    @classmethod
+    def from_dicts(cls, source_text: str, results: Iterable[dict]) -> "SpanList":
+        """Build from analyzer results in the JSON shape of the Presidio REST API"""
+        spans = cls(source_text)
+        for result in results:
+            spans.append(result["entity_type"], result["start"], result["end"], result["score"])
+        return spans
+
+    def append(self, entity_type: str, start: int, end: int, score: float):
+        type_id = self._type_ids.get(entity_type)
+        if type_id is None:
+            type_id = self._type_ids[entity_type] = len(self.entity_types)
+            self.entity_types.append(entity_type)
+
+        self.type_ids.append(type_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.scores.append(score)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Span]:
+        entity_types = self.entity_types
+        source_text = self.source_text
+        for type_id, start, end, score in zip(self.type_ids, self.starts, self.ends, self.scores):
+            yield Span(entity_types[type_id], start, end, score, source_text[start:end])
+
+    def __repr__(self) -> str:
+        return f"SpanList({len(self)} spans, types={self.entity_types})"
+
+    def distinct_entity_types(self) -> List[str]:
+        return [self.entity_types[type_id] for type_id in sorted(set(self.type_ids))]
+
+    def average_score(self) -> float:
+        return sum(self.scores) / len(self.scores) if self.scores else 0
+
+    def to_analyzer_dicts(self) -> List[dict]:
+        """Analyzer results in the JSON shape of the Presidio REST API"""
+        entity_types = self.entity_types
+        return [
+            {"entity_type": entity_types[type_id], "start": start, "end": end, "score": score}
+            for type_id, start, end, score in zip(self.type_ids, self.starts, self.ends, self.scores)
+        ]
+
+    def to_rows(self, include_text: bool = True) -> List[dict]:
+        """Plain dictionaries in the field order of EntityResult"""
+        entity_types = self.entity_types
+        source_text = self.source_text
+        if not include_text:
+            return [
+                {"entity_type": entity_types[type_id], "start": start, "end": end, "score": score}
+                for type_id, start, end, score in zip(self.type_ids, self.starts, self.ends, self.scores)
+            ]
+        return [
+            {"entity_type": entity_types[type_id], "start": start, "end": end, "text": source_text[start:end], "score": score}
+            for type_id, start, end, score in zip(self.type_ids, self.starts, self.ends, self.scores)
+        ]
+
+    def to_columns(self, include_text: bool = True) -> Dict[str, list]:
+        """Parallel arrays, one per field"""
+        entity_types = self.entity_types
+        columns = {
+            "entity_type": [entity_types[type_id] for type_id in self.type_ids],
+            "start": self.starts.tolist(),
+            "end": self.ends.tolist(),
+            "score": self.scores.tolist()
+        }
+        if include_text:
+            columns["text"] = [self.source_text[start:end] for start, end in zip(self.starts, self.ends)]
+        return columns
+
+    def to_models(self) -> List[EntityResult]:
+        """Validated pydantic models, for callers that need them"""
+        return [EntityResult(**row) for row in self.to_rows()]
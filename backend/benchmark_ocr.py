@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Compare OCR backends on throughput and accuracy.
+
+Every backend runs over the same sample set: a directory of images with a
+ground truth text file of the same name next to each (scan.png + scan.txt),
+or a generated set of rendered text when no directory is given. Accuracy is
+reported as character error rate and word recall against the ground truth.
+
+Example:
+    python benchmark_ocr.py --backends tesserocr,tesseract,http --samples ./ocr_samples --repeat 3
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import statistics
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.config import settings
+
+logger = logging.getLogger("benchmark_ocr")
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+FIRST_NAMES = ["John", "Maria", "Ahmed", "Chen", "Olga", "Pierre", "Fatima", "Lukas"]
+LAST_NAMES = ["Smith", "Garcia", "Khan", "Wang", "Ivanova", "Dubois", "Okafor", "Weber"]
+CITIES = ["Berlin", "Madrid", "Chicago", "Lyon", "Toronto", "Vienna"]
+
+
+def _random_line(rng: random.Random) -> str:
+    templates = [
+        "Patient {first} {last} was admitted on {day:02d}.{month:02d}.2023",
+        "Contact: {first}.{last}@example.com, phone 212-555-{number:04d}",
+        "Address: {number} Main Street, {city}",
+        "Account holder {first} {last}, IBAN DE89 3704 0044 0532 0130 00"
+    ]
+    return rng.choice(templates).format(
+        first=rng.choice(FIRST_NAMES), last=rng.choice(LAST_NAMES), city=rng.choice(CITIES),
+        day=rng.randint(1, 28), month=rng.randint(1, 12), number=rng.randint(1, 9999)
+    )
+
+
+def generate_samples(count: int, seed: int = 0) -> List[Tuple[str, Image.Image, str]]:
+    """Render synthetic pages of PII-like text with known ground truth"""
+    rng = random.Random(seed)
+    font = ImageFont.load_default(size=28)
+    samples = []
+
+    for index in range(count):
+        lines = [_random_line(rng) for _ in range(rng.randint(4, 10))]
+        image = Image.new("L", (1400, 80 + 48 * len(lines)), 255)
+        draw = ImageDraw.Draw(image)
+        for line_number, line in enumerate(lines):
+            draw.text((40, 40 + 48 * line_number), line, fill=0, font=font)
+        samples.append((f"generated_{index:03d}", image, "\n".join(lines)))
+
+    return samples
+
+
+def load_samples(directory: str) -> List[Tuple[str, Image.Image, str]]:
+    """Images of a directory that have a ground truth .txt file"""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        truth_path = os.path.join(directory, stem + ".txt")
+        if extension.lower() not in IMAGE_EXTENSIONS or not os.path.exists(truth_path):
+            continue
+
+        image = Image.open(os.path.join(directory, name))
+        image.load()
+        with open(truth_path, encoding="utf-8") as truth_file:
+            samples.append((name, image, truth_file.read()))
+
+    return samples
+
+
+def _edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(recognized: str, truth: str) -> float:
+    """Edit distance over the ground truth length, whitespace normalized"""
+    recognized = " ".join(recognized.split())
+    truth = " ".join(truth.split())
+    return _edit_distance(recognized, truth) / max(len(truth), 1)
+
+
+def word_recall(recognized: str, truth: str) -> float:
+    """Share of ground truth words that were recognized exactly"""
+    recognized_words = recognized.split()
+    truth_words = truth.split()
+    found = 0
+    for word in truth_words:
+        if word in recognized_words:
+            recognized_words.remove(word)
+            found += 1
+    return found / max(len(truth_words), 1)
+
+
+def benchmark_backend(name: str, samples, repeat: int) -> Optional[dict]:
+    from app.services.ocr import create_ocr_backend
+
+    try:
+        backend = create_ocr_backend(name)
+        # First call loads models or opens connections, it is not part of the timing
+        backend.image_to_string(samples[0][1])
+    except Exception as e:
+        logger.warning(f"Skipping backend '{name}': {str(e)}")
+        return None
+
+    durations = []
+    error_rates = []
+    recalls = []
+    try:
+        for _ in range(repeat):
+            for sample_name, image, truth in samples:
+                start_time = time.perf_counter()
+                text = backend.image_to_string(image)
+                durations.append(time.perf_counter() - start_time)
+                error_rates.append(character_error_rate(text, truth))
+                recalls.append(word_recall(text, truth))
+                logger.debug(f"{name} {sample_name}: {durations[-1] * 1000:.0f} ms, CER {error_rates[-1]:.3f}")
+    finally:
+        backend.close()
+
+    return {
+        "backend": backend.name,
+        "images": len(durations),
+        "images_per_second": len(durations) / sum(durations),
+        "median_ms": statistics.median(durations) * 1000,
+        "p95_ms": (statistics.quantiles(durations, n=20)[-1] if len(durations) > 1 else durations[0]) * 1000,
+        "cer": statistics.mean(error_rates),
+        "word_recall": statistics.mean(recalls)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR backends on throughput and accuracy")
+    parser.add_argument("--backends", default="tesserocr,tesseract", help="Comma-separated backend names")
+    parser.add_argument("--samples", help="Directory of images with ground truth .txt files")
+    parser.add_argument("--generate", type=int, default=20, help="Generated samples when no directory is given")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the sample set per backend")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper()),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    samples = load_samples(args.samples) if args.samples else generate_samples(args.generate)
+    if not samples:
+        sys.exit("No samples with ground truth found")
+    logger.info(f"Benchmarking on {len(samples)} samples x {args.repeat}")
+
+    results = []
+    for name in [backend.strip() for backend in args.backends.split(",") if backend.strip()]:
+        result = benchmark_backend(name, samples, args.repeat)
+        if result:
+            results.append(result)
+
+    print(f"{'backend':<12}{'images':>8}{'img/s':>10}{'median ms':>12}{'p95 ms':>10}{'CER':>8}{'recall':>9}")
+    for result in results:
+        print(
+            f"{result['backend']:<12}{result['images']:>8}{result['images_per_second']:>10.2f}"
+            f"{result['median_ms']:>12.1f}{result['p95_ms']:>10.1f}{result['cer']:>8.3f}{result['word_recall']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Build the analyzer engine snapshot restored at startup.
+
+Loads the analyzer the way the service does (spaCy pipelines and the default
+recognizer registry), serializes it into the snapshot directory and, with
+--compare, measures the cold start of a fresh process with and without the
+snapshot. Point ENGINE_SNAPSHOT_DIR at the output to use it.
+
+Example:
+    python build_engine_snapshot.py --output ./engine_snapshot --compare 3
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+import subprocess
+
+from app.config import settings
+
+logger = logging.getLogger("build_engine_snapshot")
+
+
+def load_once(mode: str, path: str) -> dict:
+    """Load the analyzer in this process and report the timings, used by --compare"""
+    start_time = time.perf_counter()
+    from presidio_analyzer import AnalyzerEngine
+    from app.services.engine_snapshot import restore_analyzer
+    imported = time.perf_counter()
+
+    if mode == "snapshot":
+        analyzer = restore_analyzer(path, settings.engine_snapshot_mmap_vectors)
+        if analyzer is None:
+            raise RuntimeError(f"No usable snapshot at {path}")
+    else:
+        analyzer = AnalyzerEngine()
+    loaded = time.perf_counter()
+
+    analyzer.analyze(text="John Smith lives in Berlin, call 212-555-0100", language="en")
+    return {
+        "import_seconds": imported - start_time,
+        "load_seconds": loaded - imported,
+        "first_analysis_seconds": time.perf_counter() - loaded
+    }
+
+
+def measure(mode: str, path: str) -> dict:
+    start_time = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, "--output", path, "--load-only", mode],
+        check=True, capture_output=True, text=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process_seconds"] = time.perf_counter() - start_time
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the analyzer engine snapshot")
+    parser.add_argument("--output", default=settings.engine_snapshot_dir or "./engine_snapshot", help="Snapshot directory")
+    parser.add_argument("--compare", type=int, default=0, help="Cold starts measured per mode after building")
+    parser.add_argument("--load-only", choices=["built", "snapshot"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load_only:
+        print(json.dumps(load_once(args.load_only, args.output)))
+        return
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper()),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    from presidio_analyzer import AnalyzerEngine
+    from app.services.engine_snapshot import build_snapshot
+
+    start_time = time.time()
+    analyzer = AnalyzerEngine()
+    logger.info(f"Loaded analyzer engine in {time.time() - start_time:.2f}s")
+    # Fail before writing anything when the engine does not work
+    analyzer.analyze(text="John Smith lives in Berlin, call 212-555-0100", language="en")
+    build_snapshot(analyzer, args.output)
+
+    if args.compare <= 0:
+        return
+
+    print(f"{'mode':<10}{'process s':>12}{'import s':>12}{'load s':>10}{'first call s':>14}")
+    for mode in ("built", "snapshot"):
+        runs = [measure(mode, args.output) for _ in range(args.compare)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        logger.info(f"Cold start ({mode}): {median['process_seconds']:.2f}s, analyzer load {median['load_seconds']:.2f}s")
+        print(
+            f"{mode:<10}{median['process_seconds']:>12.2f}{median['import_seconds']:>12.2f}"
+            f"{median['load_seconds']:>10.2f}{median['first_analysis_seconds']:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
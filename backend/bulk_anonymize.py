@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Bulk anonymization of JSONL and CSV files for offline jobs.
+
+Records are streamed from the input file, anonymized in chunks on a process
+pool and written to the output in input order. Progress is checkpointed after
+every written chunk, so an interrupted run continues where it stopped with
+--resume.
+
+Example:
+    python bulk_anonymize.py records.jsonl -o anonymized.jsonl --fields text,notes --workers 8
+"""
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from app.config import settings
+from app.models import AnonymizeRequest
+
+logger = logging.getLogger("bulk_anonymize")
+
+# Per-process state of pool workers
+_worker = {}
+
+
+def _init_worker(options: dict):
+    """Create the services once per pool process"""
+    # Batching across requests does not apply, every chunk runs sequentially here
+    settings.micro_batching_enabled = False
+
+    if options["service"] == "extended":
+        from app.services.extended_anonymization import ExtendedAnonymizationService
+        _worker["service"] = ExtendedAnonymizationService()
+    else:
+        from app.services.anonymization import LocalPresidioService
+        _worker["service"] = LocalPresidioService()
+
+    _worker["loop"] = asyncio.new_event_loop()
+    _worker["options"] = options
+
+
+def _anonymize_value(text: str) -> str:
+    service = _worker["service"]
+    options = _worker["options"]
+    loop = _worker["loop"]
+
+    if options["service"] == "extended":
+        result = loop.run_until_complete(service.anonymize_text_advanced(
+            text=text,
+            entities=options["entities"],
+            language=options["language"],
+            score_threshold=options["score_threshold"]
+        ))
+        return result["anonymized_text"]
+
+    result = loop.run_until_complete(service.anonymize(AnonymizeRequest(
+        text=text,
+        entities=options["entities"],
+        language=options["language"],
+        score_threshold=options["score_threshold"]
+    )))
+    return result.text
+
+
+def _anonymize_chunk(records: List[dict]) -> List[dict]:
+    """Anonymize the selected string fields of every record in a chunk"""
+    fields = _worker["options"]["fields"]
+
+    for record in records:
+        for key in fields or list(record):
+            value = record.get(key)
+            if isinstance(value, str) and value.strip():
+                record[key] = _anonymize_value(value)
+
+    return records
+
+
+class ByteCountingReader:
+    """Decodes lines of a binary file while counting the bytes consumed"""
+
+    def __init__(self, binary_file, encoding: str = "utf-8"):
+        self.binary_file = binary_file
+        self.encoding = encoding
+        self.position = binary_file.tell()
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.binary_file:
+            self.position += len(line)
+            yield line.decode(self.encoding)
+
+
+def _read_records(reader: ByteCountingReader, file_format: str, header: Optional[List[str]]) -> Iterator[dict]:
+    if file_format == "csv":
+        yield from csv.DictReader(reader, fieldnames=header)
+        return
+
+    for line in reader:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping line ending at byte {reader.position}: invalid JSON ({e.msg} at column {e.colno})")
+            continue
+        if not isinstance(record, dict):
+            # Only objects have fields to anonymize, anything else is left out of the output
+            logger.warning(f"Skipping line ending at byte {reader.position}: not a JSON object")
+            continue
+        yield record
+
+
+class _LineCollector:
+    """File-like sink collecting csv writer output in memory"""
+
+    def __init__(self, lines: List[str]):
+        self.write = lines.append
+
+
+def _serialize_chunk(records: List[dict], file_format: str, header: Optional[List[str]]) -> str:
+    if file_format == "csv":
+        lines = []
+        csv.DictWriter(_LineCollector(lines), fieldnames=header).writerows(records)
+        return "".join(lines)
+
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+def _load_checkpoint(path: str) -> Optional[dict]:
+    try:
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    # Write-then-rename, so a crash never leaves a half written checkpoint
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+def run(args: argparse.Namespace):
+    file_format = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    options = {
+        "service": args.service,
+        "fields": [field.strip() for field in args.fields.split(",")] if args.fields else None,
+        "entities": [entity.strip() for entity in args.entities.split(",")] if args.entities else None,
+        "language": args.language,
+        "score_threshold": args.score_threshold
+    }
+
+    checkpoint = _load_checkpoint(checkpoint_path) if args.resume else None
+    if checkpoint and checkpoint["input"] != os.path.abspath(args.input):
+        sys.exit(f"Checkpoint {checkpoint_path} belongs to {checkpoint['input']}")
+
+    total_bytes = os.path.getsize(args.input)
+    input_file = open(args.input, "rb")
+    header = None
+    if file_format == "csv":
+        header = next(csv.reader([input_file.readline().decode("utf-8")]))
+
+    if checkpoint:
+        input_file.seek(checkpoint["input_bytes"])
+        output_file = open(args.output, "r+b")
+        output_file.truncate(checkpoint["output_bytes"])
+        output_file.seek(checkpoint["output_bytes"])
+        records_done = checkpoint["records"]
+        logger.info(f"Resuming after {records_done} records at byte {checkpoint['input_bytes']} of {total_bytes}")
+    else:
+        output_file = open(args.output, "wb")
+        if header:
+            lines = []
+            csv.writer(_LineCollector(lines)).writerow(header)
+            output_file.write("".join(lines).encode("utf-8"))
+        records_done = 0
+
+    reader = ByteCountingReader(input_file)
+    records = _read_records(reader, file_format, header)
+    start_bytes = reader.position
+    start_time = time.time()
+    last_report = start_time
+    processed = 0
+
+    # Load the models once before forking, the pool processes share them copy-on-write
+    if multiprocessing.get_start_method() == "fork":
+        from app.services.engines import warmup_engines
+        warmup_engines()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(options,)) as pool:
+        in_flight = deque()
+
+        def write_oldest():
+            nonlocal records_done, processed, last_report
+            future, input_position, count = in_flight.popleft()
+            output_file.write(_serialize_chunk(future.result(), file_format, header).encode("utf-8"))
+            output_file.flush()
+            os.fsync(output_file.fileno())
+
+            records_done += count
+            processed += count
+            _save_checkpoint(checkpoint_path, {
+                "input": os.path.abspath(args.input),
+                "records": records_done,
+                "input_bytes": input_position,
+                "output_bytes": output_file.tell()
+            })
+
+            now = time.time()
+            if now - last_report >= args.report_interval:
+                last_report = now
+                elapsed = now - start_time
+                bytes_per_second = (input_position - start_bytes) / elapsed if elapsed else 0
+                eta = (total_bytes - input_position) / bytes_per_second if bytes_per_second else 0
+                logger.info(
+                    f"{records_done} records, {processed / elapsed:.0f} records/s, "
+                    f"{input_position / total_bytes:.1%} of input, ETA {_format_duration(eta)}"
+                )
+
+        chunk: List[dict] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) < args.chunk_size:
+                continue
+
+            in_flight.append((pool.submit(_anonymize_chunk, chunk), reader.position, len(chunk)))
+            chunk = []
+            # Bound memory by the number of chunks queued ahead of the writer
+            if len(in_flight) >= args.workers * 2:
+                write_oldest()
+
+        if chunk:
+            in_flight.append((pool.submit(_anonymize_chunk, chunk), reader.position, len(chunk)))
+        while in_flight:
+            write_oldest()
+
+    input_file.close()
+    output_file.close()
+    # Inputs without records never write a checkpoint
+    Path(checkpoint_path).unlink(missing_ok=True)
+
+    elapsed = time.time() - start_time
+    logger.info(f"Done: {records_done} records in {_format_duration(elapsed)} ({processed / elapsed if elapsed else 0:.0f} records/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anonymize JSONL or CSV files record by record")
+    parser.add_argument("input", help="Input .jsonl or .csv file")
+    parser.add_argument("-o", "--output", required=True, help="Output file, same format as the input")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format, derived from the extension by default")
+    parser.add_argument("--fields", help="Comma-separated fields/columns to anonymize, all string fields by default")
+    parser.add_argument("--entities", help="Comma-separated entity types, all supported entities by default")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--score-threshold", type=float, default=0.35)
+    parser.add_argument("--service", choices=["local", "extended"], default="local", help="Anonymization service to use")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Records per unit of work")
+    parser.add_argument("--checkpoint", help="Checkpoint file, defaults to <output>.checkpoint")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between progress reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper()),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
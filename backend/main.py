@@ -6,10 +6,15 @@ import uvicorn
 from app.config import settings
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.reload,
-        log_level=settings.log_level.lower()
-    )
+    if settings.workers > 1:
+        # Pre-fork mode: engines are loaded once and shared copy-on-write by all workers
+        from app.prefork import serve_prefork
+        serve_prefork(settings.workers)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=settings.reload,
+            log_level=settings.log_level.lower()
+        )
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the remote services the backend can be pointed at.
+
+Implements the protocol of the http OCR backend on top of a local OCR backend
+and the /analyze and /anonymize endpoints of the Presidio REST services on top
+of the local engines, with optional artificial latency, slow requests and
+errors, so remote setups can be exercised and benchmarked without the real
+services.
+
+Example:
+    python stub_server.py --port 9000 --ocr-backend tesseract --latency-ms 40
+    OCR_BACKEND=http OCR_REMOTE_URL=http://localhost:9000 python main.py
+
+    python stub_server.py --port 5101 --slow-rate 0.1 --slow-ms 2000
+    python stub_server.py --port 5102 --error-rate 0.2
+    ANONYMIZATION_MODE=external PRESIDIO_ANALYZER_API_URL=http://localhost:5101,http://localhost:5102 \\
+        PRESIDIO_ANONYMIZER_API_URL=http://localhost:5101,http://localhost:5102 python main.py
+"""
+import io
+import time
+import random
+import logging
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from PIL import Image
+
+from app.config import settings
+
+logger = logging.getLogger("stub_server")
+
+
+def create_stub_app(
+    ocr_backend: str = "auto",
+    latency_ms: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_ms: float = 0.0,
+    error_rate: float = 0.0
+) -> FastAPI:
+    """Create the stub application serving the configured local backends"""
+    from app.services.ocr import create_ocr_backend
+    from app.services.tracing import TracingMiddleware, setup_tracing
+
+    if ocr_backend == "http":
+        raise ValueError("The stub cannot use the http backend, it would call itself")
+
+    app = FastAPI(title="Presidio UI stub services")
+    # With TRACING_ENABLED the stub joins the traces of the backend calling it
+    setup_tracing()
+    app.add_middleware(TracingMiddleware)
+    ocr = create_ocr_backend(ocr_backend)
+    stats = {"ocr_requests": 0, "analyze_requests": 0, "anonymize_requests": 0, "slow": 0, "errors": 0}
+
+    def simulate_latency():
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def simulate_faults():
+        simulate_latency()
+        if slow_rate and random.random() < slow_rate:
+            stats["slow"] += 1
+            time.sleep(slow_ms / 1000)
+        if error_rate and random.random() < error_rate:
+            stats["errors"] += 1
+            raise HTTPException(status_code=503, detail="Simulated upstream failure")
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy", "ocr_backend": ocr.name, "latency_ms": latency_ms, **stats}
+
+    @app.post("/analyze")
+    def analyze(body: dict):
+        from app.services.engines import get_analyzer_engine
+
+        simulate_faults()
+        stats["analyze_requests"] += 1
+        results = get_analyzer_engine().analyze(
+            text=body["text"],
+            language=body.get("language", "en"),
+            entities=body.get("entities"),
+            score_threshold=body.get("score_threshold", 0.35)
+        )
+        return [result.to_dict() for result in results]
+
+    @app.post("/anonymize")
+    def anonymize(body: dict):
+        from presidio_anonymizer.entities import OperatorConfig, RecognizerResult
+        from app.services.engines import get_anonymizer_engine
+
+        simulate_faults()
+        stats["anonymize_requests"] += 1
+        operators = {
+            entity_type: OperatorConfig(config.get("type", "replace"), {k: v for k, v in config.items() if k != "type"})
+            for entity_type, config in (body.get("anonymizers") or {}).items()
+        }
+        result = get_anonymizer_engine().anonymize(
+            text=body["text"],
+            analyzer_results=[RecognizerResult.from_json(item) for item in body.get("analyzer_results", [])],
+            operators=operators or None
+        )
+        return {"text": result.text, "items": [item.to_dict() for item in result.items]}
+
+    @app.post("/ocr")
+    def perform_ocr(file: UploadFile = File(...), lang: str = Form(None), mode: str = Form("words")):
+        simulate_latency()
+        stats["ocr_requests"] += 1
+        image = Image.open(io.BytesIO(file.file.read()))
+
+        if mode == "text":
+            return {"text": ocr.image_to_string(image, lang=lang)}
+        if mode == "words":
+            return {"words": ocr.perform_ocr(image, lang=lang)}
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for remote OCR and analysis services")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ocr-backend", default="auto", help="Local OCR backend behind /ocr")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Artificial delay added to every request")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of analyze/anonymize requests that are slow")
+    parser.add_argument("--slow-ms", type=float, default=1000.0, help="Extra delay of slow requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of analyze/anonymize requests answered with 503")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper()),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    app = create_stub_app(args.ocr_backend, args.latency_ms, args.slow_rate, args.slow_ms, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
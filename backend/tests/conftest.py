@@ -0,0 +1,32 @@
+import spacy
+import pytest
+from presidio_analyzer import AnalyzerEngine
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+from app.services import engines
+
+# Entities of the small test pipeline, found by an entity ruler instead of a trained model
+NAMES = ["John Smith", "Alice", "Bob Jones"]
+PLACES = ["Berlin", "Paris"]
+
+
+@pytest.fixture(scope="session")
+def analyzer(tmp_path_factory):
+    """
+    Analyzer engine on a blank English pipeline with an entity ruler, so
+    tests do not need a spaCy model package. It is also the shared engine
+    returned by `get_analyzer_engine`.
+    """
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns(
+        [{"label": "PERSON", "pattern": name} for name in NAMES]
+        + [{"label": "GPE", "pattern": place} for place in PLACES]
+    )
+    model_path = tmp_path_factory.mktemp("spacy") / "en_test"
+    nlp.to_disk(model_path)
+
+    analyzer = AnalyzerEngine(nlp_engine=SpacyNlpEngine(models={"en": str(model_path)}), supported_languages=["en"])
+    engines._analyzer = analyzer
+    yield analyzer
+    engines._analyzer = None
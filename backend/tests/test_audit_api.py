@@ -0,0 +1,39 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import audit
+from app.config import settings
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_key", "admin-secret")
+    monkeypatch.setattr(audit, "get_result_store", lambda: None)
+    app = FastAPI()
+    app.include_router(audit.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/api/v1/audit/entity-counts"),
+    ("get", "/api/v1/audit/documents"),
+    ("get", "/api/v1/audit/documents/doc-1"),
+    ("delete", "/api/v1/audit/documents/doc-1"),
+])
+def test_audit_endpoints_need_the_admin_key(client, method, path):
+    assert getattr(client, method)(path).status_code == 403
+    assert getattr(client, method)(path, headers={"X-Admin-Key": "wrong"}).status_code == 403
+
+    response = getattr(client, method)(path, headers={"X-Admin-Key": "admin-secret"})
+    assert response.status_code == 404
+    assert "RESULT_STORE_ENABLED" in response.json()["detail"]
+
+
+def test_audit_endpoints_are_off_without_an_admin_key(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_key", None)
+
+    response = client.get("/api/v1/audit/entity-counts", headers={"X-Admin-Key": "anything"})
+
+    assert response.status_code == 404
+    assert "ADMIN_API_KEY" in response.json()["detail"]
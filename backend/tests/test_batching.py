@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.services.batching import AnalysisBatcher
+
+TEXTS = ["John Smith lives in Berlin", "Alice moved to Paris", "Nothing to find here"]
+
+
+def _entities(results):
+    return sorted((result.entity_type, result.start, result.end) for result in results)
+
+
+def test_concurrent_calls_run_as_one_batch(analyzer):
+    batcher = AnalysisBatcher(analyzer, max_batch_size=32, max_delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.analyze(text, entities=["PERSON", "LOCATION"]) for text in TEXTS))
+
+    batched = asyncio.run(scenario())
+
+    for text, results in zip(TEXTS, batched):
+        assert _entities(results) == _entities(analyzer.analyze(text, language="en", entities=["PERSON", "LOCATION"]))
+    stats = batcher.get_stats()
+    assert stats["batches"] == 1 and stats["items"] == 3
+    assert stats["full_batches"] == 0
+
+
+def test_full_batch_is_flushed_without_waiting(analyzer):
+    batcher = AnalysisBatcher(analyzer, max_batch_size=2, max_delay=10.0)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.analyze(text) for text in TEXTS[:2])), timeout=5)
+
+    asyncio.run(scenario())
+
+    assert batcher.get_stats()["full_batches"] == 1
+
+
+def test_calls_are_grouped_by_options(analyzer):
+    batcher = AnalysisBatcher(analyzer, max_batch_size=32, max_delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.analyze(TEXTS[0], entities=["PERSON"]),
+            batcher.analyze(TEXTS[0], entities=["LOCATION"]),
+            batcher.analyze(TEXTS[1], entities=["LOCATION"])
+        )
+
+    persons, places, other_places = asyncio.run(scenario())
+
+    assert _entities(persons) == [("PERSON", 0, 10)]
+    assert _entities(places) == [("LOCATION", 20, 26)]
+    assert _entities(other_places) == [("LOCATION", 15, 20)]
+    assert batcher.get_stats()["batches"] == 2
+
+
+def test_batch_failure_reaches_every_caller(analyzer):
+    batcher = AnalysisBatcher(analyzer, max_batch_size=32, max_delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(batcher.analyze(text, language="xx") for text in TEXTS[:2]),
+            return_exceptions=True
+        )
+
+    errors = asyncio.run(scenario())
+
+    assert all(isinstance(error, Exception) for error in errors)
@@ -0,0 +1,15 @@
+import io
+import logging
+
+from bulk_anonymize import ByteCountingReader, _read_records
+
+
+def test_jsonl_lines_that_are_not_objects_are_skipped(caplog):
+    data = b'{"name": "Alice"}\n{"name": \n\n[1, 2]\n{"name": "Bob"}\n'
+
+    with caplog.at_level(logging.WARNING):
+        records = list(_read_records(ByteCountingReader(io.BytesIO(data)), "jsonl", None))
+
+    assert records == [{"name": "Alice"}, {"name": "Bob"}]
+    assert "ending at byte 28: invalid JSON" in caplog.text
+    assert "ending at byte 36: not a JSON object" in caplog.text
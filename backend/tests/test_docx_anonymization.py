@@ -0,0 +1,50 @@
+import docx
+from docx.oxml import OxmlElement
+
+from app.services.docx_anonymization import paragraph_text, replace_spans_in_runs
+
+
+def _add_hyperlink(paragraph, text: str):
+    hyperlink = OxmlElement("w:hyperlink")
+    run = OxmlElement("w:r")
+    run_text = OxmlElement("w:t")
+    run_text.text = text
+    run.append(run_text)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def _mail_paragraph():
+    paragraph = docx.Document().add_paragraph("Mail ")
+    _add_hyperlink(paragraph, "john@example.com")
+    paragraph.add_run(" now")
+    return paragraph
+
+
+def test_paragraph_text_includes_hyperlink_runs():
+    paragraph = _mail_paragraph()
+
+    assert paragraph_text(paragraph) == "Mail john@example.com now"
+    assert paragraph_text(paragraph) == paragraph.text
+
+
+def test_hyperlinked_email_is_replaced():
+    paragraph = _mail_paragraph()
+    text = paragraph_text(paragraph)
+    start = text.index("john@example.com")
+
+    replace_spans_in_runs(paragraph, [(start, start + len("john@example.com"), "<EMAIL_ADDRESS>")])
+
+    assert paragraph.text == "Mail <EMAIL_ADDRESS> now"
+    assert "john@example.com" not in paragraph._p.xml
+
+
+def test_replacement_across_runs_keeps_first_run():
+    paragraph = docx.Document().add_paragraph("Call ")
+    paragraph.add_run("John ")
+    paragraph.add_run("Smith")
+    paragraph.add_run(" today")
+
+    replace_spans_in_runs(paragraph, [(5, 15, "<PERSON>")])
+
+    assert [run.text for run in paragraph.runs] == ["Call ", "<PERSON>", "", " today"]
@@ -0,0 +1,80 @@
+import json
+
+import numpy
+import spacy
+import pytest
+from presidio_analyzer import AnalyzerEngine
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+from app.services import engine_snapshot
+from app.services.engine_snapshot import MANIFEST, build_snapshot, read_manifest, restore_analyzer
+
+TEXT = "Alice lives in Berlin, call 212-555-0100"
+
+
+def _analyzer(model_path) -> AnalyzerEngine:
+    """A fresh engine like the conftest one, with a small vectors table"""
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns([
+        {"label": "PERSON", "pattern": "Alice"},
+        {"label": "GPE", "pattern": "Berlin"},
+    ])
+    nlp.vocab.reset_vectors(width=4)
+    nlp.vocab.set_vector("berlin", numpy.arange(4, dtype="float32"))
+    nlp.to_disk(model_path)
+    return AnalyzerEngine(nlp_engine=SpacyNlpEngine(models={"en": str(model_path)}), supported_languages=["en"])
+
+
+def _findings(analyzer: AnalyzerEngine):
+    return sorted((result.entity_type, result.start, result.end) for result in analyzer.analyze(TEXT, language="en"))
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    analyzer = _analyzer(tmp_path / "model")
+    expected = _findings(analyzer)
+    manifest = build_snapshot(analyzer, str(tmp_path / "snapshot"))
+    return tmp_path / "snapshot", manifest, expected
+
+
+def test_restored_analyzer_finds_the_same_entities(snapshot):
+    path, manifest, expected = snapshot
+
+    restored = restore_analyzer(str(path))
+
+    assert _findings(restored) == expected
+    assert manifest["languages"] == ["en"]
+    assert manifest["vectors"] == {"en": list(restored.nlp_engine.nlp["en"].vocab.vectors.shape)}
+    assert not path.with_name(path.name + ".building").exists()
+
+
+@pytest.mark.parametrize("mmap_vectors", [True, False])
+def test_vectors_are_memory_mapped_on_request(snapshot, mmap_vectors):
+    path, _, _ = snapshot
+
+    nlp = restore_analyzer(str(path), mmap_vectors=mmap_vectors).nlp_engine.nlp["en"]
+
+    assert isinstance(nlp.vocab.vectors.data, numpy.memmap) == mmap_vectors
+    assert nlp.vocab.get_vector("berlin").tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_snapshot_of_other_versions_is_ignored(snapshot, monkeypatch):
+    path, _, _ = snapshot
+    monkeypatch.setattr(engine_snapshot, "FORMAT_VERSION", engine_snapshot.FORMAT_VERSION + 1)
+
+    assert read_manifest(str(path)) is None
+    assert restore_analyzer(str(path)) is None
+
+
+def test_missing_snapshot_is_ignored(tmp_path):
+    assert restore_analyzer(str(tmp_path / "missing")) is None
+
+
+def test_rebuild_replaces_the_snapshot(snapshot, tmp_path):
+    path, _, _ = snapshot
+    (path / "stale").write_text("left over")
+
+    build_snapshot(_analyzer(tmp_path / "model2"), str(path))
+
+    assert not (path / "stale").exists()
+    assert json.loads((path / MANIFEST).read_text())["recognizers"] > 0
@@ -0,0 +1,92 @@
+import io
+import time
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.file_store import ContentAddressedStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentAddressedStore(str(tmp_path / "store"), max_bytes=1000, max_age=3600)
+
+
+def _age(store: ContentAddressedStore, digest: str, seconds: float):
+    store._connection().execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time() - seconds, digest))
+
+
+def test_content_is_stored_once_under_its_digest(store):
+    first = store.put_bytes(b"hello", "a.txt")
+    second = store.put_stream(io.BytesIO(b"hello"), "b.txt")
+
+    assert first.digest == second.digest == hashlib.sha256(b"hello").hexdigest()
+    assert first.path.read_bytes() == b"hello"
+    assert (first.deduplicated, second.deduplicated) == (False, True)
+    assert store.get_stats()["blobs"] == 1
+    assert store.get_stats()["bytes"] == 5
+
+
+def test_oversized_stream_is_rejected_without_leftovers(store):
+    with pytest.raises(HTTPException) as error:
+        store.put_stream(io.BytesIO(b"x" * 100), "big.bin", max_size=10)
+
+    assert error.value.status_code == 413
+    assert store.get_stats()["blobs"] == 0
+    assert list(store.tmp_dir.iterdir()) == []
+
+
+def test_writer_commits_incrementally_written_blob(store):
+    writer = store.open_writer("result.txt")
+    for part in (b"anonymized ", b"text"):
+        writer.write(part)
+    stored = writer.commit()
+
+    assert stored.digest == hashlib.sha256(b"anonymized text").hexdigest()
+    assert stored.path.read_bytes() == b"anonymized text"
+    assert list(store.tmp_dir.iterdir()) == []
+
+
+def test_discarded_writer_leaves_nothing(store):
+    writer = store.open_writer("result.txt")
+    writer.write(b"partial")
+    writer.discard()
+
+    assert store.get_stats()["blobs"] == 0
+    assert list(store.tmp_dir.iterdir()) == []
+
+
+def test_retention_evicts_by_age(store):
+    old = store.put_bytes(b"old")
+    recent = store.put_bytes(b"recent")
+    _age(store, old.digest, 7200)
+
+    assert store.enforce_retention() == {"evicted": 1, "freed_bytes": 3}
+    assert not old.path.exists()
+    assert recent.path.exists()
+    assert store.get_stats()["bytes"] == 6
+
+
+def test_retention_evicts_oldest_beyond_quota(store):
+    blobs = [store.put_bytes(bytes([index]) * 400) for index in range(4)]
+    for age, blob in zip((40, 30, 20, 10), blobs):
+        _age(store, blob.digest, age)
+    # Touching makes a blob the most recently used
+    store.touch(blobs[0].digest)
+
+    result = store.enforce_retention()
+
+    assert result == {"evicted": 2, "freed_bytes": 800}
+    assert [blob.path.exists() for blob in blobs] == [True, False, False, True]
+    assert store.get_stats()["bytes"] <= store.max_bytes
+
+
+def test_evicted_content_can_be_stored_again(store):
+    stored = store.put_bytes(b"again")
+    store.enforce_retention(max_age=-1)
+
+    restored = store.put_bytes(b"again")
+
+    assert not restored.deduplicated
+    assert restored.path.read_bytes() == b"again"
@@ -0,0 +1,147 @@
+import time
+import asyncio
+
+import pytest
+
+from app.services import upstream
+from app.services.hybrid_routing import HybridRouter
+
+SHORT = "Call John Smith at 212-555-0100"
+LONG = "John Smith lives in Berlin. Reach him at john@example.com or 212-555-0100. " * 4
+
+
+class StubAnalyzerPool:
+    """External analyzer answered by the local engine, recording when calls start"""
+
+    def __init__(self, analyzer, fail: bool = False):
+        self.analyzer = analyzer
+        self.fail = fail
+        self.bodies = []
+        self.started_at = []
+
+    async def post(self, path, body, idempotent=True):
+        self.started_at.append(time.perf_counter())
+        self.bodies.append(body)
+        if self.fail:
+            raise RuntimeError("analyzer replicas unavailable")
+        return [
+            result.to_dict()
+            for result in self.analyzer.analyze(
+                text=body["text"],
+                language=body["language"],
+                entities=body["entities"],
+                score_threshold=body["score_threshold"]
+            )
+        ]
+
+    def get_stats(self):
+        return []
+
+
+@pytest.fixture
+def pool(analyzer):
+    stub = upstream._pools["analyzer"] = StubAnalyzerPool(analyzer)
+    yield stub
+    upstream._pools.pop("analyzer", None)
+
+
+@pytest.fixture
+def router(analyzer):
+    return HybridRouter(analyzer, max_local_chars=60, max_in_flight=2, remote_fallback=True)
+
+
+def _key(results):
+    return sorted((result.entity_type, result.start, result.end, round(result.score, 2)) for result in results)
+
+
+def _analyze(router, analyzer, text, entities=None):
+    async def analyze_local():
+        return analyzer.analyze(text=text, language="en", entities=entities, score_threshold=0.35)
+
+    return asyncio.run(router.analyze(text, "en", entities, 0.35, analyze_local))
+
+
+def test_routes(router):
+    assert router.route(SHORT, "en", ["PHONE_NUMBER", "EMAIL_ADDRESS"]) == "pattern"
+    assert router.route(SHORT, "en", None) == "local"
+    assert router.route(LONG, "en", None) == "split"
+    assert router.route(LONG, "en", ["PERSON"]) == "split"
+
+    router.local_in_flight = 2
+    assert router.route(SHORT, "en", None) == "split"
+
+
+@pytest.mark.parametrize("text,entities", [
+    (SHORT, ["PHONE_NUMBER", "EMAIL_ADDRESS"]),
+    (SHORT, None),
+    (LONG, None),
+    (LONG, ["PERSON", "PHONE_NUMBER"])
+])
+def test_results_match_full_local_analysis(router, analyzer, pool, text, entities):
+    results = _analyze(router, analyzer, text, entities)
+
+    assert _key(results) == _key(analyzer.analyze(text=text, language="en", entities=entities, score_threshold=0.35))
+
+
+def test_split_sends_only_ner_entities(router, analyzer, pool):
+    _analyze(router, analyzer, LONG, ["PERSON", "PHONE_NUMBER"])
+
+    assert pool.bodies[-1]["entities"] == ["PERSON"]
+
+
+def test_remote_call_overlaps_pattern_analysis(router, analyzer, pool, monkeypatch):
+    analyze_patterns = router.analyze_patterns
+    pattern_pass = {}
+
+    def slow_patterns(*args):
+        pattern_pass["start"] = time.perf_counter()
+        time.sleep(0.2)
+        pattern_pass["end"] = time.perf_counter()
+        return analyze_patterns(*args)
+
+    monkeypatch.setattr(router, "analyze_patterns", slow_patterns)
+    _analyze(router, analyzer, LONG)
+
+    assert pool.started_at[-1] < pattern_pass["end"] - 0.1
+
+
+def test_remote_failure_falls_back_to_local(router, analyzer, pool):
+    pool.fail = True
+
+    results = _analyze(router, analyzer, LONG)
+
+    assert _key(results) == _key(analyzer.analyze(text=LONG, language="en", score_threshold=0.35))
+    assert router.get_stats()["remote_fallbacks"] == 1
+
+
+def test_remote_failure_raises_without_fallback(analyzer, pool):
+    router = HybridRouter(analyzer, max_local_chars=60, max_in_flight=2, remote_fallback=False)
+    pool.fail = True
+
+    with pytest.raises(RuntimeError):
+        _analyze(router, analyzer, LONG)
+
+
+def test_local_analyses_in_flight_measure_load(analyzer, pool, monkeypatch):
+    from app.services import hybrid_routing
+    from app.services.anonymization import HybridPresidioService
+
+    monkeypatch.setattr(hybrid_routing, "_router", HybridRouter(analyzer, max_local_chars=60, max_in_flight=2, remote_fallback=True))
+    service = HybridPresidioService()
+    analyze = analyzer.analyze
+    in_flight = []
+
+    def slow_analyze(**kwargs):
+        in_flight.append(service.router.local_in_flight)
+        time.sleep(0.1)
+        return analyze(**kwargs)
+
+    monkeypatch.setattr(analyzer, "analyze", slow_analyze)
+
+    async def run():
+        return await asyncio.gather(*(service._analyze_text(SHORT, None, "en", 0.35) for _ in range(4)))
+
+    asyncio.run(run())
+
+    assert max(in_flight) == 2
+    assert service.router.get_stats()["routes"] == {"pattern": 0, "local": 2, "split": 2}
@@ -0,0 +1,79 @@
+import io
+import asyncio
+from types import SimpleNamespace
+from collections import namedtuple
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.models import ImageOutputFormat
+from app.services.extended_anonymization import ExtendedAnonymizationService
+
+Result = namedtuple("Result", "entity_type left top width height")
+
+# Gray entity drawn on the full resolution image
+ENTITY = (401, 203, 799, 237)
+
+
+class GrayBoxAnalyzer:
+    """Stands in for OCR and analysis: reports the bounding box of the gray pixels"""
+
+    def __init__(self):
+        self.sizes = []
+
+    def analyze(self, image: Image.Image, **kwargs):
+        self.sizes.append(image.size)
+        box = image.convert("L").point(lambda value: 255 if value < 250 else 0).getbbox()
+        if box is None:
+            return []
+        left, top, right, bottom = box
+        return [Result("EMAIL_ADDRESS", left, top, right - left, bottom - top)]
+
+
+def _service(analyzer) -> ExtendedAnonymizationService:
+    service = ExtendedAnonymizationService.__new__(ExtendedAnonymizationService)
+    service.image_redactor = SimpleNamespace(
+        image_analyzer_engine=analyzer,
+        redact=lambda image: pytest.fail("full resolution redaction with a scale below 1")
+    )
+    return service
+
+
+def _image_bytes(image_format: str) -> bytes:
+    image = Image.new("RGB", (1200, 800), "white")
+    ImageDraw.Draw(image).rectangle(ENTITY, fill=(100, 100, 100))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **({"quality": 95} if image_format == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("image_format, scale", [("PNG", 0.5), ("JPEG", 0.25)])
+def test_boxes_found_on_a_downscaled_copy_cover_the_full_resolution_entity(image_format, scale):
+    analyzer = GrayBoxAnalyzer()
+
+    result = asyncio.run(_service(analyzer).anonymize_image_with_presidio(
+        _image_bytes(image_format), output_format=ImageOutputFormat.PNG, ocr_scale=scale
+    ))
+
+    target_size = (round(1200 * scale), round(800 * scale))
+    assert analyzer.sizes == [target_size]
+    assert result["dimensions"] == (1200, 800) and result["ocr_dimensions"] == target_size
+
+    redacted = Image.open(io.BytesIO(result["content"])).convert("RGB")
+    assert redacted.size == (1200, 800)
+    left, top, right, bottom = ENTITY
+    for corner in [(left, top), (right, top), (left, bottom), (right, bottom), (600, 220)]:
+        assert redacted.getpixel(corner) == (0, 0, 0)
+    assert redacted.getpixel((100, 100)) == (255, 255, 255)
+    assert redacted.getpixel((600, 400)) == (255, 255, 255)
+
+
+def test_full_scale_uses_the_image_redactor():
+    redacted_sizes = []
+    service = _service(GrayBoxAnalyzer())
+    service.image_redactor.redact = lambda image: redacted_sizes.append(image.size) or image
+
+    result = asyncio.run(service.anonymize_image_with_presidio(_image_bytes("PNG"), ocr_scale=1.0))
+
+    assert redacted_sizes == [(1200, 800)]
+    assert result["ocr_dimensions"] == (1200, 800)
@@ -0,0 +1,133 @@
+import re
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import AnalyzeResponse, EntityResult, IncrementalSessionRequest, IncrementalUpdateRequest
+from app.services import incremental_analysis
+from app.services.incremental_analysis import IncrementalAnalysisService
+
+NAMES = re.compile(r"\b(?:Alice|Bob)\b")
+
+
+class FakeAnalysisService:
+    """Finds the names Alice and Bob, counts the characters it analyzed"""
+
+    def __init__(self):
+        self.analyzed = 0
+        self.fail = False
+
+    async def analyze(self, request):
+        if self.fail:
+            raise RuntimeError("analyzer unavailable")
+        self.analyzed += len(request.text)
+        return AnalyzeResponse(
+            entities=[
+                EntityResult(entity_type="PERSON", start=match.start(), end=match.end(), text=match.group(), score=0.85)
+                for match in NAMES.finditer(request.text)
+            ],
+            processing_time=0.0
+        )
+
+
+@pytest.fixture
+def service():
+    incremental_analysis._sessions.clear()
+    yield IncrementalAnalysisService(FakeAnalysisService())
+    incremental_analysis._sessions.clear()
+
+
+def _open(service, text: str, owner: str = "key:owner"):
+    return asyncio.run(service.open_session(IncrementalSessionRequest(document_id="doc", text=text), owner))
+
+
+def _edit(service, *edits, base_version=None, owner: str = "key:owner"):
+    return asyncio.run(service.apply_edits("doc", IncrementalUpdateRequest(
+        edits=[{"start": start, "end": end, "text": text} for start, end, text in edits],
+        base_version=base_version
+    ), owner))
+
+
+def _spans(response):
+    return [(entity.text, entity.start, entity.end) for entity in response.entities]
+
+
+TEXT = "Alice wrote this.\nNothing here.\nMore filler.\nBob read it."
+
+
+def test_edit_shifts_untouched_entities_and_reanalyzes_touched_sentence(service):
+    _open(service, TEXT)
+    service.analysis_service.analyzed = 0
+
+    response = _edit(service, (0, 5, "Bob"))
+
+    assert response.version == 1
+    assert _spans(response) == [("Bob", 0, 3), ("Bob", 43, 46)]
+    assert service.analysis_service.analyzed < len(TEXT)
+
+
+def test_edits_apply_in_order(service):
+    _open(service, TEXT)
+
+    response = _edit(service, (0, 0, "Hi. "), (4, 9, "Bob"))
+
+    session = incremental_analysis._sessions["key:owner", "doc"]
+    assert session.text.startswith("Hi. Bob wrote this.")
+    assert [(entity.text, entity.start) for entity in response.entities] == [("Bob", 4), ("Bob", 47)]
+
+
+def test_invalid_later_edit_leaves_session_unchanged(service):
+    opened = _open(service, TEXT)
+
+    with pytest.raises(HTTPException) as error:
+        _edit(service, (0, 0, "Hi. "), (100, 101, "x"))
+
+    session = incremental_analysis._sessions["key:owner", "doc"]
+    assert error.value.status_code == 400
+    assert session.text == TEXT
+    assert session.version == 0
+    assert _spans(session) == _spans(opened)
+
+
+def test_failed_analysis_leaves_session_unchanged(service):
+    opened = _open(service, TEXT)
+    service.analysis_service.fail = True
+
+    with pytest.raises(RuntimeError):
+        _edit(service, (0, 0, "Hi. "))
+
+    session = incremental_analysis._sessions["key:owner", "doc"]
+    assert session.text == TEXT
+    assert session.version == 0
+    assert _spans(session) == _spans(opened)
+
+    service.analysis_service.fail = False
+    assert _spans(_edit(service, (0, 0, "Hi. "))) == [("Alice", 4, 9), ("Bob", 49, 52)]
+
+
+def test_stale_base_version_is_rejected(service):
+    _open(service, TEXT)
+    _edit(service, (0, 0, "Hi. "))
+
+    with pytest.raises(HTTPException) as error:
+        _edit(service, (0, 0, "x"), base_version=0)
+
+    assert error.value.status_code == 409
+
+
+def test_sessions_are_only_visible_to_their_owner(service):
+    _open(service, TEXT)
+
+    for attempt in (lambda: _edit(service, (0, 5, "Bob"), owner="ip:10.0.0.2"),
+                    lambda: service.close_session("doc", "ip:10.0.0.2")):
+        with pytest.raises(HTTPException) as error:
+            attempt()
+        assert error.value.status_code == 404
+
+    # The same document id opened by another client is a separate session
+    _open(service, "Bob only.", owner="ip:10.0.0.2")
+    assert _spans(_edit(service, (0, 0, "Hi. "))) == [("Alice", 4, 9), ("Bob", 49, 52)]
+
+    service.close_session("doc", "key:owner")
+    assert _spans(_edit(service, (0, 0, "Hi "), owner="ip:10.0.0.2")) == [("Bob", 3, 6)]
@@ -0,0 +1,18 @@
+import threading
+
+import pytest
+from PIL import Image
+
+tesserocr = pytest.importorskip("tesserocr")
+
+from app.services.ocr import TesserocrOCR  # noqa: E402
+
+
+def test_tesserocr_apis_end_with_their_thread():
+    ocr = TesserocrOCR()
+    thread = threading.Thread(target=ocr.image_to_string, args=(Image.new("L", (64, 32), 255),))
+    thread.start()
+    thread.join()
+
+    assert len(ocr._threads) == 0
+    ocr.close()
@@ -0,0 +1,99 @@
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+from presidio_anonymizer import AnonymizerEngine, DeanonymizeEngine
+from presidio_anonymizer.entities import OperatorConfig, RecognizerResult
+
+from app.config import settings
+from app.models import AnonymizationMode
+from app.services import operator_plans
+from app.services.operator_plans import get_operator_plan
+
+TEXT = "Call John Smith"
+RESULTS = [RecognizerResult("PERSON", 5, 15, 0.85)]
+KEY = "WmZq4t7w!z%C&F)J"
+
+
+@pytest.fixture(autouse=True)
+def no_configured_secrets(monkeypatch):
+    monkeypatch.setattr(settings, "anonymization_hash_salt", None)
+    monkeypatch.setattr(settings, "anonymization_encrypt_key", None)
+    # Plans are compiled with the settings of the process, tests change them
+    monkeypatch.setattr(operator_plans, "_plans", operator_plans.OrderedDict())
+
+
+def _anonymize(plan) -> str:
+    return AnonymizerEngine().anonymize(text=TEXT, analyzer_results=RESULTS, operators=plan.operators_for(RESULTS)).text
+
+
+def test_unsalted_hash_matches_presidio():
+    plan = get_operator_plan(AnonymizationMode.HASH)
+
+    assert _anonymize(plan) == "Call " + hashlib.sha256(b"John Smith").hexdigest()
+
+
+def test_salt_from_request_or_settings_changes_the_hash(monkeypatch):
+    salted = get_operator_plan(AnonymizationMode.HASH, {"PERSON": {"type": "hash", "salt": "pepper"}})
+    assert _anonymize(salted) == "Call " + hashlib.sha256(b"pepperJohn Smith").hexdigest()
+
+    monkeypatch.setattr(settings, "anonymization_hash_salt", "pepper")
+    assert _anonymize(get_operator_plan(AnonymizationMode.HASH)) == _anonymize(salted)
+
+
+def test_invalid_hash_type_is_refused():
+    with pytest.raises(HTTPException) as error:
+        get_operator_plan(AnonymizationMode.REPLACE, {"PERSON": {"type": "hash", "hash_type": "crc32"}})
+
+    assert error.value.status_code == 400
+
+
+def test_encryption_can_be_reversed_by_presidio(monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        get_operator_plan(AnonymizationMode.ENCRYPT)
+    assert error.value.status_code == 400
+
+    monkeypatch.setattr(settings, "anonymization_encrypt_key", KEY)
+    anonymized = AnonymizerEngine().anonymize(
+        text=TEXT, analyzer_results=RESULTS, operators=get_operator_plan(AnonymizationMode.ENCRYPT).operators_for(RESULTS)
+    )
+
+    restored = DeanonymizeEngine().deanonymize(
+        text=anonymized.text, entities=anonymized.items, operators={"DEFAULT": OperatorConfig("decrypt", {"key": KEY})}
+    )
+    assert restored.text == TEXT
+
+
+def test_invalid_encryption_key_is_refused():
+    with pytest.raises(HTTPException) as error:
+        get_operator_plan(AnonymizationMode.ENCRYPT, {"DEFAULT": {"type": "encrypt", "key": "short"}})
+
+    assert error.value.status_code == 400
+
+
+def test_plans_are_cached_per_config():
+    overrides = {"PERSON": {"type": "mask", "masking_char": "#", "chars_to_mask": 4, "from_end": True}}
+
+    assert get_operator_plan(AnonymizationMode.REPLACE, overrides) is get_operator_plan(AnonymizationMode.REPLACE, dict(overrides))
+    assert get_operator_plan(AnonymizationMode.REPLACE, overrides) is not get_operator_plan(AnonymizationMode.REDACT, overrides)
+    assert _anonymize(get_operator_plan(AnonymizationMode.REPLACE, overrides)) == "Call John S####"
+
+
+def test_external_plan_fills_in_the_encryption_key(monkeypatch):
+    monkeypatch.setattr(settings, "anonymization_encrypt_key", KEY)
+
+    anonymizers = get_operator_plan(AnonymizationMode.ENCRYPT).external_anonymizers()
+
+    assert anonymizers == {"DEFAULT": {"type": "encrypt", "key": KEY}}
+
+
+def test_external_plan_refuses_salted_hashing(monkeypatch):
+    plan = get_operator_plan(AnonymizationMode.REPLACE, {"PERSON": {"type": "hash", "salt": "pepper"}})
+    with pytest.raises(HTTPException) as error:
+        plan.external_anonymizers()
+    assert error.value.status_code == 400
+
+    assert get_operator_plan(AnonymizationMode.HASH).external_anonymizers()["DEFAULT"]["type"] == "hash"
+    monkeypatch.setattr(settings, "anonymization_hash_salt", "pepper")
+    with pytest.raises(HTTPException):
+        get_operator_plan(AnonymizationMode.HASH).external_anonymizers()
@@ -0,0 +1,79 @@
+import time
+import threading
+import contextvars
+
+import pytest
+
+from app.services.page_pipeline import PagePipeline
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def _analyze_lengths(texts):
+    return [[len(text)] for text in texts]
+
+
+def test_pages_keep_their_order_and_results():
+    pipeline = PagePipeline(_analyze_lengths, batch_size=3, queue_size=4)
+    pages = [(number, "x" * number) for number in range(10)]
+
+    assert list(pipeline.run(pages)) == [(number, "x" * number, [number]) for number in range(10)]
+    assert pipeline.stats["pages"] == 10
+
+
+def test_batches_are_bounded_and_take_what_is_ready():
+    batches = []
+
+    def analyze(texts):
+        batches.append(len(texts))
+        return _analyze_lengths(texts)
+
+    def slow_pages():
+        for number in range(6):
+            time.sleep(0.02)
+            yield number, str(number)
+
+    pipeline = PagePipeline(analyze, batch_size=4, queue_size=8)
+    results = list(pipeline.run(slow_pages()))
+
+    assert [item for item, _, _ in results] == list(range(6))
+    assert max(batches) <= 4
+    assert pipeline.stats["batches"] == len(batches)
+
+
+def test_extraction_runs_off_the_consumer_thread_in_its_context():
+    seen = []
+
+    def pages():
+        seen.append((threading.current_thread().name, request_id.get()))
+        yield 1, "page"
+
+    request_id.set("request-1")
+    list(PagePipeline(_analyze_lengths, batch_size=2, queue_size=2).run(pages()))
+
+    assert seen == [(seen[0][0], "request-1")]
+    assert seen[0][0].startswith("pdf-extract")
+
+
+def test_extraction_errors_reach_the_consumer():
+    def pages():
+        yield 1, "fine"
+        raise ValueError("broken page")
+
+    with pytest.raises(ValueError, match="broken page"):
+        list(PagePipeline(_analyze_lengths, batch_size=1, queue_size=1).run(pages()))
+
+
+def test_closing_the_consumer_stops_extraction():
+    extracted = []
+
+    def pages():
+        for number in range(1000):
+            extracted.append(number)
+            yield number, "page"
+
+    results = PagePipeline(_analyze_lengths, batch_size=1, queue_size=2).run(pages())
+    next(results)
+    results.close()
+
+    assert len(extracted) < 1000
@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from presidio_analyzer import RecognizerResult
+
+from app.services.prefilter import PiiPrefilter
+
+
+def _prefilter(analyzer, mode: str = "text", deny_list=("yesterday",), shadow_rate: float = 0.0) -> PiiPrefilter:
+    return PiiPrefilter(analyzer, mode=mode, deny_list=deny_list, shadow_rate=shadow_rate)
+
+
+@pytest.mark.parametrize("text", [
+    "the weather is nice and warm",
+    "The weather is nice. It was warm all week.",
+    "\"The sky is blue,\" she said.",
+    "note: The sky is blue",
+    "- The first item\n- The second item",
+])
+def test_text_without_signals_is_skipped(analyzer, text):
+    assert _prefilter(analyzer).screen(text, "en") is None
+
+
+@pytest.mark.parametrize("text, trigger", [
+    ("call me at 5 pm", "digit"),
+    ("write to someone@somewhere", "at"),
+    ("see example.com for details", "domain"),
+    ("we met yesterday", "term"),
+    ("we met YESTERDAY", "term"),
+    ("it was Alice who called", "capitalized"),
+    ("Berlin is large", "capitalized"),
+    ("it was The Who on stage", "capitalized"),
+])
+def test_texts_with_signals_are_analyzed(analyzer, text, trigger):
+    prefilter = _prefilter(analyzer)
+
+    assert prefilter.screen(text, "en") == text
+    assert prefilter.get_stats()["triggers"] == {trigger: 1}
+
+
+def test_stop_words_are_per_language(analyzer):
+    prefilter = _prefilter(analyzer)
+
+    assert prefilter.screen("Der Himmel ist blau", "de") == "Der Himmel ist blau"
+    assert prefilter.screen("Der Himmel ist blau", "xx") == "Der Himmel ist blau"
+    assert prefilter.screen("The sky is blue", "en") is None
+
+
+def test_sentence_mode_blanks_clean_sentences(analyzer):
+    prefilter = _prefilter(analyzer, mode="sentence")
+    text = "The sky is blue. Alice lives in Berlin. It was warm."
+
+    screened = prefilter.screen(text, "en")
+
+    assert len(screened) == len(text)
+    assert screened.strip() == "Alice lives in Berlin."
+    assert screened[17:39] == text[17:39]
+    stats = prefilter.get_stats()
+    assert stats["sentences"] == 3 and stats["sentences_skipped"] == 2
+
+
+def test_clean_text_is_not_analyzed(analyzer):
+    prefilter = _prefilter(analyzer)
+    analyzed = []
+
+    async def analyze(text):
+        analyzed.append(text)
+        return analyzer.analyze(text, language="en")
+
+    async def scenario():
+        clean = await prefilter.analyze("the sky is blue", "en", None, 0.35, analyze)
+        found = await prefilter.analyze("Alice called", "en", None, 0.35, analyze)
+        return clean, found
+
+    clean, found = asyncio.run(scenario())
+
+    assert clean == [] and [result.entity_type for result in found] == ["PERSON"]
+    assert analyzed == ["Alice called"]
+    assert prefilter.get_stats()["texts_skipped"] == 1
+
+
+def test_shadow_analysis_counts_missed_entities(analyzer):
+    prefilter = _prefilter(analyzer, mode="sentence", shadow_rate=1.0)
+    text = "Alice called. the code word is swordfish."
+    # A recognizer without any of the filter's signals, only found by the full analysis
+    full_results = [
+        RecognizerResult("PERSON", 0, 5, 0.85),
+        RecognizerResult("PASSWORD", 31, 40, 0.9),
+    ]
+    prefilter.analyzer = SimpleNamespace(analyze=lambda **kwargs: full_results)
+
+    async def analyze(screened):
+        return full_results[:1] if screened.strip() == "Alice called." else full_results
+
+    async def scenario():
+        results = await prefilter.analyze(text, "en", None, 0.35, analyze)
+        await asyncio.gather(*prefilter._shadow_tasks)
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results == full_results[:1]
+    shadow = prefilter.get_stats()["shadow"]
+    assert shadow["compared"] == 1 and shadow["texts_with_misses"] == 1
+    assert shadow["missed_by_type"] == {"PASSWORD": 1}
+
+
+def test_unknown_mode_is_rejected(analyzer):
+    with pytest.raises(ValueError):
+        _prefilter(analyzer, mode="always")
@@ -0,0 +1,25 @@
+from app.prefork import RestartBackoff
+
+
+def test_failed_starts_back_off_exponentially_up_to_the_limit():
+    backoff = RestartBackoff(stable_after=30, max_delay=5, max_failures=6)
+
+    assert [backoff.delay(0, uptime=0.1) for _ in range(6)] == [1, 2, 4, 5, 5, None]
+
+
+def test_stable_worker_restarts_at_once_and_resets_its_failures():
+    backoff = RestartBackoff(stable_after=30, max_delay=60, max_failures=3)
+    backoff.delay(0, uptime=1)
+    backoff.delay(0, uptime=1)
+
+    assert backoff.delay(0, uptime=3600) == 0
+    assert backoff.delay(0, uptime=1) == 1
+
+
+def test_slots_back_off_independently():
+    backoff = RestartBackoff(stable_after=30, max_delay=60, max_failures=0)
+    for _ in range(20):
+        backoff.delay(0, uptime=0)
+
+    assert backoff.delay(0, uptime=0) == 60
+    assert backoff.delay(1, uptime=0) == 1
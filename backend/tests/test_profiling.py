@@ -0,0 +1,36 @@
+import spacy
+import pytest
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+from app.config import settings
+from app.services.profiling import instrument_analyzer, recognizer_timings
+
+
+@pytest.fixture
+def instrumented_analyzer(tmp_path):
+    spacy.blank("en").to_disk(tmp_path / "en_blank")
+    analyzer = AnalyzerEngine(nlp_engine=SpacyNlpEngine(models={"en": str(tmp_path / "en_blank")}), supported_languages=["en"])
+    instrument_analyzer(analyzer)
+    recognizer_timings.reset()
+    yield analyzer
+    recognizer_timings.reset()
+
+
+def test_recognizer_timings_are_opt_in():
+    assert settings.__fields__["profiling_recognizer_timings"].default is False
+
+
+def test_single_and_batched_analysis_are_timed(instrumented_analyzer):
+    instrumented_analyzer.analyze(text="Mail john@example.com", language="en")
+    results = list(BatchAnalyzerEngine(analyzer_engine=instrumented_analyzer).analyze_iterator(
+        ["Mail john@example.com", "Call 212-555-0100", "Nothing here"], language="en"
+    ))
+
+    timings = recognizer_timings.snapshot()["recognizers"]
+
+    assert [bool(result) for result in results] == [True, True, False]
+    assert timings["nlp_engine:SpacyNlpEngine"]["calls"] == 1
+    assert timings["nlp_engine:SpacyNlpEngine:batch"]["calls"] == 1
+    assert timings["EmailRecognizer"]["calls"] == 4
+    assert timings["EmailRecognizer"]["total_ms"] > 0
@@ -0,0 +1,138 @@
+import time
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.config import settings
+from app.services.rate_limiter import InMemoryTokenBucketStore, RateLimiter, SQLiteTokenBucketStore, api_key_id
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteTokenBucketStore(str(tmp_path / "rate_limits.sqlite3"))
+    return InMemoryTokenBucketStore()
+
+
+def _request(headers=None, client=("10.0.0.1", 1234)) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": client
+    })
+
+
+def test_bucket_grants_capacity_then_refuses(store):
+    assert store.consume("k", capacity=3, refill_rate=1, amount=1) == 0
+    assert store.consume("k", capacity=3, refill_rate=1, amount=2) == 0
+
+    retry_after = store.consume("k", capacity=3, refill_rate=1, amount=1)
+
+    assert 0.9 < retry_after <= 1.0
+
+
+def test_bucket_refills_over_time(store):
+    store.consume("k", capacity=2, refill_rate=50, amount=2)
+    assert store.consume("k", capacity=2, refill_rate=50, amount=1) > 0
+
+    time.sleep(0.05)
+
+    assert store.consume("k", capacity=2, refill_rate=50, amount=1) == 0
+
+
+def test_buckets_are_separate_per_key(store):
+    store.consume("a", capacity=1, refill_rate=0.1, amount=1)
+
+    assert store.consume("b", capacity=1, refill_rate=0.1, amount=1) == 0
+
+
+def test_oversized_request_is_admitted_on_full_bucket(store):
+    assert store.consume("k", capacity=10, refill_rate=1, amount=25) == 0
+    assert store.consume("k", capacity=10, refill_rate=1, amount=1) > 0
+
+
+def test_debt_is_always_taken_and_repaid_first(store):
+    assert store.consume("k", capacity=2, refill_rate=1, amount=5, allow_debt=True) == 0
+
+    # 3 tokens of debt plus the 1 requested need about 4 seconds of refill
+    assert 3.9 < store.consume("k", capacity=2, refill_rate=1, amount=1) <= 4.0
+
+
+def test_limiter_raises_429_with_retry_after():
+    limiter = RateLimiter(InMemoryTokenBucketStore(), {"text": {"requests_per_second": 2, "characters_per_minute": 100}})
+    limiter.consume("ip:1", "text", requests=1, characters=60)
+
+    with pytest.raises(HTTPException) as error:
+        limiter.consume("ip:1", "text", requests=1, characters=60)
+
+    assert error.value.status_code == 429
+    assert "characters_per_minute" in error.value.detail
+    assert int(error.value.headers["Retry-After"]) >= 1
+
+
+def test_rejected_request_is_charged_nothing(store):
+    limiter = RateLimiter(store, {"text": {"requests_per_second": 2, "characters_per_minute": 100}})
+    limiter.consume("ip:1", "text", requests=1, characters=90)
+
+    # The character limit rejects the request, its request token must not be taken
+    with pytest.raises(HTTPException):
+        limiter.consume("ip:1", "text", requests=1, characters=50)
+    limiter.consume("ip:1", "text", requests=1, characters=5)
+
+    with pytest.raises(HTTPException) as error:
+        limiter.consume("ip:1", "text", requests=1)
+    assert "requests_per_second" in error.value.detail
+
+
+def test_blocking_store_is_consumed_off_the_event_loop(tmp_path):
+    store = SQLiteTokenBucketStore(str(tmp_path / "rate_limits.sqlite3"))
+    limiter = RateLimiter(store, {"text": {"requests_per_second": 1}})
+    threads = []
+    consume_many = store.consume_many
+
+    def record_thread(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return consume_many(*args, **kwargs)
+
+    store.consume_many = record_thread
+
+    async def scenario():
+        await limiter.consume_async("ip:1", "text", requests=1)
+        with pytest.raises(HTTPException):
+            await limiter.consume_async("ip:1", "text", requests=1)
+
+    asyncio.run(scenario())
+
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_limiter_ignores_disabled_limits_and_unknown_groups():
+    limiter = RateLimiter(InMemoryTokenBucketStore(), {"files": {"requests_per_second": 1, "pages_per_hour": 0}})
+
+    for _ in range(5):
+        limiter.consume("ip:1", "files", pages=100)
+        limiter.consume("ip:1", "text", requests=1)
+
+
+def test_client_key_prefers_api_key(monkeypatch):
+    limiter = RateLimiter(InMemoryTokenBucketStore(), {})
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", False)
+
+    assert limiter.client_key(_request({"X-API-Key": "secret"})) == "key:" + api_key_id(_request({"X-API-Key": "secret"}))
+    assert limiter.client_key(_request({"Authorization": "Bearer secret"})) == limiter.client_key(_request({"X-API-Key": "secret"}))
+    assert limiter.client_key(_request({"X-Forwarded-For": "1.2.3.4"})) == "ip:10.0.0.1"
+
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", True)
+    assert limiter.client_key(_request({"X-Forwarded-For": "1.2.3.4, 10.0.0.1"})) == "ip:1.2.3.4"
+
+
+def test_api_key_id_never_contains_the_key():
+    key_id = api_key_id(_request({"X-API-Key": "secret-api-key"}))
+
+    assert key_id and "secret" not in key_id
+    assert api_key_id(_request()) is None
@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import brotli
+import msgpack
+import pytest
+from starlette.requests import Request
+
+from app.config import settings
+from app.responses import ResponseOptions, SpanFormat, encode_response
+from app.spans import SpanList
+
+TEXT = "Call John Smith at 212-555-0100"
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def _payload() -> dict:
+    entities = SpanList(TEXT)
+    entities.append("PERSON", 5, 15, 0.85)
+    entities.append("PHONE_NUMBER", 19, 31, 0.75)
+    return {"text": "Call <PERSON> at <PHONE_NUMBER>", "original_text": TEXT, "entities": entities}
+
+
+def test_default_response_is_json_with_entity_objects():
+    response = encode_response(_request(), _payload())
+
+    assert response.media_type == "application/json"
+    assert json.loads(response.body)["entities"] == [
+        {"entity_type": "PERSON", "start": 5, "end": 15, "text": "John Smith", "score": 0.85},
+        {"entity_type": "PHONE_NUMBER", "start": 19, "end": 31, "text": "212-555-0100", "score": 0.75},
+    ]
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_shaping_drops_echoed_text_and_returns_columns():
+    options = ResponseOptions(omit_original_text=True, omit_entity_text=True, span_format=SpanFormat.COLUMNS)
+
+    body = json.loads(encode_response(_request(), _payload(), options).body)
+
+    assert "original_text" not in body
+    assert body["entities"] == {
+        "entity_type": ["PERSON", "PHONE_NUMBER"], "start": [5, 19], "end": [15, 31], "score": [0.85, 0.75]
+    }
+
+
+def test_models_are_shaped_like_span_lists():
+    rows = [{"entity_type": "PERSON", "start": 5, "end": 15, "text": "John Smith", "score": 0.85}]
+    options = ResponseOptions(span_format=SpanFormat.COLUMNS)
+
+    body = json.loads(encode_response(_request(), {"entities": rows}, options).body)
+
+    assert body["entities"] == {
+        "entity_type": ["PERSON"], "start": [5], "end": [15], "score": [0.85], "text": ["John Smith"]
+    }
+
+
+def test_msgpack_is_negotiated_by_accept():
+    response = encode_response(_request(accept="application/x-msgpack"), _payload())
+
+    assert response.media_type == "application/msgpack"
+    assert msgpack.unpackb(response.body)["entities"][0]["text"] == "John Smith"
+
+
+@pytest.mark.parametrize("accept_encoding, encoding, decompress", [
+    ("gzip, br", "br", brotli.decompress),
+    ("gzip", "gzip", gzip.decompress),
+])
+def test_large_bodies_are_compressed(monkeypatch, accept_encoding, encoding, decompress):
+    monkeypatch.setattr(settings, "response_compression_min_size", 64)
+
+    response = encode_response(_request(accept_encoding=accept_encoding), _payload())
+
+    assert response.headers["content-encoding"] == encoding
+    assert json.loads(decompress(response.body))["original_text"] == TEXT
+
+
+def test_small_bodies_are_sent_uncompressed(monkeypatch):
+    monkeypatch.setattr(settings, "response_compression_min_size", 1024)
+
+    response = encode_response(_request(accept_encoding="gzip, br"), _payload())
+
+    assert "content-encoding" not in response.headers
+    assert json.loads(response.body)["text"] == "Call <PERSON> at <PHONE_NUMBER>"
@@ -0,0 +1,22 @@
+import hashlib
+
+from app.config import settings
+from app.services.result_store import content_document_id
+
+
+def test_default_ids_are_random_without_key(monkeypatch):
+    monkeypatch.setattr(settings, "result_store_id_key", None)
+
+    assert content_document_id("john@example.com") != content_document_id("john@example.com")
+
+
+def test_keyed_ids_are_stable_and_not_a_plain_hash(monkeypatch):
+    monkeypatch.setattr(settings, "result_store_id_key", "secret")
+    document_id = content_document_id("john@example.com")
+
+    assert document_id == content_document_id("john@example.com")
+    assert document_id != content_document_id("jane@example.com")
+    assert hashlib.sha256(b"john@example.com").hexdigest() not in document_id
+
+    monkeypatch.setattr(settings, "result_store_id_key", "other secret")
+    assert content_document_id("john@example.com") != document_id
@@ -0,0 +1,57 @@
+import pytest
+
+from app.config import settings
+from app.services.sentence_memo import SentenceMemo, split_sentences
+
+
+def _sentences(text):
+    return [text[start:end] for start, end in split_sentences(text)]
+
+
+def test_split_keeps_abbreviations_and_initials():
+    text = "Mr. Smith met Dr. Jones. J. R. Tolkien wrote it! Did he?\n\nNew paragraph"
+
+    assert _sentences(text) == ["Mr. Smith met Dr. Jones.", "J. R. Tolkien wrote it!", "Did he?", "New paragraph"]
+
+
+def test_split_on_blank_line_after_abbreviation():
+    assert _sentences("See the list etc.\n\nNext part") == ["See the list etc.", "Next part"]
+
+
+@pytest.fixture
+def memo(analyzer, monkeypatch):
+    monkeypatch.setattr(settings, "sentence_memo_tenant_enabled", False)
+    return SentenceMemo(analyzer, language="en")
+
+
+def _found(text, results):
+    return sorted((result.entity_type, text[result.start:result.end]) for result in results)
+
+
+def test_entities_are_projected_onto_original_whitespace(memo):
+    text = "Contact  John   Smith\n at\t212-555-0100.   He lives in\n\nBerlin."
+
+    results = memo.analyze(text)
+
+    assert _found(text, results) == [("LOCATION", "Berlin"), ("PERSON", "John   Smith"), ("PHONE_NUMBER", "212-555-0100")]
+
+
+def test_repeated_sentences_are_analyzed_once(memo, analyzer):
+    page = "Alice called 212-555-0100 today. Nothing else happened."
+    wrapped = "Alice called\n212-555-0100 today.  Nothing else\nhappened."
+
+    first, second = memo.analyze_many([page, wrapped])
+
+    assert memo.stats["analyzed"] == 2
+    assert memo.stats["request_hits"] == 2
+    assert _found(page, first) == _found(wrapped, second) == [("PERSON", "Alice"), ("PHONE_NUMBER", "212-555-0100")]
+
+
+def test_results_match_analysis_of_each_sentence(memo, analyzer):
+    text = "Bob Jones moved to Paris. Call him on 212-555-0100 or mail bob@example.com."
+
+    expected = []
+    for start, end in split_sentences(text):
+        expected.extend(_found(text[start:end], analyzer.analyze(text=text[start:end], language="en")))
+
+    assert _found(text, memo.analyze(text)) == sorted(expected)
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from app.models import EntityResult
+from app.spans import Span, SpanList
+
+TEXT = "John Smith met Alice in Berlin"
+RESULTS = [
+    {"entity_type": "PERSON", "start": 0, "end": 10, "score": 0.85},
+    {"entity_type": "PERSON", "start": 15, "end": 20, "score": 0.85},
+    {"entity_type": "GPE", "start": 24, "end": 30, "score": 0.6},
+]
+
+
+def test_entity_types_are_interned_once():
+    spans = SpanList.from_dicts(TEXT, RESULTS)
+
+    assert len(spans) == 3
+    assert spans.entity_types == ["PERSON", "GPE"]
+    assert spans.type_ids.tolist() == [0, 0, 1]
+    assert spans.distinct_entity_types() == ["PERSON", "GPE"]
+
+
+def test_iteration_slices_the_source_text():
+    results = [SimpleNamespace(**result) for result in RESULTS]
+
+    spans = list(SpanList.from_results(TEXT, results))
+
+    assert spans[0] == Span("PERSON", 0, 10, 0.85, "John Smith")
+    assert [span.text for span in spans] == ["John Smith", "Alice", "Berlin"]
+
+
+def test_analyzer_dicts_round_trip():
+    assert SpanList.from_dicts(TEXT, RESULTS).to_analyzer_dicts() == RESULTS
+
+
+def test_rows_and_columns():
+    spans = SpanList.from_dicts(TEXT, RESULTS)
+
+    assert spans.to_rows()[2] == {"entity_type": "GPE", "start": 24, "end": 30, "text": "Berlin", "score": 0.6}
+    assert spans.to_rows(include_text=False) == RESULTS
+    assert spans.to_columns() == {
+        "entity_type": ["PERSON", "PERSON", "GPE"],
+        "start": [0, 15, 24],
+        "end": [10, 20, 30],
+        "score": [0.85, 0.85, 0.6],
+        "text": ["John Smith", "Alice", "Berlin"],
+    }
+    assert "text" not in spans.to_columns(include_text=False)
+
+
+def test_models_match_entity_results():
+    models = SpanList.from_dicts(TEXT, RESULTS).to_models()
+
+    assert models[1] == EntityResult(entity_type="PERSON", start=15, end=20, text="Alice", score=0.85)
+
+
+def test_empty_list():
+    spans = SpanList(TEXT)
+
+    assert len(spans) == 0
+    assert spans.average_score() == 0
+    assert spans.to_columns() == {"entity_type": [], "start": [], "end": [], "score": [], "text": []}
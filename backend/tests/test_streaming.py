@@ -0,0 +1,54 @@
+import pytest
+
+from app.config import settings
+from app.services.streaming import StreamAnonymizer
+
+
+@pytest.fixture
+def stream(analyzer, monkeypatch):
+    monkeypatch.setattr(settings, "stream_max_buffer_chars", 100)
+    return StreamAnonymizer()
+
+
+def _check_segments(segments, text: str):
+    """Segments follow each other without gaps and stay within the buffer limit"""
+    offset = 0
+    for segment in segments:
+        assert segment.offset == offset
+        assert 0 < len(segment.text) <= settings.stream_max_buffer_chars
+        assert text[offset:offset + len(segment.text)] == segment.text
+        offset += len(segment.text)
+    return offset
+
+
+def test_large_feed_without_boundaries_is_cut_into_bounded_segments(stream):
+    text = "word " * 1000 + "x" * 350
+
+    segments = stream.feed(text)
+
+    consumed = _check_segments(segments, text)
+    assert len(text) - consumed < settings.stream_max_buffer_chars
+    assert all(segment.text.endswith(" ") for segment in segments[:-3])
+    assert stream.received_characters == len(text)
+    assert stream.flush().text == text[consumed:]
+
+
+def test_multi_sentence_feed_is_cut_at_sentence_boundaries(stream):
+    sentences = [f"Sentence number {number} mentions Alice and Bob Jones. " for number in range(40)]
+    text = "".join(sentences) + "An unfinished one"
+
+    segments = stream.feed(text)
+
+    consumed = _check_segments(segments, text)
+    assert all(segment.text.endswith(". ") or segment.text.endswith(".") for segment in segments)
+    assert text[consumed:].lstrip() == "An unfinished one"
+    assert len(segments) > 1
+
+
+def test_sentences_split_across_feeds_are_joined(stream):
+    assert stream.feed("Alice lives in Ber") == []
+
+    segments = stream.feed("lin. Next")
+
+    assert [segment.text for segment in segments] == ["Alice lives in Berlin."]
+    assert stream.flush().text == " Next"
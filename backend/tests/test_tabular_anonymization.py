@@ -0,0 +1,41 @@
+import io
+
+import pandas as pd
+
+from app.models import ColumnProfile
+from app.services.tabular_anonymization import TabularAnonymizationService, ValueMemo
+
+
+def _anonymize_csv(service, data: str, profiles, on_analyze=None) -> pd.DataFrame:
+    output = b"".join(service.stream_csv(io.BytesIO(data.encode("utf-8")), profiles, on_analyze))
+    return pd.read_csv(io.BytesIO(output), dtype=str, keep_default_na=False)
+
+
+def test_distinct_values_are_analyzed_once_and_charged(analyzer):
+    service = TabularAnonymizationService(chunk_size=2)
+    charged = []
+    data = "name,city\nAlice,Berlin\nAlice,Paris\nBob Jones,Berlin\nAlice,Berlin\n"
+
+    result = _anonymize_csv(service, data, {"name": ColumnProfile(entities=["PERSON"])}, charged.append)
+
+    assert list(result["name"]) == ["<PERSON>"] * 4
+    assert list(result["city"]) == ["Berlin", "Paris", "Berlin", "Berlin"]
+    # Chunk 1 analyzes "Alice", chunk 2 only "Bob Jones"
+    assert charged == [len("Alice"), len("Bob Jones")]
+
+
+def test_memo_keeps_only_recently_used_values(analyzer):
+    service = TabularAnonymizationService(memo_size=2)
+    memo = ValueMemo(service.memo_size)
+    profile = ColumnProfile(entities=["PERSON"])
+
+    first = service.anonymize_values(pd.Series(["Alice", "Bob Jones", "Alice", "nobody", "John Smith"]), profile, memo)
+
+    assert list(first) == ["<PERSON>", "<PERSON>", "<PERSON>", "nobody", "<PERSON>"]
+    assert list(memo) == ["nobody", "John Smith"]
+    assert memo.analyzed == 4
+
+    service.anonymize_values(pd.Series(["nobody", "Alice"]), profile, memo)
+
+    assert list(memo) == ["nobody", "Alice"]
+    assert memo.analyzed == 5
@@ -0,0 +1,64 @@
+from itertools import islice
+
+import pytest
+
+from app.services.text_file_anonymization import iter_units, _string_leaves
+
+
+def _units(data: bytes, unit: str, max_bytes: int = 1024):
+    return [data[start:end] for start, end, _ in iter_units(data, unit, max_bytes)]
+
+
+def _covers(data: bytes, unit: str, max_bytes: int) -> bool:
+    """Units and their separators put back together give the whole buffer"""
+    return b"".join(data[start:separator_end] for start, _, separator_end in iter_units(data, unit, max_bytes)) == data
+
+
+def test_lines():
+    data = b"first\r\nsecond\n\nfourth"
+
+    assert _units(data, "line") == [b"first", b"second", b"", b"fourth"]
+    assert _covers(data, "line", 1024)
+
+
+def test_paragraphs():
+    data = b"Dear Alice,\n\nthanks.\n  \t\n\nBest\nBob\n"
+
+    assert _units(data, "paragraph") == [b"Dear Alice,", b"thanks.", b"Best\nBob\n"]
+    assert _covers(data, "paragraph", 1024)
+
+
+def test_empty_buffer():
+    assert list(iter_units(b"", "line", 16)) == []
+
+
+def test_long_paragraph_is_cut_at_last_line_break():
+    data = b"aaaa\nbbbb\ncccc\ndddd"
+
+    assert _units(data, "paragraph", 12) == [b"aaaa\nbbbb", b"cccc\ndddd"]
+    assert _covers(data, "paragraph", 12)
+
+
+def test_long_line_is_cut_at_character_boundary():
+    data = "ü".encode() * 20
+
+    units = _units(data, "line", 7)
+    assert all(len(unit) <= 7 for unit in units)
+    assert all(unit.decode("utf-8") for unit in units)
+    assert _covers(data, "line", 7)
+
+
+@pytest.mark.parametrize("data", [b"\x80" * 100, b"ab" + b"\x80" * 40 + b"\n" + b"\xbf" * 33])
+def test_continuation_bytes_always_make_progress(data):
+    units = list(islice(iter_units(data, "line", 16), 50))
+
+    assert all(end > start or separator_end > start for start, end, separator_end in units)
+    assert _covers(data, "line", 16)
+
+
+def test_string_leaves_limited_to_fields():
+    record = {"id": 1, "msg": "Call Alice", "meta": {"who": "Bob", "tags": ["x", " "]}, "n": "Alice"}
+
+    leaves = [container[key] for container, key in _string_leaves(record, ["msg", "meta"])]
+
+    assert leaves == ["Call Alice", "Bob", "x"]
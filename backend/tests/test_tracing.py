@@ -0,0 +1,63 @@
+import json
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import tracing
+from app.services.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+
+
+@pytest.fixture
+def trace_path(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "tracing_enabled", True)
+    monkeypatch.setattr(settings, "tracing_exporter", "file")
+    monkeypatch.setattr(settings, "tracing_file_path", str(path))
+    setup_tracing()
+    yield path
+    shutdown_tracing()
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _request(content_length: bytes):
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/analyze",
+        "headers": [(b"content-length", content_length)]
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(TracingMiddleware(_ok)(scope, receive, send))
+    return messages
+
+
+@pytest.mark.parametrize("content_length", [b"12", b"abc", b""])
+def test_request_span_with_any_content_length(trace_path, content_length):
+    messages = _request(content_length)
+    shutdown_tracing()
+
+    assert messages[0]["status"] == 200
+    span = json.loads(trace_path.read_text().splitlines()[-1])
+    assert span["name"] == "POST /api/v1/analyze"
+    assert span["attributes"].get("http.request_content_length") == (12 if content_length == b"12" else None)
+
+
+def test_shutdown_closes_trace_file(trace_path):
+    trace_file = tracing._trace_file
+
+    shutdown_tracing()
+
+    assert trace_file.closed
+    assert tracing._trace_file is None
@@ -0,0 +1,235 @@
+import time
+import asyncio
+import threading
+
+import pytest
+import uvicorn
+from fastapi import HTTPException
+
+from app.services.upstream import CircuitBreaker, UpstreamPool
+from stub_server import create_stub_app
+
+TEXT = "Call John Smith at 212-555-0100"
+
+
+@pytest.fixture
+def stub_server(analyzer):
+    """Factory starting stub_server.py apps on free ports, stopped after the test"""
+    servers = []
+
+    def start(**options) -> str:
+        server = uvicorn.Server(uvicorn.Config(
+            create_stub_app(ocr_backend="tesseract", **options),
+            host="127.0.0.1",
+            port=0,
+            log_level="warning"
+        ))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            assert time.monotonic() < deadline, "stub server did not start"
+            time.sleep(0.01)
+        servers.append((server, thread))
+        port = server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    yield start
+
+    for server, thread in servers:
+        server.should_exit = True
+    for server, thread in servers:
+        thread.join(timeout=10)
+
+
+def _pool(urls, **options) -> UpstreamPool:
+    options = {"max_retries": 2, "backoff_base": 0.001, "backoff_max": 0.01, "failure_threshold": 100, **options}
+    return UpstreamPool("analyzer", urls, **options)
+
+
+def _run(pool: UpstreamPool, scenario):
+    """Run a scenario with the pool on one event loop, closing its client afterwards"""
+    async def run():
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.aclose()
+
+    return asyncio.run(run())
+
+
+def _analyze(pool: UpstreamPool, idempotent: bool = True):
+    return pool.post("/analyze", {"text": TEXT, "language": "en"}, idempotent=idempotent)
+
+
+def _entity_types(results):
+    return sorted(result["entity_type"] for result in results)
+
+
+def test_stub_answers_like_the_analyzer(stub_server):
+    pool = _pool([stub_server()])
+
+    results = _run(pool, _analyze)
+
+    assert _entity_types(results) == ["PERSON", "PHONE_NUMBER"]
+
+
+def test_retry_on_5xx_moves_to_another_replica(stub_server):
+    pool = _pool([stub_server(error_rate=1.0), stub_server()])
+    failing, healthy = pool.upstreams
+    # The least loaded replica is picked first, so the failing one gets the first attempt
+    healthy.in_flight = 1
+
+    results = _run(pool, _analyze)
+
+    assert _entity_types(results) == ["PERSON", "PHONE_NUMBER"]
+    assert failing.stats["requests"] == 1 and failing.stats["failures"] == 1
+    assert healthy.stats["requests"] == 1 and healthy.stats["failures"] == 0
+
+
+def test_retry_on_timeout(stub_server):
+    pool = _pool([stub_server(slow_rate=1.0, slow_ms=1000), stub_server()], timeout=0.2)
+    slow, healthy = pool.upstreams
+    healthy.in_flight = 1
+
+    results = _run(pool, _analyze)
+
+    assert _entity_types(results) == ["PERSON", "PHONE_NUMBER"]
+    assert slow.stats["timeouts"] == 1
+    assert healthy.stats["requests"] == 1
+
+
+def test_gives_up_after_max_retries(stub_server):
+    pool = _pool([stub_server(error_rate=1.0)], max_retries=2)
+
+    with pytest.raises(HTTPException) as error:
+        _run(pool, _analyze)
+
+    assert error.value.status_code == 502
+    assert pool.upstreams[0].stats["requests"] == 3
+
+
+def test_non_idempotent_request_is_not_retried_after_it_was_processed(stub_server):
+    pool = _pool([stub_server(slow_rate=1.0, slow_ms=1000), stub_server()], timeout=0.2)
+    slow, healthy = pool.upstreams
+    healthy.in_flight = 1
+
+    with pytest.raises(HTTPException):
+        _run(pool, lambda pool: _analyze(pool, idempotent=False))
+
+    assert healthy.stats["requests"] == 0
+
+
+def test_breaker_opens_and_recovers_through_half_open_trial(stub_server):
+    failing_url, healthy_url = stub_server(error_rate=1.0), stub_server()
+    pool = _pool([failing_url], max_retries=0, failure_threshold=2, reset_timeout=0.2)
+    upstream = pool.upstreams[0]
+
+    async def scenario(pool):
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await _analyze(pool)
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+        # Open: rejected without a request
+        with pytest.raises(HTTPException) as error:
+            await _analyze(pool)
+        assert error.value.status_code == 503
+        assert upstream.stats["requests"] == 2
+
+        # Half-open after the reset timeout: a failed trial opens the breaker again
+        await asyncio.sleep(0.25)
+        with pytest.raises(HTTPException):
+            await _analyze(pool)
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+        assert upstream.stats["requests"] == 3
+
+        # The replica recovers: the next trial succeeds and closes the breaker
+        upstream.url = healthy_url
+        await asyncio.sleep(0.25)
+        results = await _analyze(pool)
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+        return results
+
+    assert _entity_types(_run(pool, scenario)) == ["PERSON", "PHONE_NUMBER"]
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_least_loaded_replica_is_picked(stub_server):
+    pool = _pool([stub_server(), stub_server(), stub_server()])
+    busy, idle, open_breaker = pool.upstreams
+    busy.in_flight = 2
+    open_breaker.breaker.state = CircuitBreaker.OPEN
+    open_breaker.breaker.opened_at = time.monotonic()
+
+    async def scenario(pool):
+        for _ in range(5):
+            await _analyze(pool)
+
+    _run(pool, scenario)
+
+    assert idle.stats["requests"] == 5
+    assert busy.stats["requests"] == 0
+    assert open_breaker.stats["requests"] == 0
+
+
+def test_concurrent_requests_spread_over_replicas(stub_server):
+    pool = _pool([stub_server(latency_ms=100), stub_server(latency_ms=100)])
+
+    async def scenario(pool):
+        await asyncio.gather(*(_analyze(pool) for _ in range(6)))
+
+    _run(pool, scenario)
+
+    assert [upstream.stats["requests"] for upstream in pool.upstreams] == [3, 3]
+
+
+def test_hedged_request_wins_on_second_replica(stub_server):
+    pool = _pool([stub_server(slow_rate=1.0, slow_ms=1500), stub_server()], hedging=True, hedge_min_delay=0.05)
+    slow, fast = pool.upstreams
+    fast.in_flight = 1
+
+    start_time = time.monotonic()
+    results = _run(pool, _analyze)
+
+    assert _entity_types(results) == ["PERSON", "PHONE_NUMBER"]
+    assert time.monotonic() - start_time < 1.0
+    assert fast.stats["hedges"] == 1 and fast.stats["hedge_wins"] == 1
+
+
+def test_cancelled_half_open_trial_frees_the_replica(stub_server):
+    pool = _pool([stub_server(slow_rate=1.0, slow_ms=1500), stub_server()], hedging=True, hedge_min_delay=0.05)
+    slow, fast = pool.upstreams
+    fast.in_flight = 1
+    # Half-open: the slow replica's next request is its trial, and the hedge cancels it
+    slow.breaker.state = CircuitBreaker.OPEN
+    slow.breaker.reset_timeout = 0.0
+
+    results = _run(pool, _analyze)
+
+    assert _entity_types(results) == ["PERSON", "PHONE_NUMBER"]
+    assert fast.stats["hedge_wins"] == 1
+    assert slow.breaker.state == CircuitBreaker.HALF_OPEN
+    assert slow.breaker.allow()
+
+
+def test_non_idempotent_requests_are_not_hedged(stub_server):
+    pool = _pool([stub_server(slow_rate=1.0, slow_ms=300), stub_server()], hedging=True, hedge_min_delay=0.05)
+    slow, fast = pool.upstreams
+    fast.in_flight = 1
+
+    _run(pool, lambda pool: _analyze(pool, idempotent=False))
+
+    assert fast.stats["hedges"] == 0 and fast.stats["requests"] == 0
+    assert slow.stats["requests"] == 1